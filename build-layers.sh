@@ -8,6 +8,8 @@ echo "========================="
 rm -rf layers/
 mkdir -p layers/python-libraries/python
 mkdir -p layers/salesforce-libraries/python
+mkdir -p layers/atlas-common/python
+mkdir -p layers/numpy/python
 
 # Build python-libraries layer
 echo "Building python-libraries layer..."
@@ -25,6 +27,16 @@ pip3 install -q \
     cryptography==41.0.7 \
     -t layers/salesforce-libraries/python/
 
+# Build numpy layer (StartTranscription's silence trimming only)
+echo "Building numpy layer..."
+pip3 install -q \
+    numpy==2.2.6 \
+    -t layers/numpy/python/
+
+# Build atlas-common layer (shared handler code from lambda/common)
+echo "Building atlas-common layer..."
+cp -R lambda/common/atlas_common layers/atlas-common/python/
+
 # Clean up unnecessary files
 echo "Cleaning up..."
 find layers/ -type d -name "__pycache__" -exec rm -rf {} + 2>/dev/null || true
@@ -34,3 +46,5 @@ find layers/ -type f -name "*.pyc" -delete 2>/dev/null || true
 echo "✓ Layers built successfully"
 echo "  python-libraries: $(du -sh layers/python-libraries | cut -f1)"
 echo "  salesforce-libraries: $(du -sh layers/salesforce-libraries | cut -f1)"
+echo "  atlas-common: $(du -sh layers/atlas-common | cut -f1)"
+echo "  numpy: $(du -sh layers/numpy | cut -f1)"
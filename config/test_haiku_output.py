@@ -1,7 +1,11 @@
-import json
-import boto3
+import os
+import sys
 
-bedrock_client = boto3.client('bedrock-runtime', region_name='us-west-2')
+# Run from the repo root or config/; atlas_common lives in lambda/common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda', 'common'))
+from atlas_common.bedrock_gateway import BedrockGateway, anthropic_body
+
+bedrock = BedrockGateway(region_name='us-west-2', metrics=False)
 HAIKU_MODEL_ID = 'anthropic.claude-3-haiku-20240307-v1:0'
 
 # Test the exact prompt from the Lambda
@@ -29,32 +33,21 @@ Your *only* goal is to provide the information in the <grounding_context> in a n
 
 A:"""
 
-body = json.dumps({
-    "anthropic_version": "bedrock-2023-05-31",
-    "max_tokens": 150,
-    "temperature": 0.7,
-    "system": "You are Atlas, an AI assistant. Be concise and helpful.",
-    "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}]
-})
+body = anthropic_body(prompt, max_tokens=150, system="You are Atlas, an AI assistant. Be concise and helpful.",
+                      temperature=0.7)
 
 print("Testing Haiku output with current prompt...\n")
 print("=" * 80)
 
 for i in range(10):
     try:
-        response = bedrock_client.invoke_model(
-            body=body,
-            modelId=HAIKU_MODEL_ID,
-            contentType='application/json',
-            accept='application/json'
-        )
-        
-        response_body = json.loads(response.get('body').read())
-        generated_text = response_body.get('content')[0].get('text')
+        completion = bedrock.complete(body, HAIKU_MODEL_ID, operation='HaikuOutputTest')
+        generated_text = completion.text
         
         print(f"\nTest {i+1}:")
         print(f"Output: {repr(generated_text)}")
-        print(f"Stripped: {repr(generated_text.strip())}")
+        print(f"Tokens: {completion.input_tokens} in / {completion.output_tokens} out, "
+              f"stop_reason={completion.stop_reason}, latency={completion.latency}s")
         
         # Check for XML tags
         if '<' in generated_text or '>' in generated_text:
@@ -77,9 +77,13 @@ build_layers() {
     
     mkdir -p layers/python-libraries/python
     mkdir -p layers/salesforce-libraries/python
+    mkdir -p layers/atlas-common/python
+    mkdir -p layers/numpy/python
     
     pip install -q requests phonenumbers wrapt -t layers/python-libraries/python/
     pip install -q simple-salesforce PyJWT cryptography -t layers/salesforce-libraries/python/
+    pip install -q numpy==2.2.6 -t layers/numpy/python/
+    cp -R lambda/common/atlas_common layers/atlas-common/python/
     
     echo -e "${GREEN}✓ Layers built${NC}"
 }
@@ -88,6 +92,12 @@ build_layers() {
 create_workflow_definition() {
     echo -e "\n${YELLOW}Creating Step Functions definition...${NC}"
     
+    # The checked-in definition (parallel lead/scenario branches, retries) wins
+    if [ -f stepfunctions/workflow-definition.asl.json ]; then
+        echo -e "${GREEN}✓ Using existing workflow definition${NC}"
+        return
+    fi
+    
     mkdir -p stepfunctions
     cat > stepfunctions/workflow-definition.asl.json << 'EOF'
 {
@@ -0,0 +1,34 @@
+from atlas_common.dialer import DialQueue
+from atlas_common.structured_logging import setup_logging
+
+logger = setup_logging()
+
+dial_queue = DialQueue()
+
+def lambda_handler(event, context):
+    """
+    Free a call's active-call slot in the outbound dialer as soon as the call ends.
+
+    Invoked by:
+      - the Amazon Connect DISCONNECTED contact event (EventBridge), for every
+        way a call ends: answered, no answer, busy, voicemail, failed;
+      - the workflow's call timeout/failure paths, with {"interactionKey": ...},
+        in case the contact event never arrived.
+    Releasing an already-free slot is a no-op.
+    """
+    detail = event.get('detail') or {}
+    if detail.get('contactId'):
+        if detail.get('eventType') != 'DISCONNECTED':
+            return {'released': 0}
+        contact_id = detail['contactId']
+        released = dial_queue.release_contact(contact_id)
+        if released:
+            logger.info(f"Released active-call slot for ContactId {contact_id}")
+        return {'released': released}
+
+    interaction_key = event.get('interactionKey')
+    if not interaction_key:
+        raise ValueError("Expected a Connect contact event or an interactionKey")
+    dial_queue.release_active(interaction_key)
+    logger.info(f"Released active-call slot for {interaction_key}")
+    return {'released': 1}
@@ -2,59 +2,113 @@ import json
 import logging
 import boto3
 import os
+import time
 from datetime import datetime, timezone
-from simple_salesforce import Salesforce
 from botocore.exceptions import ClientError
+from atlas_common.salesforce import with_salesforce
+from atlas_common.interactions import INTERACTION_TYPE, InteractionStore, interaction_keys
+from atlas_common.lead_index import LeadIndex
+from atlas_common.structured_logging import setup_logging, log_payload
 
-# Set up logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+# Set up logging (single-line JSON, see atlas_common.structured_logging)
+logger = setup_logging()
 
 # Initialize boto3 clients
-secrets_client = boto3.client('secretsmanager')
 dynamodb_client = boto3.client('dynamodb')
+lead_index = LeadIndex()
+interactions = InteractionStore()
 
-def get_salesforce_credentials(secret_arn):
-    """
-    Retrieve Salesforce JWT credentials from AWS Secrets Manager.
-    """
-    try:
-        logger.info(f"Retrieving credentials from secret: {secret_arn}")
-        response = secrets_client.get_secret_value(SecretId=secret_arn)
-        secret_string = response['SecretString']  # Corrected: Extract 'SecretString'
-        credentials = json.loads(secret_string)
+# ===== Batch mode limits =====
+MAX_BATCH_LEADS = int(os.environ.get('MAX_BATCH_LEADS', '500'))
+SOQL_IN_CHUNK = 200          # phones per "WHERE Phone IN (...)" query
+COLLECTION_LIMIT = 200       # sObject Collections records per request
+DYNAMODB_BATCH_LIMIT = 25    # BatchWriteItem items per request
+BATCH_WRITE_ATTEMPTS = 5
+
+LEAD_COMPANY = 'Atlas Engine Demo'
+
+def build_interaction_item(phone, lead_id, lex_transcript, timestamp):
+    """Low-level item for BatchWriteItem (batch mode; keys are new, so a put can't clobber anything)."""
+    partition_key, sort_key = interaction_keys(phone, timestamp)
+    item = {
+        'PK': {'S': partition_key},
+        'SK': {'S': sort_key},
+        'SalesforceLeadID': {'S': lead_id},
+        'InteractionType': {'S': INTERACTION_TYPE},
+        'InitialTranscript': {'S': json.dumps(lex_transcript or {})}
+    }
+    return partition_key, sort_key, item
+
+def find_or_create_lead(first_name, last_name, phone):
+    """SOQL idempotency check, then Lead.create. Returns the Lead Id."""
+    # First, query for an existing Lead with the same phone number
+    logger.info(f"Searching for existing Lead with phone number: {phone}")
+    query = f"SELECT Id FROM Lead WHERE Phone = '{phone}' LIMIT 1"
+    # Auth token and HTTP connection pool are reused across warm invocations
+    query_result = with_salesforce(lambda sf: sf.query(query))
+    
+    if query_result.get('totalSize', 0) > 0:
+        # If a Lead is found, extract the ID and return it immediately.
+        lead_id = query_result['records'][0]['Id']  # Corrected: Access first record in list
+        logger.info(f"Found existing Lead with ID: {lead_id}. Returning this ID.")
+    else:
+        # If no lead was found, proceed to create a new one.
+        logger.info("No existing Lead found. Creating a new Lead.")
         
-        # Validate that all required credentials for JWT flow are present
-        required_keys = ['username', 'client_id', 'private_key']
-        for key in required_keys:
-            if key not in credentials:
-                raise ValueError(f"Missing required credential for JWT flow: {key}")
+        # Construct the Lead record
+        lead_data = {
+            'FirstName': first_name,
+            'LastName': last_name,
+            'Phone': phone,
+            'Company': LEAD_COMPANY
+        }
+        
+        logger.info(f"Creating Lead with data: {lead_data}")
+        
+        # Insert the new Lead into Salesforce
+        result = with_salesforce(lambda sf: sf.Lead.create(lead_data))
         
-        logger.info("Successfully retrieved Salesforce JWT credentials")
-        return credentials
+        lead_id = result.get('id')
+        if not lead_id:
+            raise Exception(f"Lead creation failed. Salesforce response: {result}")
+        
+        logger.info(f"Successfully created new Lead with ID: {lead_id}")
     
+    return lead_id
+
+def lead_index_get(phone):
+    """Index lookup; an index outage falls back to the SOQL check."""
+    try:
+        return lead_index.get(phone)
     except ClientError as e:
-        logger.error(f"Error retrieving secret: {e}")
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error retrieving credentials: {e}")
-        raise
+        logger.warning(f"Lead index lookup failed, falling back to SOQL: {e}")
+        return None
+
+def lead_index_claim(phone):
+    try:
+        return lead_index.claim(phone)
+    except ClientError as e:
+        logger.warning(f"Lead index claim failed, continuing without it: {e}")
+        return True
+
+def lead_index_put(phone, lead_id):
+    try:
+        lead_index.put(phone, lead_id)
+    except ClientError as e:
+        logger.warning(f"Failed to index Lead {lead_id} for {phone}: {e}")
 
 def lambda_handler(event, context):
     """
     AWS Lambda function to find or create a Lead in Salesforce using JWT Bearer Flow.
     This function is invoked by AWS Step Functions.
+    
+    An event with a 'leads' list (e.g. a marketing event import) is handled
+    by handle_batch instead.
     """
+    if 'leads' in event:
+        return handle_batch(event)
     try:
-        logger.info(f"Received event: {json.dumps(event)}")
-        
-        # Get the secret ARN from an environment variable
-        secret_arn = os.environ.get('SALESFORCE_SECRET_ARN')
-        if not secret_arn:
-            raise ValueError("SALESFORCE_SECRET_ARN environment variable not set.")
-        
-        # Retrieve Salesforce credentials from Secrets Manager
-        credentials = get_salesforce_credentials(secret_arn)
+        log_payload(logger, "Received event", event)
         
         # Extract input data from the Step Functions event
         first_name = event.get('firstName')
@@ -66,62 +120,26 @@ def lambda_handler(event, context):
         
         logger.info(f"Processing Lead for: {first_name} {last_name}, Phone: {phone}")
         
-        # Authenticate with Salesforce using JWT Bearer Flow
-        sf = Salesforce(
-            username=credentials['username'],
-            consumer_key=credentials['client_id'],
-            privatekey=credentials['private_key']
-        )
-        
-        logger.info("Successfully authenticated with Salesforce using JWT Flow")
-        
-        # --- NEW: Idempotency Check ---
-        # First, query for an existing Lead with the same phone number
-        logger.info(f"Searching for existing Lead with phone number: {phone}")
-        query = f"SELECT Id FROM Lead WHERE Phone = '{phone}' LIMIT 1"
-        query_result = sf.query(query)
-        
-        if query_result.get('totalSize', 0) > 0:
-            # If a Lead is found, extract the ID and return it immediately.
-            lead_id = query_result['records'][0]['Id']  # Corrected: Access first record in list
-            logger.info(f"Found existing Lead with ID: {lead_id}. Returning this ID.")
+        # --- Idempotency Check ---
+        # The phone -> LeadId index answers repeat visitors without a Salesforce call;
+        # the claim keeps concurrent executions for one phone from creating two Leads.
+        lead_id = lead_index_get(phone)
+        if lead_id:
+            logger.info(f"Lead index hit for {phone}: {lead_id}")
+        elif lead_index_claim(phone):
+            try:
+                lead_id = find_or_create_lead(first_name, last_name, phone)
+            except Exception:
+                lead_index.release(phone)
+                raise
+            lead_index_put(phone, lead_id)
         else:
-            # If no lead was found, proceed to create a new one.
-            logger.info("No existing Lead found. Creating a new Lead.")
-            
-            # Construct the Lead record
-            lead_data = {
-                'FirstName': first_name,
-                'LastName': last_name,
-                'Phone': phone,
-                'Company': 'Atlas Engine Demo'
-            }
-            
-            logger.info(f"Creating Lead with data: {lead_data}")
-            
-            # Insert the new Lead into Salesforce
-            result = sf.Lead.create(lead_data)
-            
-            lead_id = result.get('id')
-            if not lead_id:
-                raise Exception(f"Lead creation failed. Salesforce response: {result}")
-            
-            logger.info(f"Successfully created new Lead with ID: {lead_id}")
+            logger.info(f"Another execution is resolving the Lead for {phone}; waiting for it")
+            lead_id = lead_index.wait_for(phone) or find_or_create_lead(first_name, last_name, phone)
         
         # Write to DynamoDB AtlasEngineInteractions table
-        interactions_table = os.environ['INTERACTIONS_DYNAMODB_TABLE']
-        partition_key = f"LEAD#{event.get('phone')}"
-        sort_key = f"INTERACTION#{datetime.now(timezone.utc).isoformat()}"
-        
-        dynamodb_client.put_item(
-            TableName=interactions_table,
-            Item={
-                'PK': {'S': partition_key},
-                'SK': {'S': sort_key},
-                'SalesforceLeadID': {'S': lead_id},
-                'InteractionType': {'S': 'CHAT_AND_CALL'},
-                'InitialTranscript': {'S': json.dumps(event.get('lexTranscript', {}))}
-            }
+        partition_key, sort_key = interactions.create(
+            event.get('phone'), lead_id, event.get('lexTranscript'), datetime.now(timezone.utc).isoformat()
         )
         
         logger.info("Successfully created interaction record in DynamoDB")
@@ -136,4 +154,139 @@ def lambda_handler(event, context):
     except Exception as e:
         logger.error(f"Error processing Salesforce Lead: {str(e)}")
         # This will cause the Step Function execution to fail, which is what we want for error handling.
-        raise
\ No newline at end of file
+        raise
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _soql_quote(value):
+    return str(value).replace('\\', '\\\\').replace("'", "\\'")
+
+def find_existing_leads(phones):
+    """Phone -> Lead Id for every phone that already has a Lead (one query per 200 phones)."""
+    existing = {}
+    for chunk in _chunks(phones, SOQL_IN_CHUNK):
+        phone_list = ', '.join(f"'{_soql_quote(phone)}'" for phone in chunk)
+        query = f"SELECT Id, Phone FROM Lead WHERE Phone IN ({phone_list})"
+        result = with_salesforce(lambda sf: sf.query_all(query))
+        for record in result.get('records', []):
+            existing.setdefault(record['Phone'], record['Id'])
+    return existing
+
+def create_leads(leads):
+    """Create leads via sObject Collections (200 per request). Returns phone -> (lead_id, error)."""
+    outcomes = {}
+    for chunk in _chunks(leads, COLLECTION_LIMIT):
+        body = {
+            'allOrNone': False,
+            'records': [
+                {
+                    'attributes': {'type': 'Lead'},
+                    'FirstName': lead['firstName'],
+                    'LastName': lead['lastName'],
+                    'Phone': lead['phone'],
+                    'Company': LEAD_COMPANY
+                }
+                for lead in chunk
+            ]
+        }
+        response = with_salesforce(lambda sf: sf.restful('composite/sobjects', method='POST', json=body))
+        for lead, result in zip(chunk, response):
+            if result.get('success'):
+                outcomes[lead['phone']] = (result['id'], None)
+            else:
+                messages = '; '.join(error.get('message', '') for error in result.get('errors', []))
+                outcomes[lead['phone']] = (None, messages or 'Lead creation failed')
+    return outcomes
+
+def batch_write_interactions(table_name, items):
+    """BatchWriteItem in chunks of 25, retrying unprocessed items. Returns the PKs never written."""
+    unwritten = set()
+    for chunk in _chunks(items, DYNAMODB_BATCH_LIMIT):
+        request = {table_name: [{'PutRequest': {'Item': item}} for item in chunk]}
+        for attempt in range(BATCH_WRITE_ATTEMPTS):
+            response = dynamodb_client.batch_write_item(RequestItems=request)
+            request = response.get('UnprocessedItems') or {}
+            if not request:
+                break
+            time.sleep(0.05 * 2 ** attempt)
+        for put in request.get(table_name, []):
+            unwritten.add(put['PutRequest']['Item']['PK']['S'])
+    return unwritten
+
+def handle_batch(event):
+    """
+    Upsert many leads at once:
+      1. dedupe by phone against the Lead index, then WHERE Phone IN (...) queries for misses,
+      2. create the missing Leads with sObject Collections,
+      3. write the interaction records with BatchWriteItem.
+    Returns one result per input lead, in input order; a bad lead doesn't fail the batch.
+    """
+    leads = event.get('leads') or []
+    if len(leads) > MAX_BATCH_LEADS:
+        raise ValueError(f"Batch of {len(leads)} leads exceeds MAX_BATCH_LEADS ({MAX_BATCH_LEADS})")
+    logger.info(f"Batch upsert of {len(leads)} leads")
+    
+    results = []
+    unique = {}
+    for lead in leads:
+        if not all([lead.get('firstName'), lead.get('lastName'), lead.get('phone')]):
+            results.append({'phone': lead.get('phone'), 'status': 'failed',
+                            'error': 'firstName, lastName, and phone are required'})
+            continue
+        if lead['phone'] in unique:
+            results.append({'phone': lead['phone'], 'status': 'duplicate'})
+            continue
+        unique[lead['phone']] = lead
+        results.append({'phone': lead['phone'], 'status': None})
+    
+    try:
+        indexed = lead_index.get_many(list(unique))
+    except ClientError as e:
+        logger.warning(f"Lead index lookup failed, falling back to SOQL: {e}")
+        indexed = {}
+    existing = dict(indexed)
+    existing.update(find_existing_leads([phone for phone in unique if phone not in indexed]))
+    created = create_leads([lead for phone, lead in unique.items() if phone not in existing])
+    logger.info(f"Batch: {len(indexed)} index hits, {len(existing) - len(indexed)} SOQL hits, "
+                f"{len(created)} create attempts")
+    
+    new_entries = {phone: lead_id for phone, lead_id in existing.items() if phone not in indexed}
+    new_entries.update({phone: lead_id for phone, (lead_id, _) in created.items() if lead_id})
+    try:
+        lead_index.put_many(new_entries)
+    except ClientError as e:
+        logger.warning(f"Failed to index {len(new_entries)} Leads: {e}")
+    
+    timestamp = datetime.now(timezone.utc).isoformat()
+    items = []
+    keys = {}
+    for phone, lead in unique.items():
+        lead_id, error = (existing[phone], None) if phone in existing else created[phone]
+        if lead_id:
+            partition_key, sort_key, item = build_interaction_item(phone, lead_id, lead.get('lexTranscript'), timestamp)
+            items.append(item)
+            keys[phone] = {'leadId': lead_id, 'partitionKey': partition_key, 'sortKey': sort_key,
+                           'status': 'existing' if phone in existing else 'created'}
+        else:
+            keys[phone] = {'status': 'failed', 'error': error}
+    
+    unwritten = batch_write_interactions(os.environ['INTERACTIONS_DYNAMODB_TABLE'], items)
+    
+    for result in results:
+        if result['status'] == 'failed':
+            continue
+        outcome = keys[result['phone']]
+        if result['status'] == 'duplicate':
+            # Same Lead as the first occurrence; keep the 'duplicate' marker
+            outcome = {k: v for k, v in outcome.items() if k != 'status'}
+        result.update(outcome)
+        if result.get('partitionKey') in unwritten:
+            result['error'] = 'Interaction record was not written'
+    
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    logger.info(f"Batch upsert complete: {counts}")
+    return {'results': results, 'counts': counts}
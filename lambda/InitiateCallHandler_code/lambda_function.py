@@ -2,14 +2,14 @@ import boto3
 import os
 import json
 import logging
+from atlas_common.correlation import ContactCorrelation
+from atlas_common.structured_logging import setup_logging
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = setup_logging()
 
 connect_client = boto3.client('connect')
 sfn_client = boto3.client('stepfunctions')
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ.get('TASK_TOKENS_TABLE', 'AtlasEngineTaskTokens'))
+correlations = ContactCorrelation()
 
 def lambda_handler(event, context):
     """
@@ -53,13 +53,7 @@ def lambda_handler(event, context):
         logger.info(f"Successfully initiated call with ContactId: {contact_id}")
 
         # Store the mapping in DynamoDB to link the call to the paused workflow
-        table.put_item(
-            Item={
-                'ContactId': contact_id,
-                'TaskToken': task_token,
-                'LeadId': lead_id
-            }
-        )
+        correlations.put(contact_id, lead_id, task_token)
         logger.info(f"Stored mapping for ContactId {contact_id} in DynamoDB.")
 
         # Return an empty object. The function's job is done.
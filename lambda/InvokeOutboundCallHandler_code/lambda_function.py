@@ -4,16 +4,24 @@ import boto3
 import logging
 import traceback
 from botocore.exceptions import ClientError
+from atlas_common.structured_logging import setup_logging, log_payload
+from atlas_common.dialer import DialQueue, place_call
+from atlas_common.correlation import ContactCorrelation
+from atlas_common.interactions import InteractionStore
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = setup_logging()
 
-connect = boto3.client('connect')
-dynamodb = boto3.resource('dynamodb')
+interactions = InteractionStore()
+correlations = ContactCorrelation()
 sfn_client = boto3.client('stepfunctions')
+lambda_client = boto3.client('lambda')
+
+# Calls are paced by OutboundDialerHandler; unset = dial immediately (local runs)
+OUTBOUND_DIALER_FUNCTION = os.environ.get('OUTBOUND_DIALER_FUNCTION')
+dial_queue = DialQueue() if OUTBOUND_DIALER_FUNCTION else None
 
 def lambda_handler(event, context):
-    logger.info(f"Full event: {json.dumps(event)}")
+    log_payload(logger, "Full event", event)
     task_token = None
 
     try:
@@ -30,8 +38,6 @@ def lambda_handler(event, context):
         table_name = os.environ['INTERACTIONS_DYNAMODB_TABLE']
         logger.info(f"Env vars - InstanceId: {instance_id}, ContactFlowId: {contact_flow_id}, Table: {table_name}")
         
-        table = dynamodb.Table(table_name)
-        
         # Extract and validate input data
         phone_number = input_data.get('phone')
         if not phone_number:
@@ -51,45 +57,42 @@ def lambda_handler(event, context):
             raise ValueError(f"Missing salesforce data - leadId: {lead_id}, pk: {pk}, sk: {sk}")
         logger.info(f"Salesforce - LeadId: {lead_id}, PK: {pk}, SK: {sk}")
         
-        # Store scenario in DynamoDB first (too large for Connect attributes)
+        # Store scenario in DynamoDB first (too large for Connect attributes).
+        # UpdateItem, not put_item: CreateLead's attributes on this item must survive.
         interaction_key = f"{pk}#{sk}"
         logger.info(f"Storing scenario in DynamoDB with key: {interaction_key}")
-        table.put_item(
-            Item={
-                'PK': pk,
-                'SK': sk,
-                'DynamicScenario': scenario,
-                'LeadId': lead_id,
-                'StepFunctionTaskToken': task_token
-            }
-        )
+        interactions.attach_call(pk, sk, lead_id, scenario, task_token)
+        
+        dial_request = {
+            'phone': phone_number,
+            'interactionKey': interaction_key,
+            'leadId': lead_id,
+            'pk': pk,
+            'sk': sk,
+            'taskToken': task_token
+        }
         
-        logger.info("Preparing to call connect.start_outbound_voice_contact...")
-        response = connect.start_outbound_voice_contact(
-            DestinationPhoneNumber=phone_number,
-            ContactFlowId=contact_flow_id,
-            InstanceId=instance_id,
-            SourcePhoneNumber=source_phone_number,
-            Attributes={
-                'interactionKey': interaction_key,
-                'leadId': lead_id
+        if dial_queue is None:
+            contact_id = place_call(dial_request, interactions, correlations)
+            logger.info(f"Call started. ContactId: {contact_id}. PK={pk}, SK={sk}")
+            return {
+                'statusCode': 200,
+                'body': json.dumps({'status': 'Call Initiated', 'ContactId': contact_id})
             }
-        )
-
-        contact_id = response['ContactId']
-        logger.info(f"Call started. ContactId: {contact_id}")
-
-        logger.info("Updating DynamoDB with ContactId...")
-        table.update_item(
-            Key={'PK': pk, 'SK': sk},
-            UpdateExpression='SET ContactId = :cid',
-            ExpressionAttributeValues={':cid': contact_id}
-        )
-        logger.info(f"DynamoDB updated. Function complete. PK={pk}, SK={sk}")
-
+        
+        # The dialer places the call within the rate/concurrency limits; the task
+        # token stays parked until the call summary (or a dial failure) resolves it.
+        dial_queue.enqueue(interaction_key, dial_request)
+        logger.info(f"Dial request queued. PK={pk}, SK={sk}")
+        try:
+            lambda_client.invoke(FunctionName=OUTBOUND_DIALER_FUNCTION, InvocationType='Event', Payload=b'{}')
+        except ClientError as e:
+            # The dialer's schedule picks the request up anyway
+            logger.warning(f"Failed to wake the outbound dialer: {e}")
+        
         return {
             'statusCode': 200,
-            'body': json.dumps({'status': 'Call Initiated', 'ContactId': contact_id})
+            'body': json.dumps({'status': 'Call Queued', 'interactionKey': interaction_key})
         }
 
     except Exception as e:
@@ -1,92 +1,129 @@
 import json
 import os
 import boto3
-import phonenumbers
 import logging
-import requests
-from simple_salesforce import Salesforce
-from simple_salesforce.exceptions import SalesforceAuthenticationFailed
-from jwt import encode, decode
-from datetime import datetime, timedelta
+import uuid
 from botocore.exceptions import ClientError
+from atlas_common.phone import to_e164
+from atlas_common.bedrock_gateway import BedrockGateway, anthropic_body
+from atlas_common.response_cache import ResponseCache
+from atlas_common.paraphrase_pool import ParaphrasePool
+from atlas_common.deadline import Deadline, invoke_with_deadline
+from atlas_common.history import ConversationHistory
+from atlas_common.cache import TTLCache
+from atlas_common.claim_check import ClaimCheck
+from atlas_common.structured_logging import setup_logging, log_event, log_payload
+from atlas_common import side_effects
 
 # ===== NEW: Setup Logging =====
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = setup_logging()
 
 # ===== Initialize clients/resources =====
 stepfunctions_client = boto3.client('stepfunctions')
-bedrock_client = boto3.client('bedrock-runtime')
+bedrock = BedrockGateway()
 sns_client = boto3.client('sns')
+lambda_client = boto3.client('lambda')
+dynamodb = boto3.resource('dynamodb')
 
 # ===== NEW: Bedrock Model ID from Env Vars =====
 # Using Haiku for faster response times on voice calls
 ANTHROPIC_MODEL_ID = os.environ.get('ANTHROPIC_MODEL_ID', 'anthropic.claude-3-5-haiku-20241022-v1:0')
 SALES_TEAM_TOPIC_ARN = os.environ.get('SALES_TEAM_TOPIC_ARN')
+INTERACTIONS_DYNAMODB_TABLE = os.environ.get('INTERACTIONS_DYNAMODB_TABLE')
 
-# ===== Conversation History Helper =====
-def update_conversation_history(event, session_state, bot_response, max_turns=10):
+# ===== Per-container cache of phone-call context, keyed by interactionKey =====
+# The scenario for an interaction never changes, so fetch it once per call.
+call_context_cache = TTLCache(max_size=128, ttl_seconds=3600)
+# Calls without an interactionKey carry the scenario in the session; keep only a reference there
+session_values = ClaimCheck()
+
+# ===== Streaming: stop reading Bedrock once we have a speakable answer =====
+BEDROCK_STREAMING = os.environ.get('BEDROCK_STREAMING', 'true').lower() == 'true'
+STREAM_MAX_CHARS = int(os.environ.get('STREAM_MAX_CHARS', '450'))
+
+# ===== Per-turn latency budget, set by lambda_handler (None = no deadline) =====
+current_deadline = None
+
+# ===== Response cache for grounded intent replies (in-container LRU + DynamoDB TTL) =====
+response_cache = ResponseCache()
+
+# ===== Static grounding text for generative intents =====
+# Also used to build the paraphrase pools, so keep one source of truth here.
+STATIC_INTENT_CONTEXTS = {
+    'GreetingIntent': "Hi there! I'm Michael's AI assistant showcasing enterprise-grade conversational AI. Ready to see something impressive? Just say 'start demo' to begin!",
+    'AboutTechnologyIntent': (
+        "This demo leverages AWS serverless architecture: Amazon Lex for natural language understanding, "
+        "Lambda for compute, Step Functions for orchestration, Bedrock for AI, and Amazon Connect for outbound calling. "
+        "Everything integrates with Salesforce in real-time. For complete architecture details including C4 diagrams and code, "
+        "check out the full documentation linked from the demo site."
+    ),
+    'AboutDemoIntent': (
+        "This is an end-to-end sales acceleration workflow: AI-powered outbound calling with real-time Salesforce integration, "
+        "personalized conversations using customer data, and intelligent lead qualification. It's an enterprise-grade prototype "
+        "delivered in record time, demonstrating how modern serverless architecture enables rapid innovation without sacrificing quality."
+    ),
+    'FallbackIntent': (
+        "I didn't quite catch that. Here's what I can help with: Say 'start demo' to begin the experience, "
+        "ask 'what technology powers this' for technical details, 'tell me about the demo' for an overview, "
+        "or 'delete my info' to remove your data. What would you like to do?"
+    ),
+}
+
+# ===== Conversation History Helpers =====
+# History is a bounded ring buffer of turns serialized into one compact
+# session attribute; render() is the only form used in prompts.
+def load_history(session_state):
     session_attributes = session_state.get('sessionAttributes', {}) or {}
-    conversation_history = session_attributes.get('conversationHistory', '')
+    return ConversationHistory.deserialize(session_attributes.get('conversationHistory', ''))
+
+def update_conversation_history(event, session_state, bot_response):
+    history = load_history(session_state)
     user_input = event.get('inputTranscript', '')
     
     # Check if this exact exchange already exists at the end
-    last_line = conversation_history.strip().split('\n')[-1] if conversation_history.strip() else ''
-    if last_line == f"Bot: {bot_response}":
-        return conversation_history  # Already added, don't duplicate
-    
-    new_turn = f"User: {user_input}\nBot: {bot_response}\n"
-    updated_history = (conversation_history + new_turn).splitlines()
-    trimmed_history = "\n".join(updated_history[-max_turns*2:])
-    return trimmed_history
-
-# ===== Salesforce auth (full JWT from Session 2) =====
-def get_sf_connection():
-    secret_arn = os.environ['SALESFORCE_SECRET_ARN']
-    secrets_client = boto3.client('secretsmanager')
-    secret = secrets_client.get_secret_value(SecretId=secret_arn)
-    creds = json.loads(secret['SecretString'])
-    
-    # Determine the OAuth endpoint (sandbox vs production)
-    is_sandbox = creds.get('is_sandbox', False)  # Add this to your secret if using sandbox
-    endpoint = 'https://test.salesforce.com' if is_sandbox else 'https://login.salesforce.com'
-    
-    # Step 1: Create the JWT
-    now = datetime.utcnow()
-    payload = {
-        'iss': creds['client_id'],
-        'sub': creds['username'],
-        'aud': endpoint,
-        'exp': now + timedelta(minutes=5)
-    }
-    
-    private_key = creds['private_key']
-    jwt_token = encode(payload, private_key, algorithm='RS256')
-    
-    # Step 2: Exchange JWT for access token
-    result = requests.post(
-        endpoint + '/services/oauth2/token',
-        data={
-            'grant_type': 'urn:ietf:params:oauth:grant-type:jwt-bearer',
-            'assertion': jwt_token
-        }
-    )
+    if history.last_bot == bot_response:
+        return history.serialize()  # Already added, don't duplicate
     
-    body = result.json()
-    
-    if result.status_code != 200:
-        logger.error(f"[SF AUTH] JWT exchange failed: {body}")
-        raise SalesforceAuthenticationFailed(body.get('error', 'Unknown'), 
-                                            body.get('error_description', 'JWT token exchange failed'))
-    
-    # Step 3: Initialize Salesforce with the access token and instance URL
-    logger.info(f"[SF AUTH] Successfully authenticated. Instance: {body['instance_url']}")
-    return Salesforce(instance_url=body['instance_url'], session_id=body['access_token'])
+    history.add(user_input, bot_response)
+    return history.serialize()
 
 # ============================================================================
 # ===== NEW: GENERATIVE RESPONSE HANDLER =====
 # ============================================================================
-def generate_dynamic_response(base_context, history, user_input):
+def invoke_bedrock_text(body, max_sentences, log_tag, operation):
+    """
+    Invokes Bedrock (streaming with early return, or blocking) and returns the text.
+    Raises on any error or an empty completion.
+    """
+    if BEDROCK_STREAMING:
+        result = bedrock.stream(body, ANTHROPIC_MODEL_ID, operation=operation,
+                                max_sentences=max_sentences, max_chars=STREAM_MAX_CHARS)
+        logger.info(f"{log_tag} Streamed response: ttft={result.time_to_first_token}s "
+                    f"ttfs={result.time_to_first_sentence}s total={result.total_time}s "
+                    f"stopped_early={result.stopped_early}")
+        text = result.text
+    else:
+        text = bedrock.complete(body, ANTHROPIC_MODEL_ID, operation=operation).text
+    if not text:
+        raise ValueError("Empty response from Bedrock")
+    return text
+
+def run_with_deadline(invoke, fallback, label, log_tag):
+    """
+    Runs invoke() within the current turn's latency budget. Returns the
+    fallback as soon as the budget is exhausted or the call fails.
+    """
+    if current_deadline is None:
+        try:
+            return invoke()
+        except Exception as e:
+            logger.error(f"{log_tag} Error invoking model: {e}")
+            return fallback
+    content, outcome = invoke_with_deadline(invoke, current_deadline, fallback, label=label)
+    logger.info(f"{log_tag} Deadline outcome for {label}: {outcome}")
+    return content
+
+def generate_dynamic_response(base_context, history, user_input, intent_name=None):
     """
     Uses Bedrock to rephrase a static response based on conversation context.
     """
@@ -117,36 +154,77 @@ Your *only* goal is to provide the information in the <grounding_context> in a n
 
 A:"""
 
-    body = json.dumps({
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 512,
-        "system": "IMPORTANT: You are an AI assistant named Atlas, from the Atlas Engine. You are NOT a human. You MUST NEVER, under any circumstances, claim to be a real person. Always refer to yourself as an AI assistant. Your goal is to be helpful and conversational, encouraging them to ask to speak to the creator.",
-        "messages": [
-            {
-                "role": "user",
-                "content": [{"type": "text", "text": prompt}]
-            }
-        ]
-    })
+    body = anthropic_body(
+        prompt,
+        max_tokens=512,
+        system="IMPORTANT: You are an AI assistant named Atlas, from the Atlas Engine. You are NOT a human. You MUST NEVER, under any circumstances, claim to be a real person. Always refer to yourself as an AI assistant. Your goal is to be helpful and conversational, encouraging them to ask to speak to the creator."
+    )
     
+    def invoke():
+        generated_text = invoke_bedrock_text(body, max_sentences=3, log_tag="[Bedrock]", operation="GroundedResponse")
+        logger.info(f"[Bedrock] Generated text: {generated_text}")
+        return generated_text
+
+    # Fallback to the static content if Bedrock fails or runs past the budget
+    return run_with_deadline(invoke, base_context, intent_name or 'GroundedResponse', "[Bedrock]")
+
+# ===== Paraphrase pools: pre-generated variants of the static contexts =====
+PARAPHRASE_POOL_ENABLED = os.environ.get('PARAPHRASE_POOL_ENABLED', 'true').lower() == 'true'
+paraphrase_pool = ParaphrasePool(lambda base_context: generate_dynamic_response(base_context, '', ''))
+
+def last_bot_reply(history):
+    for line in reversed((history or '').splitlines()):
+        if line.startswith('Bot: '):
+            return line[len('Bot: '):]
+    return None
+
+def request_pool_refresh(intent_name):
+    """Asynchronously re-invoke this function to rebuild one pool off the request path."""
     try:
-        response = bedrock_client.invoke_model(
-            body=body,
-            modelId=ANTHROPIC_MODEL_ID,
-            contentType='application/json',
-            accept='application/json'
+        lambda_client.invoke(
+            FunctionName=os.environ['AWS_LAMBDA_FUNCTION_NAME'],
+            InvocationType='Event',
+            Payload=json.dumps({'action': 'refreshParaphrasePools', 'intents': [intent_name]})
         )
-        
-        response_body = json.loads(response.get('body').read())
-        generated_text = response_body.get('content')[0].get('text')
-        
-        logger.info(f"[Bedrock] Generated text: {generated_text}")
-        return generated_text.strip()
-        
+        logger.info(f"[POOL] Requested async refresh for {intent_name}")
     except Exception as e:
-        logger.error(f"[Bedrock] Error invoking model: {e}")
-        # Fallback to the static content if Bedrock fails
-        return base_context
+        logger.error(f"[POOL] Failed to request refresh for {intent_name}: {e}")
+
+def refresh_paraphrase_pools(intent_names=None):
+    """Handles scheduled and on-demand pool refreshes."""
+    results = {}
+    for intent_name in intent_names or list(STATIC_INTENT_CONTEXTS):
+        base_context = STATIC_INTENT_CONTEXTS.get(intent_name)
+        if base_context:
+            results[intent_name] = paraphrase_pool.refresh(intent_name, base_context)
+    logger.info(f"[POOL] Refresh complete: {results}")
+    return {'refreshed': results}
+
+def get_grounded_response(intent_name, base_context, history, user_input):
+    """
+    Returns a pre-generated paraphrase from the intent's pool when one is
+    available. Otherwise returns a cached paraphrase for (intent, normalized
+    input, recent history) if one exists, or generates one with Bedrock and caches it.
+    """
+    if PARAPHRASE_POOL_ENABLED and intent_name in STATIC_INTENT_CONTEXTS:
+        variant = paraphrase_pool.pick(intent_name, base_context, exclude=last_bot_reply(history))
+        if paraphrase_pool.should_request_refresh(intent_name, base_context):
+            request_pool_refresh(intent_name)
+        if variant:
+            logger.info(f"[POOL] Served {intent_name} from paraphrase pool")
+            return variant
+
+    cached = response_cache.get(intent_name, user_input, history)
+    if cached:
+        logger.info(f"[CACHE] Hit for {intent_name}. Stats: {response_cache.stats()}")
+        return cached
+
+    content = generate_dynamic_response(base_context, history, user_input, intent_name)
+    # Don't cache the static fallback returned when Bedrock fails
+    if content != base_context:
+        response_cache.put(intent_name, user_input, history, content)
+    logger.info(f"[CACHE] Miss for {intent_name}. Stats: {response_cache.stats()}")
+    return content
 
 # ============================================================================
 # INTENT HANDLERS (Now with Generative Responses)
@@ -156,17 +234,16 @@ def handle_greeting_intent(event, session_state, intent_name):
     logger.info(f"[HANDLER] GreetingIntent triggered")
     
     # This is the static, "ground truth" response
-    base_context = "Hi there! I'm Michael's AI assistant showcasing enterprise-grade conversational AI. Ready to see something impressive? Just say 'start demo' to begin!"
+    base_context = STATIC_INTENT_CONTEXTS['GreetingIntent']
     
-    session_attributes = session_state.get('sessionAttributes', {}) or {}
-    history = session_attributes.get('conversationHistory', '')
+    history = load_history(session_state).render()
     user_input = event.get('inputTranscript', '')
 
-    # Generate the dynamic response
-    content = generate_dynamic_response(base_context, history, user_input)
+    # Generate the dynamic response (or reuse a cached one)
+    content = get_grounded_response(intent_name, base_context, history, user_input)
     
     updated_history = update_conversation_history(event, session_state, content)
-    logger.info(f"[HISTORY] Updated conversation history:\n{updated_history}")
+    logger.info(f"[HISTORY] Updated conversation history ({len(updated_history)} chars)")
     
     # Check if this is a dialog code hook (invocationSource)
     invocation_source = event.get('invocationSource', 'FulfillmentCodeHook')
@@ -192,21 +269,15 @@ def handle_greeting_intent(event, session_state, intent_name):
 def handle_about_technology_intent(event, session_state, intent_name):
     logger.info(f"[HANDLER] AboutTechnologyIntent triggered")
     
-    base_context = (
-        "This demo leverages AWS serverless architecture: Amazon Lex for natural language understanding, "
-        "Lambda for compute, Step Functions for orchestration, Bedrock for AI, and Amazon Connect for outbound calling. "
-        "Everything integrates with Salesforce in real-time. For complete architecture details including C4 diagrams and code, "
-        "check out the full documentation linked from the demo site."
-    )
+    base_context = STATIC_INTENT_CONTEXTS['AboutTechnologyIntent']
     
-    session_attributes = session_state.get('sessionAttributes', {}) or {}
-    history = session_attributes.get('conversationHistory', '')
+    history = load_history(session_state).render()
     user_input = event.get('inputTranscript', '')
 
-    content = generate_dynamic_response(base_context, history, user_input)
+    content = get_grounded_response(intent_name, base_context, history, user_input)
     
     updated_history = update_conversation_history(event, session_state, content)
-    logger.info(f"[HISTORY] Updated conversation history:\n{updated_history}")
+    logger.info(f"[HISTORY] Updated conversation history ({len(updated_history)} chars)")
     
     return {
         'sessionState': {
@@ -220,20 +291,15 @@ def handle_about_technology_intent(event, session_state, intent_name):
 def handle_about_demo_intent(event, session_state, intent_name):
     logger.info(f"[HANDLER] AboutDemoIntent triggered")
     
-    base_context = (
-        "This is an end-to-end sales acceleration workflow: AI-powered outbound calling with real-time Salesforce integration, "
-        "personalized conversations using customer data, and intelligent lead qualification. It's an enterprise-grade prototype "
-        "delivered in record time, demonstrating how modern serverless architecture enables rapid innovation without sacrificing quality."
-    )
+    base_context = STATIC_INTENT_CONTEXTS['AboutDemoIntent']
     
-    session_attributes = session_state.get('sessionAttributes', {}) or {}
-    history = session_attributes.get('conversationHistory', '')
+    history = load_history(session_state).render()
     user_input = event.get('inputTranscript', '')
 
-    content = generate_dynamic_response(base_context, history, user_input)
+    content = get_grounded_response(intent_name, base_context, history, user_input)
     
     updated_history = update_conversation_history(event, session_state, content)
-    logger.info(f"[HISTORY] Updated conversation history:\n{updated_history}")
+    logger.info(f"[HISTORY] Updated conversation history ({len(updated_history)} chars)")
     
     return {
         'sessionState': {
@@ -259,31 +325,23 @@ def handle_delete_my_info_intent(event, session_state, intent_name):
         last_name_raw = last_name_slot['value'].get('interpretedValue')
 
         try:
-            # Validate and format phone number
-            parsed_number = phonenumbers.parse(phone_number_raw, "US")
-            e164_phone = phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.E164)
+            # Format phone number (fast path; phonenumbers only for exotic input)
+            e164_phone = to_e164(phone_number_raw, validate=False)
             
-            # Sanitize last name - SOQL escaping + case-insensitive
+            # Normalize last name; the worker escapes it for SOQL
             last_name = last_name_raw.strip().title()  # Normalize: "smith" -> "Smith"
-            safe_last_name = last_name.replace("'", "''")  # FIXED: SOQL uses '' not \'
-            
-            logger.info(f"[DELETE] Attempting to find Lead with phone: {e164_phone} AND LastName: {last_name}")
             
-            # Query with both phone AND last name for security
-            sf = get_sf_connection()
-            query = f"SELECT Id FROM Lead WHERE Phone = '{e164_phone}' AND LastName = '{safe_last_name}' LIMIT 1"
-            logger.info(f"[DELETE] SOQL Query: {query}")
-            
-            query_result = sf.query(query)
-            
-            if query_result['totalSize'] > 0:
-                lead_id = query_result['records'][0]['Id']
-                sf.Lead.delete(lead_id)
-                logger.info(f"[DELETE] Successfully deleted Lead: {lead_id}")
-                content = "Your information has been successfully verified and completely removed from our systems. This demonstrates our commitment to data privacy and compliance - essential for enterprise solutions."
-            else:
-                logger.info(f"[DELETE] No Lead found matching criteria.")
-                content = "I was unable to find a record matching that phone number and last name. Please verify your information and try again."
+            # Lookup + delete run in the side-effect worker; the caller gets an answer now.
+            # Keyed on this request, not the phone/name: a repeat request (e.g. after a
+            # new Lead for the number) must delete again, only a redelivery is a duplicate.
+            request_id = session_state.get('originatingRequestId') or str(uuid.uuid4())
+            side_effects.enqueue(
+                side_effects.DELETE_LEAD,
+                {'phone': e164_phone, 'lastName': last_name},
+                idempotency_key=f"delete#{event.get('sessionId', '')}#{request_id}",
+            )
+            logger.info(f"[DELETE] Queued deletion for phone: {e164_phone} AND LastName: {last_name}")
+            content = "Thank you. Your deletion request has been received, and any record matching that phone number and last name will be completely removed from our systems. This demonstrates our commitment to data privacy and compliance - essential for enterprise solutions."
         
         except Exception as e:
             logger.error(f"[ERROR] Delete operation failed: {e}")
@@ -294,7 +352,7 @@ def handle_delete_my_info_intent(event, session_state, intent_name):
 
     # STATIC RESPONSE - No AI generation for compliance-critical operations
     updated_history = update_conversation_history(event, session_state, content)
-    logger.info(f"[HISTORY] Updated conversation history:\n{updated_history}")
+    logger.info(f"[HISTORY] Updated conversation history ({len(updated_history)} chars)")
     
     return {
         'sessionState': {
@@ -308,20 +366,15 @@ def handle_delete_my_info_intent(event, session_state, intent_name):
 def handle_fallback_intent(event, session_state, intent_name):
     logger.info(f"[HANDLER] FallbackIntent triggered")
     
-    base_context = (
-        "I didn't quite catch that. Here's what I can help with: Say 'start demo' to begin the experience, "
-        "ask 'what technology powers this' for technical details, 'tell me about the demo' for an overview, "
-        "or 'delete my info' to remove your data. What would you like to do?"
-    )
+    base_context = STATIC_INTENT_CONTEXTS['FallbackIntent']
     
-    session_attributes = session_state.get('sessionAttributes', {}) or {}
-    history = session_attributes.get('conversationHistory', '')
+    history = load_history(session_state).render()
     user_input = event.get('inputTranscript', '')
 
-    content = generate_dynamic_response(base_context, history, user_input)
+    content = get_grounded_response(intent_name, base_context, history, user_input)
     
     updated_history = update_conversation_history(event, session_state, content)
-    logger.info(f"[HISTORY] Updated conversation history:\n{updated_history}")
+    logger.info(f"[HISTORY] Updated conversation history ({len(updated_history)} chars)")
     
     return {
         'sessionState': {
@@ -361,19 +414,23 @@ def handle_callback_intent(event, session_state, intent_name, dynamodb_item=None
             fulfillment_state = "Failed"
         else:
             try:
-                sf = get_sf_connection()
                 case_data = {
                     'Subject': 'Atlas Engine: Callback Request',
                     'Description': f'User requested a callback ("talk to creator") during the outbound AI call. Lead ID: {lead_id}',
                     'Status': 'New',
                     'Origin': 'Phone (AI)'
                 }
-                result = sf.Case.create(case_data)
-                logger.info(f"[HANDLER] Successfully created Case {result['id']} for Lead {lead_id}")
+                # The Case is created by the side-effect worker; one per call session
+                side_effects.enqueue(
+                    side_effects.CREATE_CALLBACK_CASE,
+                    case_data,
+                    idempotency_key=f"callback#{lead_id}#{event.get('sessionId', '')}",
+                )
+                logger.info(f"[HANDLER] Queued callback Case for Lead {lead_id}")
                 response_message = "Thank you. I've created a priority request for our team, and someone will call you back shortly. Have a great day."
                 fulfillment_state = "Fulfilled"
             except Exception as e:
-                logger.error(f"[HANDLER] Failed to create Salesforce Case: {str(e)}")
+                logger.error(f"[HANDLER] Failed to queue Salesforce Case: {str(e)}")
                 response_message = "I'm sorry, I ran into an error trying to process your request. Please try again."
                 fulfillment_state = "Failed"
 
@@ -423,10 +480,8 @@ def handle_initiate_demo_intent(event, session_state, intent_name):
         
     # --- PHONE NUMBER TRANSFORMATION ---
     try:
-        parsed_number = phonenumbers.parse(phone_number_raw, "US")
-        if not phonenumbers.is_valid_number(parsed_number):
-            raise ValueError("The provided phone number is not valid.")
-        e164_phone_number = phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.E164)
+        # Raises InvalidPhoneNumber (a ValueError) for invalid numbers
+        e164_phone_number = to_e164(phone_number_raw)
         logger.info(f"[PHONE] Transformed '{phone_number_raw}' to E164: {e164_phone_number}")
     except Exception as e:
         logger.error(f"[ERROR] Phone validation failed for '{phone_number_raw}': {e}")
@@ -446,14 +501,9 @@ def handle_initiate_demo_intent(event, session_state, intent_name):
 
     session_attributes = session_state.get('sessionAttributes', {}) or {}
     try:
-        conversation_history = session_attributes.get('conversationHistory', '')
-        user_input = event.get('inputTranscript', '')
-        if user_input:
-            conversation_history += f"User: {user_input}\n"
-        
-        history_lines = conversation_history.splitlines()
-        limited_history = "\n".join(history_lines[-20:])
-        logger.info(f"[HISTORY] Passing transcript to scenario generator:\n{limited_history}")
+        # Already bounded by the history character budget
+        limited_history = load_history(session_state).render(pending_user_input=event.get('inputTranscript', ''))
+        logger.info(f"[HISTORY] Passing transcript to scenario generator ({len(limited_history)} chars)")
         
         sfn_input = {
             'firstName': first_name,
@@ -462,7 +512,7 @@ def handle_initiate_demo_intent(event, session_state, intent_name):
             'chat_transcript': limited_history
         }
 
-        logger.info(f"[SFN] Starting execution with input: {json.dumps(sfn_input)}")
+        log_event(logger, logging.INFO, {'event': 'sfn_start', 'input': sfn_input}, "[SFN] Starting execution")
         response = stepfunctions_client.start_execution(
             stateMachineArn=state_machine_arn,
             input=json.dumps(sfn_input)
@@ -471,7 +521,7 @@ def handle_initiate_demo_intent(event, session_state, intent_name):
 
         success_message = f"Thank you for your interest, {first_name}! I'll reach out within 2 minutes. Prefer scheduling tools like Calendly? Let me know during our call!"
         updated_history = update_conversation_history(event, session_state, success_message)
-        logger.info(f"[HISTORY] Updated conversation history:\n{updated_history}")
+        logger.info(f"[HISTORY] Updated conversation history ({len(updated_history)} chars)")
         
         return {
             'sessionState': {
@@ -496,6 +546,44 @@ def handle_initiate_demo_intent(event, session_state, intent_name):
 # PHONE CALL HANDLER - Uses dynamicScenario context
 # ============================================================================
 
+def parse_interaction_key(interaction_key):
+    """
+    interactionKey format: LEAD#<PHONE_NUMBER>#INTERACTION#2025-10-26T06:07:12.367643+00:00
+    Split into PK (LEAD#<PHONE_NUMBER>) and SK (INTERACTION#2025-10-26T06:07:12.367643+00:00)
+    """
+    parts = interaction_key.split('#')
+    if len(parts) >= 4:
+        return f"{parts[0]}#{parts[1]}", '#'.join(parts[2:])
+    if len(parts) >= 2:
+        pk, sk = interaction_key.split('#', 1)
+        return pk, sk
+    raise ValueError(f"Invalid interactionKey format: {interaction_key}")
+
+def get_call_context(interaction_key):
+    """
+    Returns {'DynamicScenario', 'LeadId'} for the interaction, reading DynamoDB
+    only on the first turn of a call in this container.
+    """
+    item = call_context_cache.get(interaction_key)
+    if item is not None:
+        logger.info(f"[CACHE] Call context hit for {interaction_key}")
+        return item
+
+    if not INTERACTIONS_DYNAMODB_TABLE:
+        raise ValueError("INTERACTIONS_DYNAMODB_TABLE environment variable not set")
+    pk, sk = parse_interaction_key(interaction_key)
+    logger.debug("[DEBUG] Parsed interactionKey - PK: %s, SK: %s", pk, sk)
+
+    response = dynamodb.Table(INTERACTIONS_DYNAMODB_TABLE).get_item(
+        Key={'PK': pk, 'SK': sk},
+        ProjectionExpression='DynamicScenario, LeadId'
+    )
+    item = response.get('Item')
+    # Don't cache misses: the record may be written moments after the call connects
+    if item:
+        call_context_cache.set(interaction_key, item)
+    return item
+
 def handle_general_ai_conversation(event, session_state, scenario):
     """
     Handles conversational intents for phone calls using general AI (Bedrock).
@@ -506,7 +594,7 @@ def handle_general_ai_conversation(event, session_state, scenario):
     
     user_input = event.get('inputTranscript', '')
     session_attributes = session_state.get('sessionAttributes', {}) or {}
-    conversation_history = session_attributes.get('conversationHistory', '')
+    history = load_history(session_state)
     
     # Use the scenario as context for generating responses
     prompt = f"""
@@ -517,7 +605,7 @@ Human: You are conducting a personalized outbound sales call. Use the scenario b
 </scenario>
 
 <conversation_history>
-{conversation_history}
+{history.render()}
 </conversation_history>
 
 User just said: {user_input}
@@ -526,31 +614,22 @@ Respond naturally and conversationally based on the scenario. Keep responses con
 
 A:"""
     
-    body = json.dumps({
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 150,
-        "system": "You are Atlas, an AI sales assistant. Be concise and conversational.",
-        "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}]
-    })
+    body = anthropic_body(prompt, max_tokens=150,
+                          system="You are Atlas, an AI sales assistant. Be concise and conversational.")
     
-    try:
-        response = bedrock_client.invoke_model(
-            body=body,
-            modelId=ANTHROPIC_MODEL_ID,
-            contentType='application/json',
-            accept='application/json'
-        )
-        response_body = json.loads(response.get('body').read())
-        content = response_body.get('content')[0].get('text').strip()
-        logger.info(f"[GENERAL AI] Generated response: {content}")
-    except Exception as e:
-        logger.error(f"[GENERAL AI] Bedrock error: {e}")
-        content = "I'm here to discuss how our solution can help you. What questions do you have?"
+    fallback = "I'm here to discuss how our solution can help you. What questions do you have?"
+    def invoke():
+        return invoke_bedrock_text(body, max_sentences=2, log_tag="[GENERAL AI]", operation="GeneralAI")
+
+    content = run_with_deadline(invoke, fallback, 'GeneralAI', "[GENERAL AI]")
+    logger.info(f"[GENERAL AI] Generated response: {content}")
     
     # Update conversation history
-    conversation_history += f"User: {user_input}\nBot: {content}\n"
-    session_attributes['conversationHistory'] = conversation_history
-    session_attributes['dynamicScenario'] = scenario  # Preserve for next turn
+    history.add(user_input, content)
+    session_attributes['conversationHistory'] = history.serialize()
+    if not session_attributes.get('interactionKey'):
+        # Preserve for next turn (no DynamoDB record to re-read), as a reference rather than the full text
+        session_attributes['dynamicScenario'] = session_values.pack(scenario)
     
     intent = session_state.get('intent', {})
     intent_name = intent.get('name', 'FallbackIntent')
@@ -569,52 +648,37 @@ A:"""
 # ============================================================================
 
 def lambda_handler(event, context):
-    logger.info(f"[EVENT] Full event: {json.dumps(event, indent=2)}")
+    global current_deadline
+    # Scheduled (EventBridge) or self-invoked paraphrase pool refresh
+    if event.get('action') == 'refreshParaphrasePools':
+        current_deadline = None
+        return refresh_paraphrase_pools(event.get('intents'))
+
+    # Voice callers hear dead air, so speech turns get the tighter budget
+    channel = 'voice' if event.get('inputMode') == 'Speech' else 'web'
+    current_deadline = Deadline.for_channel(context, channel)
+
+    log_payload(logger, "[EVENT] Full event", event)
     
     session_state = event.get('sessionState', {})
     session_attributes = session_state.get('sessionAttributes', {}) or {}
     
-    # DEBUG: Log all session attributes
-    logger.info(f"[DEBUG] Session attributes keys: {list(session_attributes.keys())}")
-    logger.info(f"[DEBUG] Session attributes: {json.dumps(session_attributes)}")
+    # DEBUG: Log all session attributes (full values only for a sample of turns)
+    logger.debug("[DEBUG] Session attributes keys: %s", list(session_attributes.keys()))
+    log_payload(logger, "[DEBUG] Session attributes", session_attributes)
     
     # CHECK FOR PHONE CALL CONTEXT (from Amazon Connect)
     interaction_key = session_attributes.get('interactionKey')
-    logger.info(f"[DEBUG] interactionKey: {interaction_key}")
+    logger.debug("[DEBUG] interactionKey: %s", interaction_key)
     
     dynamic_scenario = None
     dynamodb_item = None
     if interaction_key:
-        # Retrieve scenario from DynamoDB
         try:
-            # interactionKey format: LEAD#<PHONE_NUMBER>#INTERACTION#2025-10-26T06:07:12.367643+00:00
-            # Split into PK (LEAD#<PHONE_NUMBER>) and SK (INTERACTION#2025-10-26T06:07:12.367643+00:00)
-            parts = interaction_key.split('#')
-            if len(parts) >= 4:
-                pk = f"{parts[0]}#{parts[1]}"  # LEAD#<PHONE_NUMBER>
-                sk = '#'.join(parts[2:])  # INTERACTION#2025-10-26T06:07:12.367643+00:00
-            elif len(parts) >= 2:
-                pk, sk = interaction_key.split('#', 1)
-            else:
-                logger.error(f"[DEBUG] Invalid interactionKey format: {interaction_key}")
-                raise ValueError(f"Invalid interactionKey format: {interaction_key}")
-            
-            logger.info(f"[DEBUG] Parsed interactionKey - PK: {pk}, SK: {sk}")
-            
-            table_name = os.environ.get('INTERACTIONS_DYNAMODB_TABLE')
-            if not table_name:
-                logger.error("[DEBUG] INTERACTIONS_DYNAMODB_TABLE environment variable not set")
-                raise ValueError("INTERACTIONS_DYNAMODB_TABLE environment variable not set")
-            
-            dynamodb = boto3.resource('dynamodb')
-            table = dynamodb.Table(table_name)
-            response = table.get_item(Key={'PK': pk, 'SK': sk})
-            if 'Item' in response:
-                dynamodb_item = response['Item']
+            dynamodb_item = get_call_context(interaction_key)
+            if dynamodb_item:
                 dynamic_scenario = dynamodb_item.get('DynamicScenario')
-                logger.info(f"[DEBUG] Retrieved dynamicScenario from DynamoDB. Length: {len(dynamic_scenario) if dynamic_scenario else 0}")
-                # Store in session for subsequent turns
-                session_attributes['dynamicScenario'] = dynamic_scenario
+                logger.debug("[DEBUG] dynamicScenario for call. Length: %d", len(dynamic_scenario) if dynamic_scenario else 0)
             else:
                 logger.warning(f"[DEBUG] No DynamoDB item found for key: {interaction_key}")
         except Exception as e:
@@ -623,8 +687,9 @@ def lambda_handler(event, context):
             logger.error(traceback.format_exc())
     else:
         # Check if already in session from previous turn
-        dynamic_scenario = session_attributes.get('dynamicScenario')
-        logger.info(f"[DEBUG] dynamicScenario from session: {dynamic_scenario[:100] if dynamic_scenario else 'None'}...")
+        # Raw text on the first turn (Connect contact attribute), a claim-check reference after that
+        dynamic_scenario = session_values.unpack(session_attributes.get('dynamicScenario'))
+        logger.debug("[DEBUG] dynamicScenario from session: %s...", dynamic_scenario[:100] if dynamic_scenario else 'None')
     
     # Get intent name first (needed for both phone and web chat)
     intent = session_state.get('intent', {})
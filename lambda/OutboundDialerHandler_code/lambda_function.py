@@ -0,0 +1,127 @@
+import os
+import time
+import boto3
+from atlas_common.dialer import (
+    DIAL_MAX_ACTIVE_CALLS,
+    DIAL_MAX_QUEUE_SECONDS,
+    DIAL_URGENT_SECONDS,
+    DialQueue,
+    TokenBucket,
+    after_call_placed,
+    is_throttling,
+    place_call,
+)
+from atlas_common.correlation import ContactCorrelation
+from atlas_common.interactions import InteractionStore
+from atlas_common.structured_logging import setup_logging
+
+logger = setup_logging()
+
+sfn_client = boto3.client('stepfunctions')
+
+# Reserved concurrency 1: this container is the only dialer, so the bucket and
+# the active-call check can't race another dialer.
+dial_queue = DialQueue()
+interactions = InteractionStore()
+correlations = ContactCorrelation()
+bucket = TokenBucket()
+
+# Stop picking up work this long before the Lambda timeout
+STOP_MARGIN_MS = int(os.environ.get('DIALER_STOP_MARGIN_MS', '10000'))
+ACTIVE_POLL_SECONDS = float(os.environ.get('DIALER_ACTIVE_POLL_SECONDS', '2'))
+PEEK_SIZE = 10
+
+def fail_task(request, error, cause):
+    try:
+        sfn_client.send_task_failure(taskToken=request['taskToken'], error=error, cause=cause[:256])
+    except Exception as e:
+        logger.error(f"Failed to send task failure for {request.get('interactionKey')}: {e}")
+
+def queued_seconds(item):
+    return time.time() - int(item['EnqueuedAt']) / 1000
+
+def expire(item):
+    """Fail item's task if it has been queued too long. True if it has."""
+    if queued_seconds(item) <= DIAL_MAX_QUEUE_SECONDS:
+        return False
+    if dial_queue.remove(item):
+        logger.warning(f"Giving up on {item['InteractionKey']}: queued over {DIAL_MAX_QUEUE_SECONDS}s")
+        fail_task(item['Request'], 'DialQueueExpired', f"Not dialed within {DIAL_MAX_QUEUE_SECONDS}s")
+    return True
+
+def next_item():
+    """
+    The next request to dial: the oldest if it is within DIAL_URGENT_SECONDS of
+    expiring, else the newest. Expires what it passes over. (None, expired count)
+    when the queue is empty.
+    """
+    expired = 0
+    while True:
+        oldest = dial_queue.peek(PEEK_SIZE, oldest=True)
+        if not oldest:
+            return None, expired
+        waiting = [item for item in oldest if not expire(item)]
+        expired += len(oldest) - len(waiting)
+        if not waiting:
+            continue
+        if queued_seconds(waiting[0]) >= DIAL_MAX_QUEUE_SECONDS - DIAL_URGENT_SECONDS:
+            return waiting[0], expired
+        # Nothing is close to expiring, and anything newer than waiting[0] isn't either
+        newest = dial_queue.peek(1)
+        return (newest or waiting)[0], expired
+
+def dial(item):
+    """
+    Place one queued call. Returns False if Connect throttled us and the item was put back.
+    Only the Connect call can requeue or fail the request (see atlas_common.dialer).
+    """
+    request = item['Request']
+    waited = time.time() - int(item['EnqueuedAt']) / 1000
+    try:
+        contact_id = place_call(request, interactions, correlations)
+    except Exception as e:
+        if is_throttling(e):
+            logger.warning(f"Connect throttled the call for {request['interactionKey']}; requeueing")
+            dial_queue.requeue(item)
+            return False
+        logger.error(f"Failed to place call for {request['interactionKey']}: {e}")
+        fail_task(request, type(e).__name__, str(e))
+        return True
+    after_call_placed(f"active-call lease for {request['interactionKey']}",
+                      lambda: dial_queue.add_active(request['interactionKey'], contact_id))
+    logger.info(f"Call placed for {request['interactionKey']} after {waited:.1f}s in queue. ContactId: {contact_id}")
+    return True
+
+def lambda_handler(event, context):
+    """
+    Drain the dial queue, freshest lead first (unless one is about to expire),
+    within DIAL_CALLS_PER_SECOND and DIAL_MAX_ACTIVE_CALLS. Woken by
+    InvokeOutboundCallHandler and by a schedule.
+    """
+    placed = expired = 0
+    active = dial_queue.active_calls()
+    while context.get_remaining_time_in_millis() > STOP_MARGIN_MS:
+        if active >= DIAL_MAX_ACTIVE_CALLS:
+            time.sleep(ACTIVE_POLL_SECONDS)
+            active = dial_queue.active_calls()
+            continue
+        
+        wait = bucket.wait_time()
+        if wait > 0:
+            time.sleep(wait)
+        # Picked after the wait: fresher requests may have arrived meanwhile
+        item, item_expired = next_item()
+        expired += item_expired
+        if item is None:
+            break
+        if not bucket.try_acquire() or not dial_queue.remove(item):
+            continue
+        if dial(item):
+            placed += 1
+            active += 1
+        else:
+            bucket.drain()
+    
+    remaining = len(dial_queue.peek(1))
+    logger.info(f"Dialer done: {placed} placed, {expired} expired, {active} active, queue empty: {not remaining}")
+    return {'placed': placed, 'expired': expired, 'active': active}
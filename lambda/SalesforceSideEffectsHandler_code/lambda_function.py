@@ -0,0 +1,29 @@
+import json
+from atlas_common.side_effects import SideEffectProcessor
+from atlas_common.structured_logging import setup_logging
+
+logger = setup_logging()
+
+# Reused across warm invocations (the ledger's DynamoDB client, the Salesforce session)
+processor = SideEffectProcessor()
+
+def lambda_handler(event, context):
+    """
+    SQS worker for the Salesforce side-effect queue (see atlas_common.side_effects).
+    Reports partial batch failures so only failed messages are redelivered;
+    after the queue's maxReceiveCount they move to the dead-letter queue.
+    """
+    records = event.get('Records', [])
+    logger.info(f"SalesforceSideEffectsHandler received {len(records)} messages")
+
+    messages = []
+    failures = []
+    for record in records:
+        try:
+            messages.append((record['messageId'], json.loads(record['body'])))
+        except (KeyError, ValueError) as e:
+            logger.error(f"Unreadable message {record.get('messageId')}: {e}")
+            failures.append(record.get('messageId'))
+
+    failures.extend(processor.process(messages))
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failures if message_id]}
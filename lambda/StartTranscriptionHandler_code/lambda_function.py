@@ -1,78 +1,97 @@
 import boto3
 import json
+import logging
+import os
+import random
+import time
 import urllib.parse
 import re
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from atlas_common.audio_trim import TRIMMED_PREFIX, trim_recording
+from atlas_common.structured_logging import setup_logging, log_payload
 
-def lambda_handler(event, context):
+logger = setup_logging()
+
+# Reused across warm invocations and shared by the submit threads (clients are thread-safe)
+transcribe = boto3.client('transcribe')
+s3_client = boto3.client('s3')
+
+MAX_WORKERS = int(os.environ.get('TRANSCRIBE_SUBMIT_WORKERS', '8'))
+START_JOB_ATTEMPTS = int(os.environ.get('TRANSCRIBE_START_ATTEMPTS', '5'))
+BACKOFF_BASE_SECONDS = 0.2
+BACKOFF_MAX_SECONDS = 5.0
+THROTTLING_CODES = {'ThrottlingException', 'LimitExceededException', 'TooManyRequestsException'}
+# Transcribe a silence-trimmed copy of each recording (see atlas_common.audio_trim)
+TRIM_SILENCE = os.environ.get('TRIM_SILENCE', 'false').lower() == 'true'
+
+# ContactId (UUID) before the first underscore: [ContactId]_[date]_UTC.wav
+CONTACT_ID_PATTERN = re.compile(r'^([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})_', re.IGNORECASE)
+
+def parse_record(i, record):
     """
-    Lambda function triggered by S3 .wav file uploads to start Transcribe jobs.
-    Extracts ContactId from filename and uses it as the job name.
+    (job_name, bucket, key) for an S3 record of a call recording; None (logged)
+    for records that should be skipped.
     """
-    
-    # PRIORITY 1: Log full event structure for debugging
-    print("=== RAW EVENT STRUCTURE ===")
-    print(json.dumps(event, indent=2))
-    print("=== END RAW EVENT ===")
-    
-    transcribe = boto3.client('transcribe')
-    
+    log_payload(logger, "Record structure", record, level=logging.DEBUG)
+
+    # Validate record has S3 data
+    if 's3' not in record:
+        logger.warning(f"Skipping record {i} - no 's3' key found")
+        return None
+
+    # Extract S3 information
+    s3_data = record['s3']
+    bucket = s3_data['bucket']['name']
+    # URL decode the key (handles spaces and special characters)
+    key = urllib.parse.unquote_plus(s3_data['object']['key'])
+
+    logger.info(f"Bucket: {bucket}, Key: {key}")
+
+    # Validate it's a .wav file
+    if not key.lower().endswith('.wav'):
+        logger.info(f"Skipping non-wav file: {key}")
+        return None
+
+    # Our own trimmed copies land in the same bucket
+    if key.startswith(TRIMMED_PREFIX):
+        logger.info(f"Skipping trimmed copy: {key}")
+        return None
+
+    # Example: cc49ae4e-abcd-1234-wxyz-567890abcdef_20241009_UTC.wav
+    filename = key.split('/')[-1]  # Get just the filename, not the path
+    contact_id_match = CONTACT_ID_PATTERN.match(filename)
+
+    if not contact_id_match:
+        logger.warning(f"Could not extract ContactId from filename: {filename}. Expected format: [ContactId]_[date]_UTC.wav")
+        return None
+
+    contact_id = contact_id_match.group(1)
+    logger.info(f"Extracted ContactId: {contact_id}")
+    return contact_id, bucket, key  # Use ContactId as job name
+
+def media_key(bucket, key):
+    """The recording to transcribe: a silence-trimmed copy when TRIM_SILENCE is on and it saves time."""
+    if not TRIM_SILENCE:
+        return key
     try:
-        # Check if Records exist in event
-        if 'Records' not in event:
-            raise ValueError("No 'Records' found in event structure")
-        
-        if not event['Records']:
-            raise ValueError("Records array is empty")
-        
-        # Process each record (typically one for S3 events)
-        for i, record in enumerate(event['Records']):
-            print(f"Processing record {i+1}/{len(event['Records'])}")
-            print(f"Record structure: {json.dumps(record, indent=2)}")
-            
-            # Validate record has S3 data
-            if 's3' not in record:
-                print(f"Skipping record {i} - no 's3' key found")
-                continue
-            
-            # Extract S3 information
-            s3_data = record['s3']
-            bucket = s3_data['bucket']['name']
-            # URL decode the key (handles spaces and special characters)
-            key = urllib.parse.unquote_plus(s3_data['object']['key'])
-            
-            print(f"Bucket: {bucket}")
-            print(f"Key: {key}")
-            
-            # Validate it's a .wav file
-            if not key.lower().endswith('.wav'):
-                print(f"Skipping non-wav file: {key}")
-                continue
-            
-            # Extract ContactId from filename pattern: [ContactId]_[date]_UTC.wav
-            # Example: cc49ae4e-abcd-1234-wxyz-567890abcdef_20241009_UTC.wav
-            filename = key.split('/')[-1]  # Get just the filename, not the path
-            print(f"Filename: {filename}")
-            
-            # Regex to extract ContactId (UUID pattern before first underscore)
-            contact_id_match = re.match(r'^([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})_', filename, re.IGNORECASE)
-            
-            if not contact_id_match:
-                print(f"Could not extract ContactId from filename: {filename}")
-                print("Expected format: [ContactId]_[date]_UTC.wav")
-                continue
-            
-            contact_id = contact_id_match.group(1)
-            print(f"Extracted ContactId: {contact_id}")
-            
-            # Construct S3 URI for the media file
-            media_uri = f"s3://{bucket}/{key}"
-            print(f"Media URI: {media_uri}")
-            
-            # Start Transcribe job
-            job_name = contact_id  # Use ContactId as job name
-            
-            print(f"Starting transcription job: {job_name}")
-            
+        trimmed = trim_recording(s3_client, bucket, key)
+    except Exception as e:
+        # No NumPy in the layer, non-PCM audio, S3 errors: the original still works
+        logger.warning(f"Silence trimming failed for {key}; transcribing the original: {e}")
+        return key
+    return trimmed['key'] if trimmed else key
+
+def start_job(job_name, bucket, key):
+    """
+    Start the Transcribe job; idempotent on job name. Returns 'started', or
+    'exists' when the job was already submitted (e.g. a redelivered S3 event).
+    Throttling is retried with jittered exponential backoff.
+    """
+    media_uri = f"s3://{bucket}/{key}"
+    logger.info(f"Starting transcription job: {job_name} for {media_uri}")
+    for attempt in range(START_JOB_ATTEMPTS):
+        try:
             response = transcribe.start_transcription_job(
                 TranscriptionJobName=job_name,
                 Media={
@@ -85,36 +104,87 @@ def lambda_handler(event, context):
                     'ChannelIdentification': True
                 }
             )
-            
-            print(f"✅ Transcription job started successfully")
-            print(f"Job Name: {job_name}")
-            print(f"Job Status: {response['TranscriptionJob']['TranscriptionJobStatus']}")
-            print(f"Media URI: {media_uri}")
-            print(f"Output Bucket: {bucket}")
-            
+            logger.info(f"✅ Transcription job started successfully. Job Name: {job_name}, "
+                        f"Status: {response['TranscriptionJob']['TranscriptionJobStatus']}, Output Bucket: {bucket}")
+            return 'started'
+        except ClientError as e:
+            code = e.response['Error']['Code']
+            if code == 'ConflictException':
+                logger.info(f"Transcription job {job_name} already exists; nothing to do")
+                return 'exists'
+            if code not in THROTTLING_CODES or attempt == START_JOB_ATTEMPTS - 1:
+                raise
+            # Full jitter, so a burst of submissions doesn't retry in lockstep
+            delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+            logger.warning(f"Transcribe throttled {job_name} (attempt {attempt + 1}); retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+def submit(job):
+    job_name, bucket, key = job
+    try:
+        return {'jobName': job_name, 'key': key, 'status': start_job(job_name, bucket, media_key(bucket, key))}
+    except Exception as e:
+        logger.error(f"❌ Failed to start transcription job {job_name}: {str(e)} ({type(e).__name__})")
+        return {'jobName': job_name, 'key': key, 'status': 'failed', 'error': str(e)}
+
+def lambda_handler(event, context):
+    """
+    Lambda function triggered by S3 .wav file uploads to start Transcribe jobs.
+    Extracts ContactId from filename and uses it as the job name.
+
+    All recordings in the event are submitted concurrently (up to MAX_WORKERS).
+    If any submission fails the invocation raises so the event is retried;
+    jobs that already started are then reported as 'exists', not duplicated.
+    """
+
+    # Full event structure for debugging (sampled)
+    log_payload(logger, "Raw event", event)
+
+    try:
+        # Check if Records exist in event
+        if 'Records' not in event:
+            raise ValueError("No 'Records' found in event structure")
+
+        if not event['Records']:
+            raise ValueError("Records array is empty")
+
+        logger.info(f"Processing {len(event['Records'])} records")
+        jobs = [job for job in (parse_record(i, record) for i, record in enumerate(event['Records'])) if job]
+
+        results = []
+        if jobs:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(jobs))) as pool:
+                results = list(pool.map(submit, jobs))
+
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        logger.info(f"Transcription submissions: {counts}")
+
+        failed = [result for result in results if result['status'] == 'failed']
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(results)} transcription jobs failed to start: "
+                               f"{', '.join(result['jobName'] for result in failed)}")
+
         return {
             'statusCode': 200,
             'body': json.dumps({
                 'message': 'Transcription jobs processed successfully',
-                'recordsProcessed': len(event['Records'])
+                'recordsProcessed': len(event['Records']),
+                'results': results
             })
         }
-        
+
     except Exception as e:
-        print(f"❌ ERROR in lambda_handler: {str(e)}")
-        print(f"Error type: {type(e).__name__}")
-        
+        logger.error(f"❌ ERROR in lambda_handler: {str(e)} ({type(e).__name__})")
+
         # Log additional context for debugging
-        print("=== ERROR CONTEXT ===")
-        print(f"Event keys: {list(event.keys()) if isinstance(event, dict) else 'Event is not a dict'}")
-        
+        logger.error(f"Event keys: {list(event.keys()) if isinstance(event, dict) else 'Event is not a dict'}")
+
         if isinstance(event, dict) and 'Records' in event:
-            print(f"Records count: {len(event['Records'])}")
+            logger.error(f"Records count: {len(event['Records'])}")
             for i, record in enumerate(event['Records']):
-                print(f"Record {i} keys: {list(record.keys()) if isinstance(record, dict) else 'Record is not a dict'}")
-        
-        print("=== END ERROR CONTEXT ===")
-        
+                logger.error(f"Record {i} keys: {list(record.keys()) if isinstance(record, dict) else 'Record is not a dict'}")
+
         # Re-raise the exception to mark Lambda as failed
         raise e
-
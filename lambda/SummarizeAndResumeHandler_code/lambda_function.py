@@ -1,29 +1,54 @@
 import json
 import os
 import logging
+import re
+import time
+import uuid
 import boto3
-from typing import Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Tuple
 from botocore.exceptions import ClientError
 from urllib.parse import urlparse
 from requests.exceptions import RequestException
+from atlas_common.structured_logging import setup_logging, log_event, log_payload
+from atlas_common.bedrock_gateway import BedrockGateway, anthropic_body
+from atlas_common.dialer import DialQueue
+from atlas_common.correlation import ContactCorrelation
+from atlas_common.interactions import InteractionStore
+from atlas_common.transcribe_output import STREAM_CHUNK_BYTES, read_transcript
 
-# Configure logging for structured JSON output
-logger = logging.getLogger(__name__)
-log_level = os.environ.get('LOG_LEVEL', 'INFO').upper()
-logger.setLevel(getattr(logging, log_level))
+# Configure logging for structured JSON output (level from LOG_LEVEL)
+logger = setup_logging()
 
 # Instantiate AWS clients outside handler for reuse
 s3_client = boto3.client('s3')
-bedrock_runtime = boto3.client('bedrock-runtime')
+bedrock = BedrockGateway()
 transcribe_client = boto3.client('transcribe')
 dynamodb_client = boto3.client('dynamodb')
 sfn_client = boto3.client('stepfunctions')
+dial_queue = DialQueue()
+interactions = InteractionStore()
+correlations = ContactCorrelation()
 
 # Environment variables / Constants
 INTERACTIONS_DYNAMODB_TABLE = os.environ.get('INTERACTIONS_DYNAMODB_TABLE')
 BEDROCK_MODEL_ID = os.environ.get('BEDROCK_MODEL_ID')
 MAX_INPUT_CHARS = 5000
 MAX_TOKENS = 2000
+# Longer transcripts are summarized in chunks of MAX_INPUT_CHARS, SUMMARY_MAX_WORKERS at a time
+SUMMARY_MAX_WORKERS = int(os.environ.get('SUMMARY_MAX_WORKERS', '6'))
+CHUNK_NOTES_MAX_TOKENS = 400
+# Map passes at most (the first included); notes still over MAX_INPUT_CHARS after that are cut
+SUMMARY_MAX_MAP_PASSES = int(os.environ.get('SUMMARY_MAX_MAP_PASSES', '3'))
+# Bounds the FullTranscript attribute in UTF-8 bytes (DynamoDB items are capped at 400 KB)
+MAX_TRANSCRIPT_BYTES = int(os.environ.get('MAX_TRANSCRIPT_BYTES', '150000'))
+# SQS batch mode: completion events processed concurrently per invocation, and the
+# receive count at which a failing event fails its workflow task instead of retrying
+SQS_BATCH_MAX_WORKERS = int(os.environ.get('SQS_BATCH_MAX_WORKERS', '4'))
+SQS_MAX_RECEIVES = int(os.environ.get('SQS_MAX_RECEIVES', '3'))
+# Attempts at marking the interaction finished once Step Functions has been told
+COMPLETE_ATTEMPTS = 3
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
 ANTHROPIC_VERSION = os.environ.get('ANTHROPIC_VERSION')
 
 def validate_event(event: Dict[str, Any]) -> Tuple[Optional[Dict[str, str]], str, str]:
@@ -57,56 +82,78 @@ def validate_event(event: Dict[str, Any]) -> Tuple[Optional[Dict[str, str]], str
             raise ValueError("Could not parse bucket/key from TranscriptFileUri")
         bucket = path_parts[0]
         key = '/'.join(path_parts[1:])
-        logger.info(json.dumps({"event": "input_validated", "bucket": bucket, "key_prefix": key[:20] + '...', "contactId": job_name}))
+        log_event(logger, logging.INFO, {"event": "input_validated", "bucket": bucket, "key_prefix": key[:20] + '...', "contactId": job_name})
         return {'bucket': bucket, 'key': key}, job_name, status
     except ClientError as e:
         error_code = e.response['Error']['Code']
-        logger.error(json.dumps({"event": "transcribe_error", "error_code": error_code, "job_name": job_name}))
+        log_event(logger, logging.ERROR, {"event": "transcribe_error", "error_code": error_code, "job_name": job_name})
         raise ValueError(f"Failed to fetch transcription job: {str(e)}")
     except KeyError as e:
-        logger.error(json.dumps({"event": "transcribe_parse_error", "error": str(e), "job_name": job_name}))
+        log_event(logger, logging.ERROR, {"event": "transcribe_parse_error", "error": str(e), "job_name": job_name})
         raise ValueError("Invalid transcription job response format")
     except Exception as e:
-        logger.error(json.dumps({"event": "transcribe_error", "error": str(e), "job_name": job_name}))
+        log_event(logger, logging.ERROR, {"event": "transcribe_error", "error": str(e), "job_name": job_name})
         raise e
 
 def get_transcript_from_s3(transcript_info: Dict[str, str]) -> str:
     """
     Retrieve and parse transcript from S3.
-    Returns: Transcript text.
+    Returns: Transcript text, speaker-labelled ("Customer: ...\\nAtlas: ...") for channel-identified jobs.
     Raises: ClientError or ValueError.
     """
     bucket = transcript_info['bucket']
     key = transcript_info['key']
     try:
-        logger.info(json.dumps({"event": "s3_retrieve_start", "bucket": bucket, "key": key}))
+        log_event(logger, logging.INFO, {"event": "s3_retrieve_start", "bucket": bucket, "key": key})
         s3_response = s3_client.get_object(Bucket=bucket, Key=key)
-        content_bytes = s3_response['Body'].read()
-        content_str = content_bytes.decode('utf-8')
-        transcript_data = json.loads(content_str)
-        transcripts = transcript_data.get('results', {}).get('transcripts', [])
-        if not transcripts:
-            full_transcript = ''
-        else:
-            full_transcript = transcripts[0].get('transcript', '')
+        # Streamed: only the transcript text and per-channel words are kept, one line per speaker turn
+        full_transcript = read_transcript(s3_response['Body'].iter_chunks(chunk_size=STREAM_CHUNK_BYTES))
         
         # Handle empty/short transcripts gracefully for conversational bots
         if not full_transcript or not isinstance(full_transcript, str) or len(full_transcript.strip()) < 10:
-            logger.warning(json.dumps({"event": "short_transcript", "length": len(full_transcript.strip()) if full_transcript else 0}))
+            log_event(logger, logging.WARNING, {"event": "short_transcript", "length": len(full_transcript.strip()) if full_transcript else 0})
             full_transcript = "[No speech detected during call]"
         
-        # Truncate if too long
-        if len(full_transcript) > MAX_INPUT_CHARS:
-            full_transcript = full_transcript[:MAX_INPUT_CHARS] + "... [truncated]"
-            logger.warning(json.dumps({"event": "transcript_truncated", "original_length": len(full_transcript) + 3, "truncated_length": MAX_INPUT_CHARS}))
-        logger.info(json.dumps({"event": "transcript_retrieved", "transcript_length": len(full_transcript)}))
+        # Long calls are summarized in chunks (summarize_transcript); only cap what we store
+        encoded = full_transcript.encode('utf-8')
+        if len(encoded) > MAX_TRANSCRIPT_BYTES:
+            log_event(logger, logging.WARNING, {"event": "transcript_truncated", "original_bytes": len(encoded), "truncated_bytes": MAX_TRANSCRIPT_BYTES})
+            # errors='ignore' drops a multi-byte character cut in half
+            full_transcript = encoded[:MAX_TRANSCRIPT_BYTES].decode('utf-8', errors='ignore') + "... [truncated]"
+        log_event(logger, logging.INFO, {"event": "transcript_retrieved", "transcript_length": len(full_transcript)})
         return full_transcript.strip()
     except ClientError as e:
         error_code = e.response['Error']['Code']
-        logger.error(json.dumps({"event": "s3_error", "error_code": error_code, "bucket": bucket, "key": key}))
+        log_event(logger, logging.ERROR, {"event": "s3_error", "error_code": error_code, "bucket": bucket, "key": key})
+        raise e
+    except Exception as e:
+        log_event(logger, logging.ERROR, {"event": "s3_error", "error": str(e), "bucket": bucket, "key": key})
+        raise e
+
+def invoke_claude(prompt: str, max_tokens: int = MAX_TOKENS) -> str:
+    """
+    Single Bedrock Claude completion.
+    Returns: Response text.
+    Raises: ClientError or ValueError.
+    """
+    try:
+        log_event(logger, logging.INFO, {"event": "bedrock_start", "model_id": BEDROCK_MODEL_ID, "prompt_length": len(prompt)})
+        body = anthropic_body(prompt, max_tokens, anthropic_version=ANTHROPIC_VERSION, temperature=0.1, top_p=0.9)
+        completion = bedrock.complete(body, BEDROCK_MODEL_ID, operation='summary')
+        if not completion.text:
+            raise ValueError("Empty summary generated")
+        log_event(logger, logging.INFO, {"event": "summary_generated", "summary_length": len(completion.text),
+                                         "input_tokens": completion.input_tokens, "output_tokens": completion.output_tokens})
+        return completion.text
+    except ClientError as e:
+        error_code = e.response['Error']['Code']
+        log_event(logger, logging.ERROR, {"event": "bedrock_error", "error_code": error_code})
         raise e
+    except (KeyError, IndexError, json.JSONDecodeError) as e:
+        log_event(logger, logging.ERROR, {"event": "bedrock_parse_error", "error": str(e)})
+        raise ValueError("Invalid Bedrock response format.")
     except Exception as e:
-        logger.error(json.dumps({"event": "s3_error", "error": str(e), "bucket": bucket, "key": key}))
+        log_event(logger, logging.ERROR, {"event": "bedrock_error", "error": str(e)})
         raise e
 
 def generate_summary_with_bedrock(transcript: str) -> str:
@@ -122,82 +169,205 @@ def generate_summary_with_bedrock(transcript: str) -> str:
 Transcript:
 {transcript}
 Summary:"""
-    try:
-        logger.info(json.dumps({"event": "bedrock_start", "model_id": BEDROCK_MODEL_ID, "transcript_length": len(transcript)}))
-        body = json.dumps({
-            "anthropic_version": ANTHROPIC_VERSION,
-            "max_tokens": MAX_TOKENS,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.1,
-            "top_p": 0.9
-        })
-        bedrock_response = bedrock_runtime.invoke_model(
-            body=body,
-            modelId=BEDROCK_MODEL_ID,
-            accept='application/json',
-            contentType='application/json'
-        )
-        response_body = json.loads(bedrock_response.get('body').read())
-        content = response_body.get('content', [])
-        if not content or not isinstance(content, list):
-            raise ValueError("Invalid Bedrock response format")
-        summary = content[0].get('text', '').strip()
-        if not summary:
-            raise ValueError("Empty summary generated")
-        logger.info(json.dumps({"event": "summary_generated", "summary_length": len(summary)}))
-        return summary
-    except ClientError as e:
-        error_code = e.response['Error']['Code']
-        logger.error(json.dumps({"event": "bedrock_error", "error_code": error_code}))
-        raise e
-    except (KeyError, IndexError, json.JSONDecodeError) as e:
-        logger.error(json.dumps({"event": "bedrock_parse_error", "error": str(e)}))
-        raise ValueError("Invalid Bedrock response format.")
-    except Exception as e:
-        logger.error(json.dumps({"event": "bedrock_error", "error": str(e)}))
-        raise e
+    return invoke_claude(prompt)
+
+def split_transcript(transcript: str, max_chars: int = MAX_INPUT_CHARS) -> List[str]:
+    """
+    Split into chunks of at most max_chars on speaker-turn boundaries (one turn
+    per line), or on sentence boundaries for a flat transcript. A single turn
+    longer than max_chars is split at max_chars.
+    """
+    lines = transcript.splitlines()
+    turns = lines if len(lines) > 1 else _SENTENCE_END.split(transcript)
+    chunks, current = [], ''
+    for turn in turns:
+        turn = turn.strip()
+        if not turn:
+            continue
+        while len(turn) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(turn[:max_chars])
+            turn = turn[max_chars:]
+        if current and len(current) + 1 + len(turn) > max_chars:
+            chunks.append(current)
+            current = ''
+        current = f"{current}\n{turn}" if current else turn
+    if current:
+        chunks.append(current)
+    return chunks
+
+def summarize_chunk(chunk: str, index: int, total: int) -> str:
+    prompt = f"""This is part {index + 1} of {total} of a sales call transcript. Write brief notes on this part only, as short bullet points: topics discussed, anything decided, and any follow-ups or action items mentioned. Keep names and specific phrases as expressed. NEVER comment on the transcript itself.
+Transcript part:
+{chunk}
+Notes:"""
+    return invoke_claude(prompt, max_tokens=CHUNK_NOTES_MAX_TOKENS)
+
+def reduce_notes(notes: str) -> str:
+    """Final summary, in the generate_summary_with_bedrock format, from per-part notes."""
+    prompt = f"""Below are notes on consecutive parts of one sales call, in order. Combine them into a concise summary of the whole call in the format of 3 bullet points below. NEVER comment on the notes I give you. Separate by speaker if available. Use specific phrases or names as expressed, and you can remain generic if the call is generic:
+• Key topics discussed
+• Important decisions or outcomes
+• Next steps or action items
+Notes:
+{notes}
+Summary:"""
+    return invoke_claude(prompt)
+
+def map_chunks(text: str) -> str:
+    """Summarize text's chunks concurrently; returns the notes, in order."""
+    chunks = split_transcript(text)
+    log_event(logger, logging.INFO, {"event": "chunked_summary_map", "input_length": len(text), "chunks": len(chunks)})
+    with ThreadPoolExecutor(max_workers=min(SUMMARY_MAX_WORKERS, len(chunks))) as pool:
+        notes = list(pool.map(summarize_chunk, chunks, range(len(chunks)), [len(chunks)] * len(chunks)))
+    return '\n\n'.join(f"Part {i + 1}:\n{part}" for i, part in enumerate(notes))
+
+def summarize_transcript(transcript: str) -> str:
+    """
+    Summary in the generate_summary_with_bedrock format for a transcript of any
+    length. Transcripts over MAX_INPUT_CHARS are split and the chunks summarized
+    concurrently (map), then the notes are combined (reduce), so time-to-summary
+    grows with the number of waves of SUMMARY_MAX_WORKERS chunks rather than
+    with the call length.
+    """
+    if len(transcript) <= MAX_INPUT_CHARS:
+        return generate_summary_with_bedrock(transcript)
+    notes = map_chunks(transcript)
+    # Very long calls: the notes themselves may need another map step, as long as it shrinks them
+    for _ in range(SUMMARY_MAX_MAP_PASSES - 1):
+        if len(notes) <= MAX_INPUT_CHARS:
+            break
+        shorter = map_chunks(notes)
+        if len(shorter) >= len(notes):
+            break
+        notes = shorter
+    if len(notes) > MAX_INPUT_CHARS:
+        log_event(logger, logging.WARNING, {"event": "chunk_notes_truncated", "notes_length": len(notes), "truncated_length": MAX_INPUT_CHARS})
+        notes = notes[:MAX_INPUT_CHARS]
+    return reduce_notes(notes)
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
-    Lambda handler: Handles two invocation modes.
+    Lambda handler: Handles three invocation modes.
     - EventBridge from Transcribe: Retrieves transcript if COMPLETED, summarizes via Bedrock, resumes Step Functions.
+    - SQS batch of those EventBridge events (see handle_sqs_batch).
     - Direct from Step Functions: Fetches transcript by bucket/key, summarizes, returns output.
     Handles FAILED by sending task failure.
     """
-    logger.info(f"Full event: {json.dumps(event)}")
-    logger.info(json.dumps({"event": "handler_start", "input_keys": list(event.keys())}))
+    if 'Records' in event:
+        return handle_sqs_batch(event)
+    return process_event(event)
+
+def process_record(record: Dict[str, Any]) -> None:
+    event = json.loads(record['body'])
+    receive_count = int(record.get('attributes', {}).get('ApproximateReceiveCount', '1'))
+    # Earlier attempts leave the task alone so SQS can redeliver; the last one fails it
+    process_event(event, fail_task=receive_count >= SQS_MAX_RECEIVES)
+
+def handle_sqs_batch(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Transcribe completion events delivered through SQS (EventBridge rule -> queue).
+    Up to SQS_BATCH_MAX_WORKERS events are processed concurrently, overlapping
+    their S3, Bedrock and Step Functions calls. Failed messages are reported as
+    partial batch failures, so only they are redelivered.
+    """
+    records = event['Records']
+    log_event(logger, logging.INFO, {"event": "sqs_batch_start", "records": len(records)})
+    failures = []
+    with ThreadPoolExecutor(max_workers=max(1, min(SQS_BATCH_MAX_WORKERS, len(records)))) as pool:
+        futures = {pool.submit(process_record, record): record.get('messageId') for record in records}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                log_event(logger, logging.ERROR, {"event": "sqs_record_failed", "messageId": futures[future], "error": str(e)})
+                failures.append({'itemIdentifier': futures[future]})
+    log_event(logger, logging.INFO, {"event": "sqs_batch_done", "records": len(records), "failed": len(failures)})
+    return {'batchItemFailures': failures}
+
+def finish_interaction(partition_key: str, sort_key: str, summary: str, transcript: str) -> None:
+    """
+    Record the outcome and drop the task token and summary lease, after the
+    task has been resolved. Retried, then logged; never raises: releasing the
+    claim or failing the task now would only get the call summarized again.
+    """
+    for attempt in range(COMPLETE_ATTEMPTS):
+        try:
+            if interactions.complete(partition_key, sort_key, summary, transcript):
+                log_event(logger, logging.INFO, {"event": "dynamodb_updated", "message": "Final record updated and task token removed"})
+            return
+        except Exception as e:
+            log_event(logger, logging.WARNING, {"event": "dynamodb_complete_failed", "attempt": attempt + 1, "error": str(e)})
+            if attempt < COMPLETE_ATTEMPTS - 1:
+                time.sleep(0.2 * 2 ** attempt)
+    log_event(logger, logging.ERROR, {"event": "dynamodb_complete_abandoned", "partitionKey": partition_key,
+                                      "message": "Task resolved but interaction not marked finished; its lease expires on its own"})
+
+def process_event(event: Dict[str, Any], fail_task: bool = True) -> Dict[str, Any]:
+    """One EventBridge or direct invocation. fail_task=False leaves the task token alone on errors."""
+    log_payload(logger, "Full event", event)
+    log_event(logger, logging.INFO, {"event": "handler_start", "input_keys": list(event.keys())})
     task_token = None
+    lease = None
     is_callback = 'detail' in event
     try:
         if is_callback:
             # EventBridge callback mode
             transcript_info, contact_id, status = validate_event(event)
-            # Query DynamoDB using ContactId GSI
-            query_response = dynamodb_client.query(
-                TableName=INTERACTIONS_DYNAMODB_TABLE,
-                IndexName='ContactId-index',
-                KeyConditionExpression='ContactId = :cid',
-                ExpressionAttributeValues={':cid': {'S': contact_id}}
-            )
-            if not query_response.get('Items'):
-                raise ValueError(f"No interaction record found for ContactId: {contact_id}")
-            item = query_response['Items'][0]
+            # One consistent GetItem on the correlation record written when the call was placed
+            try:
+                correlation = correlations.get(contact_id)
+            except ClientError as e:
+                log_event(logger, logging.WARNING, {"event": "correlation_lookup_failed", "contactId": contact_id, "error": str(e)})
+                correlation = None
+            if correlation and correlation.get('InteractionPK'):
+                item = {
+                    'PK': correlation['InteractionPK'],
+                    'SK': correlation['InteractionSK'],
+                    'StepFunctionTaskToken': correlation['TaskToken'],
+                }
+            else:
+                # Calls placed before correlation records existed: query DynamoDB using ContactId GSI
+                query_response = dynamodb_client.query(
+                    TableName=INTERACTIONS_DYNAMODB_TABLE,
+                    IndexName='ContactId-index',
+                    KeyConditionExpression='ContactId = :cid',
+                    ExpressionAttributeValues={':cid': {'S': contact_id}}
+                )
+                if not query_response.get('Items'):
+                    raise ValueError(f"No interaction record found for ContactId: {contact_id}")
+                item = query_response['Items'][0]
             
             # Handle both low-level ({'S': 'value'}) and high-level ('value') formats
             if 'StepFunctionTaskToken' not in item:
-                logger.warning(json.dumps({"event": "task_token_missing", "contactId": contact_id, "message": "Task token already processed or missing"}))
+                log_event(logger, logging.WARNING, {"event": "task_token_missing", "contactId": contact_id, "message": "Task token already processed or missing"})
                 return {'statusCode': 200, 'body': json.dumps({"status": "SKIPPED", "message": "Task token not found, likely already processed"})}
             
             task_token = item['StepFunctionTaskToken'].get('S') if isinstance(item['StepFunctionTaskToken'], dict) else item['StepFunctionTaskToken']
             partition_key = item['PK'].get('S') if isinstance(item['PK'], dict) else item['PK']
             sort_key = item['SK'].get('S') if isinstance(item['SK'], dict) else item['SK']
             lead_id = partition_key.split('#')[1]
-            logger.info(json.dumps({"event": "dynamodb_queried", "contactId": contact_id, "leadId": lead_id}))
+            log_event(logger, logging.INFO, {"event": "dynamodb_queried", "contactId": contact_id, "leadId": lead_id})
+            
+            # Claim the call before any S3/Bedrock work: duplicate deliveries of this event stop here
+            owner = str(uuid.uuid4())
+            if not interactions.claim_summary(partition_key, sort_key, owner):
+                log_event(logger, logging.INFO, {"event": "summary_claim_lost", "contactId": contact_id})
+                return {'statusCode': 200, 'body': json.dumps({"status": "SKIPPED", "message": "Another invocation is summarizing or has summarized this call"})}
+            lease = (partition_key, sort_key, owner)
+            
+            # The call is over: free its slot under the dialer's active-call ceiling
+            try:
+                dial_queue.release_active(f"{partition_key}#{sort_key}")
+            except ClientError as e:
+                log_event(logger, logging.WARNING, {"event": "dialer_release_failed", "error": str(e)})
             
             detail = event.get('detail', {})
             if status == 'COMPLETED':
                 full_transcript = get_transcript_from_s3(transcript_info)
-                summary = generate_summary_with_bedrock(full_transcript)
+                summary = summarize_transcript(full_transcript)
                 
                 output_payload = {
                     "summary": summary,
@@ -209,19 +379,12 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     taskToken=task_token,
                     output=json.dumps(output_payload)
                 )
-                logger.info(json.dumps({"event": "sfn_success_sent", "leadId": lead_id}))
+                log_event(logger, logging.INFO, {"event": "sfn_success_sent", "leadId": lead_id})
+                # The task is resolved: from here on nothing may release the claim or fail it
+                lease = task_token = None
                 
                 # Update DynamoDB: add summary and transcript, remove task token
-                dynamodb_client.update_item(
-                    TableName=INTERACTIONS_DYNAMODB_TABLE,
-                    Key={'PK': {'S': partition_key}, 'SK': {'S': sort_key}},
-                    UpdateExpression='SET CallSummary = :s, FullTranscript = :t REMOVE StepFunctionTaskToken',
-                    ExpressionAttributeValues={
-                        ':s': {'S': summary},
-                        ':t': {'S': full_transcript}
-                    }
-                )
-                logger.info(json.dumps({"event": "dynamodb_updated", "message": "Final record updated and task token removed"}))
+                finish_interaction(partition_key, sort_key, summary, full_transcript)
             elif status == 'FAILED':
                 failure_reason = detail.get('FailureReason', 'Unknown')
                 sfn_client.send_task_failure(
@@ -229,7 +392,11 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     error="TranscriptionFailed",
                     cause=failure_reason
                 )
-                logger.error(json.dumps({"event": "sfn_failure_sent", "reason": failure_reason, "contactId": contact_id}))
+                log_event(logger, logging.ERROR, {"event": "sfn_failure_sent", "reason": failure_reason, "contactId": contact_id})
+                lease = task_token = None
+                
+                # Finish the record too, so no claim or stale token is left behind
+                finish_interaction(partition_key, sort_key, f"Transcription failed: {failure_reason}", '')
             return {
                 'statusCode': 200,
                 'body': json.dumps({
@@ -247,8 +414,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             lead_id = event['leadId']
             transcript_info = {'bucket': bucket, 'key': key}
             full_transcript = get_transcript_from_s3(transcript_info)
-            summary = generate_summary_with_bedrock(full_transcript)
-            logger.info(json.dumps({"event": "direct_summary_generated", "leadId": lead_id}))
+            summary = summarize_transcript(full_transcript)
+            log_event(logger, logging.INFO, {"event": "direct_summary_generated", "leadId": lead_id})
             return {
                 'statusCode': 200,
                 'body': json.dumps({
@@ -257,15 +424,17 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 })
             }
     except Exception as e:
-        logger.error(json.dumps({"event": "handler_error", "error": str(e), "is_callback": is_callback}))
-        if task_token:
+        log_event(logger, logging.ERROR, {"event": "handler_error", "error": str(e), "is_callback": is_callback})
+        if lease:
+            interactions.release_summary(*lease)
+        if task_token and fail_task:
             try:
                 sfn_client.send_task_failure(
                     taskToken=task_token,
                     error=type(e).__name__,
                     cause=str(e)
                 )
-                logger.info(json.dumps({"event": "sfn_failure_sent_on_error"}))
+                log_event(logger, logging.INFO, {"event": "sfn_failure_sent_on_error"})
             except Exception as sfn_err:
-                logger.error(json.dumps({"event": "sfn_failure_error", "error": str(sfn_err)}))
+                log_event(logger, logging.ERROR, {"event": "sfn_failure_error", "error": str(sfn_err)})
         raise e
\ No newline at end of file
@@ -0,0 +1,6 @@
+"""
+Shared helpers for the Atlas Engine Lambda functions.
+
+Packaged as the AtlasCommon Lambda layer (see build-layers.sh) so every
+handler imports the same code, e.g. ``from atlas_common.salesforce import with_salesforce``.
+"""
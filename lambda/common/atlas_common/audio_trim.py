@@ -0,0 +1,190 @@
+"""
+Trim leading and trailing silence from call recordings before transcription.
+
+Transcribe bills, and takes time, in proportion to audio duration, and Connect
+recordings often open and close with long silent stretches. trim_recording()
+makes a trimmed copy of a PCM WAV in S3 in two streaming passes, so memory
+stays constant however long the call was:
+
+  1. read the recording in chunks and compute per-window energy for each
+     channel with NumPy, keeping only the first and last window that is
+     louder than TRIM_THRESHOLD_DBFS in any channel;
+  2. ranged GET of just that span, streamed into a multipart upload behind a
+     new WAV header.
+
+Both channels are cut at the same frames so they stay aligned. The trim
+offset is stored in the copy's metadata (trim-offset-seconds); add it to the
+trimmed transcript's timestamps to get times in the original recording.
+
+NumPy is imported lazily; without it (or for non-PCM audio) callers keep
+using the original recording.
+"""
+import logging
+import os
+import struct
+import wave
+
+logger = logging.getLogger(__name__)
+
+TRIM_THRESHOLD_DBFS = float(os.environ.get('TRIM_THRESHOLD_DBFS', '-45'))
+TRIM_PADDING_SECONDS = float(os.environ.get('TRIM_PADDING_SECONDS', '0.5'))
+TRIM_MIN_SAVINGS_SECONDS = float(os.environ.get('TRIM_MIN_SAVINGS_SECONDS', '2'))
+TRIM_WINDOW_SECONDS = 0.02
+TRIMMED_PREFIX = os.environ.get('TRIMMED_PREFIX', 'trimmed/')
+READ_CHUNK_FRAMES = 64 * 1024
+PART_BYTES = 8 * 1024 * 1024  # multipart parts must be at least 5 MB
+
+_DTYPES = {1: 'u1', 2: '<i2', 4: '<i4'}
+
+
+class _Stream:
+    """Read-only, non-seekable view of a StreamingBody that counts bytes read."""
+
+    def __init__(self, body):
+        self.body = body
+        self.position = 0
+
+    def read(self, size=-1):
+        data = self.body.read(size) if size >= 0 else self.body.read()
+        self.position += len(data)
+        return data
+
+
+def find_speech(body):
+    """
+    Scan a WAV stream. Returns (params, data_offset, first_frame, end_frame)
+    where [first_frame, end_frame) spans every window above the threshold in
+    any channel; first_frame is None if the recording is entirely silent.
+    """
+    import numpy as np
+
+    stream = _Stream(body)
+    with wave.open(stream, 'rb') as reader:
+        params = reader.getparams()
+        data_offset = stream.position
+        if params.sampwidth not in _DTYPES:
+            raise wave.Error(f"Unsupported sample width: {params.sampwidth}")
+        window = max(1, int(params.framerate * TRIM_WINDOW_SECONDS))
+        full_scale = float(2 ** (8 * params.sampwidth - 1))
+        threshold = (full_scale * 10 ** (TRIM_THRESHOLD_DBFS / 20)) ** 2
+
+        first = last = None
+        carry = np.empty((0, params.nchannels), dtype=np.float32)
+        windows_seen = 0
+        while True:
+            data = reader.readframes(READ_CHUNK_FRAMES)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype=_DTYPES[params.sampwidth]).astype(np.float32)
+            if params.sampwidth == 1:
+                samples -= 128.0  # 8-bit WAV is unsigned
+            samples = np.concatenate([carry, samples.reshape(-1, params.nchannels)])
+            count = len(samples) // window
+            carry = samples[count * window:]
+            # Mean energy per (window, channel); a window counts if any channel is loud
+            energy = np.square(samples[:count * window]).reshape(count, window, params.nchannels).mean(axis=1)
+            loud = np.flatnonzero((energy > threshold).any(axis=1))
+            if loud.size:
+                if first is None:
+                    first = windows_seen + int(loud[0])
+                last = windows_seen + int(loud[-1])
+            windows_seen += count
+        if len(carry) and (np.square(carry).mean(axis=0) > threshold).any():
+            first = windows_seen if first is None else first
+            last = windows_seen
+
+    if first is None:
+        return params, data_offset, None, None
+    return params, data_offset, first * window, min((last + 1) * window, params.nframes)
+
+
+def wav_header(params, nframes):
+    """Canonical 44-byte PCM WAV header."""
+    block_align = params.nchannels * params.sampwidth
+    data_bytes = nframes * block_align
+    return (b'RIFF' + struct.pack('<I', 36 + data_bytes) + b'WAVE'
+            + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, params.nchannels, params.framerate,
+                                    params.framerate * block_align, block_align, params.sampwidth * 8)
+            + b'data' + struct.pack('<I', data_bytes))
+
+
+def _upload_stream(s3, bucket, key, chunks, metadata):
+    """Upload an iterable of byte chunks, PART_BYTES of memory at most."""
+    buffer = bytearray()
+    upload_id, parts = None, []
+    try:
+        for chunk in chunks:
+            buffer += chunk
+            if len(buffer) >= PART_BYTES:
+                if upload_id is None:
+                    upload_id = s3.create_multipart_upload(Bucket=bucket, Key=key, ContentType='audio/wav',
+                                                           Metadata=metadata)['UploadId']
+                part_number = len(parts) + 1
+                response = s3.upload_part(Bucket=bucket, Key=key, UploadId=upload_id,
+                                          PartNumber=part_number, Body=bytes(buffer[:PART_BYTES]))
+                parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+                del buffer[:PART_BYTES]
+        if upload_id is None:
+            s3.put_object(Bucket=bucket, Key=key, Body=bytes(buffer), ContentType='audio/wav', Metadata=metadata)
+            return
+        if buffer:
+            part_number = len(parts) + 1
+            response = s3.upload_part(Bucket=bucket, Key=key, UploadId=upload_id,
+                                      PartNumber=part_number, Body=bytes(buffer))
+            parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        s3.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts})
+    except Exception:
+        if upload_id is not None:
+            s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+
+def trimmed_key(key):
+    return f"{TRIMMED_PREFIX}{key}"
+
+
+def trim_recording(s3, bucket, key):
+    """
+    Write a silence-trimmed copy of s3://bucket/key under TRIMMED_PREFIX.
+    Returns {'key', 'offsetSeconds', 'durationSeconds', 'savedSeconds'}, or
+    None when trimming would save less than TRIM_MIN_SAVINGS_SECONDS.
+    """
+    body = s3.get_object(Bucket=bucket, Key=key)['Body']
+    try:
+        params, data_offset, first, end = find_speech(body)
+    finally:
+        body.close()
+    if first is None:
+        logger.info(f"[TRIM] {key} is silent throughout; keeping the original")
+        return None
+
+    padding = int(TRIM_PADDING_SECONDS * params.framerate)
+    first, end = max(0, first - padding), min(params.nframes, end + padding)
+    saved = (params.nframes - (end - first)) / params.framerate
+    if saved < TRIM_MIN_SAVINGS_SECONDS:
+        return None
+
+    block_align = params.nchannels * params.sampwidth
+    start_byte = data_offset + first * block_align
+    end_byte = data_offset + end * block_align - 1
+    span = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={start_byte}-{end_byte}")['Body']
+
+    def chunks():
+        yield wav_header(params, end - first)
+        yield from span.iter_chunks(chunk_size=1024 * 1024)
+
+    result = {
+        'key': trimmed_key(key),
+        'offsetSeconds': round(first / params.framerate, 3),
+        'durationSeconds': round((end - first) / params.framerate, 3),
+        'savedSeconds': round(saved, 3),
+    }
+    try:
+        _upload_stream(s3, bucket, result['key'], chunks(), {
+            'trim-offset-seconds': str(result['offsetSeconds']),
+            'source-key': key,
+        })
+    finally:
+        span.close()
+    logger.info(f"[TRIM] {key}: kept {result['durationSeconds']}s from {result['offsetSeconds']}s, saved {result['savedSeconds']}s")
+    return result
@@ -0,0 +1,215 @@
+"""
+One way into Bedrock for every Anthropic model call.
+
+Handlers used to build request bodies and call invoke_model themselves, with
+no retries and no limit on how many calls a container had in flight. Under a
+campaign burst Bedrock throttles, and every caller failed in its own way.
+BedrockGateway owns the client and adds:
+
+  - a per-container semaphore (BEDROCK_MAX_CONCURRENCY), so thread pools
+    (summary chunks, SQS batches) queue for a slot instead of piling on.
+    Waiting longer than BEDROCK_ACQUIRE_TIMEOUT_SECONDS raises BedrockBusy;
+    callers fall back the same way they do for any other Bedrock error.
+    A call abandoned by invoke_with_deadline gives its slot back as soon as
+    the deadline fires and is not retried, so slow turns can't hold every
+    slot while their callers have already moved on;
+  - retries with full-jitter backoff for ThrottlingException,
+    ModelNotReadyException and ServiceUnavailableException, up to
+    BEDROCK_MAX_ATTEMPTS. botocore's own retries are off so attempts don't
+    multiply;
+  - one parser for Anthropic responses (anthropic_body() builds requests);
+  - EMF metrics per ModelId: BedrockLatency, BedrockInputTokens,
+    BedrockOutputTokens, BedrockRetries and BedrockErrors (BEDROCK_METRICS=false
+    turns them off, e.g. for local runs).
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from atlas_common.bedrock_streaming import stream_completion
+from atlas_common.deadline import current_cancellation
+from atlas_common.metrics import emit_metrics
+
+logger = logging.getLogger(__name__)
+
+ANTHROPIC_VERSION = 'bedrock-2023-05-31'
+BEDROCK_MAX_CONCURRENCY = int(os.environ.get('BEDROCK_MAX_CONCURRENCY', '8'))
+BEDROCK_MAX_ATTEMPTS = int(os.environ.get('BEDROCK_MAX_ATTEMPTS', '4'))
+BEDROCK_ACQUIRE_TIMEOUT_SECONDS = float(os.environ.get('BEDROCK_ACQUIRE_TIMEOUT_SECONDS', '30'))
+BEDROCK_READ_TIMEOUT_SECONDS = int(os.environ.get('BEDROCK_READ_TIMEOUT_SECONDS', '120'))
+BEDROCK_METRICS = os.environ.get('BEDROCK_METRICS', 'true').lower() == 'true'
+BACKOFF_BASE_SECONDS = 0.25
+BACKOFF_MAX_SECONDS = 4.0
+RETRYABLE_CODES = {'ThrottlingException', 'ModelNotReadyException', 'ServiceUnavailableException'}
+
+
+class BedrockBusy(RuntimeError):
+    """No concurrency slot became free within the acquire timeout."""
+
+
+@dataclass
+class Completion:
+    text: str
+    input_tokens: Optional[int]
+    output_tokens: Optional[int]
+    stop_reason: Optional[str]
+    latency: float
+
+
+def anthropic_body(prompt, max_tokens, system=None, anthropic_version=None, **params):
+    """Messages API request body for one user turn; params e.g. temperature, top_p."""
+    body = {
+        'anthropic_version': anthropic_version or ANTHROPIC_VERSION,
+        'max_tokens': max_tokens,
+        'messages': [{'role': 'user', 'content': [{'type': 'text', 'text': prompt}]}],
+    }
+    if system:
+        body['system'] = system
+    body.update(params)
+    return json.dumps(body)
+
+
+def completion_text(response_body):
+    """The text blocks of a Messages API response. Raises ValueError on a malformed response."""
+    content = response_body.get('content')
+    if not content or not isinstance(content, list):
+        raise ValueError("Invalid Bedrock response format")
+    return ''.join(block.get('text', '') for block in content if block.get('type', 'text') == 'text').strip()
+
+
+class _SlotRelease:
+    """Releases a semaphore slot once, from whichever thread gets there first."""
+
+    def __init__(self, semaphore):
+        self.semaphore = semaphore
+        self.lock = threading.Lock()
+        self.released = False
+
+    def __call__(self):
+        with self.lock:
+            if self.released:
+                return
+            self.released = True
+        self.semaphore.release()
+
+
+def _error_code(error):
+    return error.response['Error']['Code'] if isinstance(error, ClientError) else type(error).__name__
+
+
+class BedrockGateway:
+    def __init__(self, client=None, max_concurrency=BEDROCK_MAX_CONCURRENCY, max_attempts=BEDROCK_MAX_ATTEMPTS,
+                 acquire_timeout=BEDROCK_ACQUIRE_TIMEOUT_SECONDS, region_name=None, metrics=BEDROCK_METRICS):
+        # Enough pooled connections for every slot, reused across warm invocations
+        self.client = client or boto3.client('bedrock-runtime', region_name=region_name, config=Config(
+            max_pool_connections=max(10, max_concurrency),
+            connect_timeout=5,
+            read_timeout=BEDROCK_READ_TIMEOUT_SECONDS,
+            tcp_keepalive=True,
+            retries={'total_max_attempts': 1}
+        ))
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_attempts = max_attempts
+        self.acquire_timeout = acquire_timeout
+        self.metrics = metrics
+
+    def _call(self, model_id, operation, invoke):
+        """Run invoke() in a concurrency slot, retrying retryable errors. Returns (result, seconds, retries)."""
+        if not self.slots.acquire(timeout=self.acquire_timeout):
+            self._emit_error(model_id, operation, 'BedrockBusy')
+            raise BedrockBusy(f"No Bedrock slot free after {self.acquire_timeout}s")
+        release = _SlotRelease(self.slots)
+        cancellation = current_cancellation()
+        if cancellation is not None:
+            cancellation.on_cancel(release)
+        # Latency covers the calls and backoff, not the wait for a slot
+        started = time.time()
+        try:
+            for attempt in range(self.max_attempts):
+                try:
+                    return invoke(), time.time() - started, attempt
+                except ClientError as e:
+                    code = _error_code(e)
+                    abandoned = cancellation is not None and cancellation.cancelled
+                    if code not in RETRYABLE_CODES or attempt == self.max_attempts - 1 or abandoned:
+                        self._emit_error(model_id, operation, code, retries=attempt)
+                        raise
+                    # Full jitter, so throttled callers don't come back in lockstep
+                    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+                    logger.warning(f"Bedrock {code} for {operation} (attempt {attempt + 1}); retrying in {delay:.2f}s")
+                    time.sleep(delay)
+                except Exception as e:
+                    self._emit_error(model_id, operation, _error_code(e), retries=attempt)
+                    raise
+        finally:
+            release()
+
+    def complete(self, body, model_id, operation='invoke'):
+        """
+        Blocking invoke_model. Returns a Completion.
+        Raises BedrockBusy, ClientError, or ValueError for a malformed response.
+        """
+        def invoke():
+            response = self.client.invoke_model(
+                body=body,
+                modelId=model_id,
+                contentType='application/json',
+                accept='application/json'
+            )
+            return json.loads(response['body'].read())
+
+        response_body, latency, retries = self._call(model_id, operation, invoke)
+        usage = response_body.get('usage') or {}
+        try:
+            text = completion_text(response_body)
+        except ValueError:
+            self._emit_error(model_id, operation, 'InvalidResponse', retries=retries)
+            raise
+        completion = Completion(
+            text=text,
+            input_tokens=usage.get('input_tokens'),
+            output_tokens=usage.get('output_tokens'),
+            stop_reason=response_body.get('stop_reason'),
+            latency=round(latency, 3)
+        )
+        self._emit(model_id, operation, completion.latency, retries, completion.input_tokens, completion.output_tokens)
+        return completion
+
+    def stream(self, body, model_id, operation='stream', **kwargs):
+        """
+        stream_completion (early return at a sentence boundary) in a slot, with
+        the same retries. kwargs: max_sentences, max_chars. Returns its StreamResult.
+        """
+        result, latency, retries = self._call(
+            model_id, operation, lambda: stream_completion(self.client, model_id, body, **kwargs))
+        self._emit(model_id, operation, round(latency, 3), retries)
+        return result
+
+    def _emit(self, model_id, operation, latency, retries, input_tokens=None, output_tokens=None):
+        if not self.metrics:
+            return
+        metrics = {
+            'BedrockLatency': (int(latency * 1000), 'Milliseconds'),
+            'BedrockRetries': (retries, 'Count'),
+        }
+        if input_tokens is not None:
+            metrics['BedrockInputTokens'] = (input_tokens, 'Count')
+        if output_tokens is not None:
+            metrics['BedrockOutputTokens'] = (output_tokens, 'Count')
+        emit_metrics(metrics, dimensions={'ModelId': str(model_id)}, properties={'Operation': operation})
+
+    def _emit_error(self, model_id, operation, code, retries=0):
+        if not self.metrics:
+            return
+        emit_metrics({'BedrockErrors': (1, 'Count'), 'BedrockRetries': (retries, 'Count')},
+                     dimensions={'ModelId': str(model_id)},
+                     properties={'Operation': operation, 'ErrorCode': code})
@@ -0,0 +1,129 @@
+"""
+Streaming Bedrock completions with early return at a sentence boundary.
+
+Voice turns only ever speak 1-3 sentences, so there is no reason to wait for
+the rest of a completion: we read invoke_model_with_response_stream until we
+have enough complete sentences (or hit a character budget), then close the
+stream. Time-to-first-token and time-to-first-sentence are recorded on the
+result so handlers can log them.
+"""
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# A sentence ends at . ! or ? (optionally followed by closing quotes/brackets)
+# and is only confirmed once we have seen the whitespace after it; otherwise
+# "3.5" or "e.g" split across two chunks would look like a boundary.
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*(?=\s)')
+ABBREVIATIONS = {'mr', 'mrs', 'ms', 'dr', 'st', 'vs', 'etc', 'e.g', 'i.e', 'approx'}
+
+
+@dataclass
+class StreamResult:
+    text: str
+    time_to_first_token: Optional[float]
+    time_to_first_sentence: Optional[float]
+    total_time: float
+    stopped_early: bool
+
+
+def _sentence_ends(text, start=0):
+    """Return end offsets of the complete sentences in text, searching from start."""
+    ends = []
+    for match in SENTENCE_END.finditer(text, start):
+        words = text[:match.start()].split()
+        last_word = words[-1].lower() if words else ''
+        if last_word in ABBREVIATIONS:
+            continue
+        ends.append(match.end())
+    return ends
+
+
+def _trim_to_budget(text, max_chars):
+    """Cut text to max_chars, preferring the last sentence end, then the last word."""
+    if len(text) <= max_chars:
+        return text
+    ends = [end for end in _sentence_ends(text) if end <= max_chars]
+    if ends:
+        return text[:ends[-1]]
+    cut = text.rfind(' ', 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
+
+
+def stream_completion(client, model_id, body, max_sentences=3, max_chars=450):
+    """
+    Invoke an Anthropic model via invoke_model_with_response_stream and stop
+    reading once max_sentences complete sentences (or max_chars) are available.
+
+    Returns: StreamResult. Raises whatever botocore raises for the request or
+    for error events inside the stream.
+    """
+    started = time.time()
+    response = client.invoke_model_with_response_stream(
+        body=body,
+        modelId=model_id,
+        contentType='application/json',
+        accept='application/json'
+    )
+    stream = response.get('body')
+
+    text = ''
+    scanned = 0
+    sentence_count = 0
+    first_token_at = None
+    first_sentence_at = None
+    stopped_early = False
+    try:
+        for event in stream:
+            chunk = event.get('chunk')
+            if not chunk:
+                continue
+            payload = json.loads(chunk['bytes'])
+            if payload.get('type') == 'message_stop':
+                break
+            if payload.get('type') != 'content_block_delta':
+                continue
+            delta = payload.get('delta', {}).get('text', '')
+            if not delta:
+                continue
+            if first_token_at is None:
+                first_token_at = time.time()
+            text += delta
+
+            # Only rescan the new tail (keep a few chars for split punctuation)
+            ends = _sentence_ends(text, max(scanned - 3, 0))
+            new_ends = [end for end in ends if end > scanned]
+            if new_ends:
+                if first_sentence_at is None:
+                    first_sentence_at = time.time()
+                sentence_count += len(new_ends)
+                scanned = new_ends[-1]
+                if sentence_count >= max_sentences:
+                    text = text[:_sentence_ends(text)[max_sentences - 1]]
+                    stopped_early = True
+                    break
+            if len(text) >= max_chars:
+                text = _trim_to_budget(text, max_chars)
+                stopped_early = True
+                break
+    finally:
+        # Closing the event stream drops the connection so Bedrock stops
+        # generating tokens we would never read.
+        if stopped_early and hasattr(stream, 'close'):
+            stream.close()
+
+    if first_sentence_at is None and text.strip():
+        first_sentence_at = time.time()
+
+    return StreamResult(
+        text=text.strip(),
+        time_to_first_token=round(first_token_at - started, 3) if first_token_at else None,
+        time_to_first_sentence=round(first_sentence_at - started, 3) if first_sentence_at else None,
+        total_time=round(time.time() - started, 3),
+        stopped_early=stopped_early
+    )
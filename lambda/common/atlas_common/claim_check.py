@@ -0,0 +1,131 @@
+"""
+Claim check for large Lex session attributes.
+
+Lex, Connect and the fulfillment Lambda pass every session attribute back and
+forth on every turn, so a 30,000-character scenario costs serialization and
+JSON parsing on each one and eats into the Lex session size limit. pack()
+returns what to put in the attribute instead:
+
+    short values                 unchanged
+    mid-size values              "cc:z:<base64(zlib(value))>"   (inline, compressed)
+    large values                 "cc:ref:<sha256>"              (stored elsewhere)
+
+unpack() reverses it. Referenced values are looked up in an in-container
+TTLCache, then the shared DynamoDB TTL table (the response cache table, key
+"claimcheck#<sha256>"), then S3 for values too big for a DynamoDB item.
+The key is the content hash, so repacking the same value is a cache hit, not
+a write, and a resolved value is checked against it.
+
+If a store is unavailable the value stays inline (compressed), so a turn
+never loses its context over a failed write.
+"""
+import base64
+import hashlib
+import logging
+import os
+import time
+import zlib
+
+import boto3
+from botocore.exceptions import ClientError
+
+from atlas_common.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+CLAIM_CHECK_TABLE = os.environ.get('CLAIM_CHECK_TABLE', os.environ.get('RESPONSE_CACHE_TABLE'))
+CLAIM_CHECK_BUCKET = os.environ.get('CLAIM_CHECK_BUCKET')
+CLAIM_CHECK_INLINE_MAX_CHARS = int(os.environ.get('CLAIM_CHECK_INLINE_MAX_CHARS', '512'))
+CLAIM_CHECK_COMPRESSED_MAX_CHARS = int(os.environ.get('CLAIM_CHECK_COMPRESSED_MAX_CHARS', '2048'))
+CLAIM_CHECK_TTL_SECONDS = int(os.environ.get('CLAIM_CHECK_TTL_SECONDS', str(24 * 3600)))
+# DynamoDB items are capped at 400 KB; leave room for the key and attributes
+DYNAMODB_MAX_BYTES = 350 * 1024
+
+COMPRESSED_PREFIX = 'cc:z:'
+REF_PREFIX = 'cc:ref:'
+_PREFIX = 'cc:'
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+def _compress_inline(value):
+    return COMPRESSED_PREFIX + base64.b64encode(zlib.compress(value.encode('utf-8'), 9)).decode('ascii')
+
+
+class ClaimCheck:
+    def __init__(self, table_name=CLAIM_CHECK_TABLE, bucket=CLAIM_CHECK_BUCKET, ttl_seconds=CLAIM_CHECK_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.local = TTLCache(max_size=128, ttl_seconds=3600)
+        self.table = boto3.resource('dynamodb').Table(table_name) if table_name else None
+        self.bucket = bucket
+        self.s3 = boto3.client('s3') if bucket else None
+
+    def pack(self, value):
+        """Session attribute value for value (str); None stays None."""
+        if value is None:
+            return None
+        # Values that already look packed are packed again so unpack can't misread them
+        if len(value) <= CLAIM_CHECK_INLINE_MAX_CHARS and not value.startswith(_PREFIX):
+            return value
+        compressed = _compress_inline(value)
+        if len(compressed) <= CLAIM_CHECK_COMPRESSED_MAX_CHARS:
+            return compressed
+        digest = _digest(value)
+        if self.local.get(digest) is not None or self._store(digest, value):
+            self.local.set(digest, value)
+            return REF_PREFIX + digest
+        return compressed
+
+    def unpack(self, attribute):
+        """The original value for a session attribute (plain, compressed or a reference)."""
+        if not attribute or not attribute.startswith(_PREFIX):
+            return attribute
+        if attribute.startswith(COMPRESSED_PREFIX):
+            return zlib.decompress(base64.b64decode(attribute[len(COMPRESSED_PREFIX):])).decode('utf-8')
+        if attribute.startswith(REF_PREFIX):
+            return self._resolve(attribute[len(REF_PREFIX):])
+        return attribute
+
+    def _store(self, digest, value):
+        blob = zlib.compress(value.encode('utf-8'), 6)
+        try:
+            if len(blob) <= DYNAMODB_MAX_BYTES and self.table is not None:
+                self.table.put_item(Item={
+                    'CacheKey': f"claimcheck#{digest}",
+                    'Data': blob,
+                    'ExpiresAt': int(time.time()) + self.ttl_seconds
+                })
+                return True
+            if self.s3 is not None:
+                self.s3.put_object(Bucket=self.bucket, Key=f"claim-check/{digest}.z", Body=blob)
+                return True
+        except ClientError as e:
+            logger.warning(f"[CLAIM CHECK] Failed to store {digest[:12]}, keeping it inline: {e}")
+        return False
+
+    def _resolve(self, digest):
+        value = self.local.get(digest)
+        if value is not None:
+            return value
+        blob = None
+        try:
+            if self.table is not None:
+                item = self.table.get_item(Key={'CacheKey': f"claimcheck#{digest}"}).get('Item')
+                if item:
+                    blob = bytes(item['Data'])
+            if blob is None and self.s3 is not None:
+                blob = self.s3.get_object(Bucket=self.bucket, Key=f"claim-check/{digest}.z")['Body'].read()
+        except ClientError as e:
+            logger.error(f"[CLAIM CHECK] Failed to resolve {digest[:12]}: {e}")
+            return None
+        if blob is None:
+            logger.error(f"[CLAIM CHECK] No stored value for {digest[:12]}")
+            return None
+        value = zlib.decompress(blob).decode('utf-8')
+        if _digest(value) != digest:
+            logger.error(f"[CLAIM CHECK] Stored value for {digest[:12]} does not match its hash")
+            return None
+        self.local.set(digest, value)
+        return value
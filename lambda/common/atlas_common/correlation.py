@@ -0,0 +1,61 @@
+"""
+ContactId -> interaction correlation records.
+
+When Transcribe finishes, SummarizeAndResume only knows the ContactId (the
+job name). Looking it up through the interactions table's ContactId-index
+GSI costs a query and is eventually consistent: right after a short call
+the index may not have the ContactId yet ("No interaction record found").
+
+The outbound-call path writes one correlation record per placed call instead,
+in CONTACT_CORRELATION_TABLE (the stack's PK/SK TaskTokensTable):
+
+    PK "CONTACT#<ContactId>", SK "CORRELATION"
+    InteractionPK, InteractionSK, LeadId, TaskToken, ExpirationTime (TTL)
+
+and the callback reads it back with a strongly consistent GetItem.
+"""
+import logging
+import os
+import time
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+CORRELATION_TABLE = os.environ.get('CONTACT_CORRELATION_TABLE')
+CORRELATION_TTL_SECONDS = int(os.environ.get('CORRELATION_TTL_SECONDS', str(2 * 24 * 3600)))
+CORRELATION_SORT_KEY = 'CORRELATION'
+
+
+def correlation_key(contact_id):
+    return {'PK': f"CONTACT#{contact_id}", 'SK': CORRELATION_SORT_KEY}
+
+
+class ContactCorrelation:
+    def __init__(self, table_name=CORRELATION_TABLE, ttl_seconds=CORRELATION_TTL_SECONDS):
+        self.table = boto3.resource('dynamodb').Table(table_name) if table_name else None
+        self.ttl_seconds = ttl_seconds
+
+    def put(self, contact_id, lead_id, task_token, partition_key=None, sort_key=None):
+        if self.table is None:
+            return
+        item = {
+            **correlation_key(contact_id),
+            'ContactId': contact_id,
+            'LeadId': lead_id,
+            'TaskToken': task_token,
+            'ExpirationTime': int(time.time()) + self.ttl_seconds,
+        }
+        if partition_key and sort_key:
+            item.update({'InteractionPK': partition_key, 'InteractionSK': sort_key})
+        self.table.put_item(Item=item)
+
+    def get(self, contact_id):
+        """The correlation record for contact_id, or None (e.g. a call placed before it existed)."""
+        if self.table is None:
+            return None
+        item = self.table.get_item(Key=correlation_key(contact_id), ConsistentRead=True).get('Item')
+        # DynamoDB TTL deletes lazily
+        if item and int(item.get('ExpirationTime', 0)) <= time.time():
+            return None
+        return item
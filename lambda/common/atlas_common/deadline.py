@@ -0,0 +1,191 @@
+"""
+Deadline-aware model invocation with optional hedging.
+
+A Deadline is derived from the Lambda's remaining time and a per-channel
+latency budget (voice callers hear dead air, so voice is tighter than web).
+invoke_with_deadline() runs the call on a worker thread and returns the
+fallback the moment the budget is spent instead of waiting for the call to
+fail. If hedging is enabled, a second identical request is fired once the
+first has been running longer than the observed p90 latency; whichever
+finishes first wins.
+
+Outcomes are emitted as EMF metrics (OnTime / HedgedWin / Fallback) per
+label so the budgets can be tuned per intent.
+
+An abandoned attempt (deadline passed, or the other side of a hedge won)
+can't be interrupted, but it is cancelled: code running inside it can
+register on_cancel() callbacks through current_cancellation(), e.g. the
+Bedrock gateway frees its concurrency slot then rather than when the
+abandoned call finally returns.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from atlas_common.metrics import emit_metrics
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_BUDGETS_MS = {
+    'voice': int(os.environ.get('VOICE_LATENCY_BUDGET_MS', '2500')),
+    'web': int(os.environ.get('WEB_LATENCY_BUDGET_MS', '6000')),
+}
+# Time kept back from the Lambda timeout to build and return the Lex response
+SAFETY_MARGIN_MS = int(os.environ.get('DEADLINE_SAFETY_MARGIN_MS', '500'))
+HEDGE_ENABLED = os.environ.get('HEDGE_ENABLED', 'false').lower() == 'true'
+# Used as the hedge delay until enough latency samples have been observed
+DEFAULT_HEDGE_AFTER_MS = int(os.environ.get('HEDGE_AFTER_MS', '1500'))
+MIN_SAMPLES_FOR_P90 = 20
+
+# Abandoned (timed-out) calls keep running here; never block on them
+_executor = ThreadPoolExecutor(max_workers=8)
+
+
+class Cancellation:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.cancelled = False
+
+    def on_cancel(self, callback):
+        """Run callback when cancelled (right away if already cancelled)."""
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"[DEADLINE] Cancel callback failed: {e}")
+
+
+_current_cancellation = contextvars.ContextVar('atlas_cancellation', default=None)
+
+
+def current_cancellation():
+    """The Cancellation of the invoke_with_deadline attempt running on this thread, or None."""
+    return _current_cancellation.get()
+
+
+def _run_attempt(fn, cancellation):
+    token = _current_cancellation.set(cancellation)
+    try:
+        return fn()
+    finally:
+        _current_cancellation.reset(token)
+
+
+class Deadline:
+    def __init__(self, budget_seconds):
+        self.budget_seconds = max(budget_seconds, 0.0)
+        self.expires_at = time.monotonic() + self.budget_seconds
+
+    @classmethod
+    def for_channel(cls, context, channel):
+        """min(channel budget, Lambda remaining time - safety margin)."""
+        budget_ms = CHANNEL_BUDGETS_MS.get(channel, CHANNEL_BUDGETS_MS['web'])
+        if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+            budget_ms = min(budget_ms, context.get_remaining_time_in_millis() - SAFETY_MARGIN_MS)
+        return cls(budget_ms / 1000.0)
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per label, for the hedge trigger."""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+
+    def record(self, label, seconds):
+        self._samples.setdefault(label, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, label, pct, default=None):
+        samples = self._samples.get(label)
+        if not samples or len(samples) < MIN_SAMPLES_FOR_P90:
+            return default
+        ordered = sorted(samples)
+        index = min(int(round(pct / 100.0 * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+
+latency_tracker = LatencyTracker()
+
+
+def _emit(label, outcome, elapsed):
+    emit_metrics(
+        {outcome: (1, 'Count'), 'InvokeLatency': (round(elapsed * 1000), 'Milliseconds')},
+        dimensions={'Label': label}
+    )
+
+
+def invoke_with_deadline(fn, deadline, fallback, label='default', hedge=None):
+    """
+    Call fn() and return (result, outcome), where outcome is 'on_time',
+    'hedged_win' or 'fallback'. fallback is returned when the deadline passes
+    or every attempt raised.
+    """
+    hedge = HEDGE_ENABLED if hedge is None else hedge
+    started = time.monotonic()
+    cancellations = {}
+
+    def submit():
+        cancellation = Cancellation()
+        future = _executor.submit(_run_attempt, fn, cancellation)
+        cancellations[future] = cancellation
+        return future
+
+    def abandon(futures):
+        for future in futures:
+            cancellations[future].cancel()
+
+    primary = submit()
+    pending = {primary}
+    hedged = None
+
+    if hedge:
+        hedge_after = latency_tracker.percentile(label, 90, DEFAULT_HEDGE_AFTER_MS / 1000.0)
+        done, _ = wait(pending, timeout=min(hedge_after, deadline.remaining()))
+        if not done and not deadline.expired:
+            logger.info(f"[DEADLINE] {label}: no result after {hedge_after:.2f}s, sending hedged request")
+            hedged = submit()
+            pending.add(hedged)
+
+    while pending and not deadline.expired:
+        done, pending = wait(pending, timeout=deadline.remaining(), return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                logger.error(f"[DEADLINE] {label}: attempt failed: {future.exception()}")
+                continue
+            elapsed = time.monotonic() - started
+            outcome = 'hedged_win' if future is hedged else 'on_time'
+            latency_tracker.record(label, elapsed)
+            _emit(label, 'HedgedWin' if outcome == 'hedged_win' else 'OnTime', elapsed)
+            abandon(pending)
+            return future.result(), outcome
+
+    abandon(pending)
+    elapsed = time.monotonic() - started
+    logger.warning(f"[DEADLINE] {label}: returning fallback after {elapsed:.2f}s "
+                   f"(budget {deadline.budget_seconds:.2f}s)")
+    _emit(label, 'Fallback', elapsed)
+    return fallback, 'fallback'
@@ -0,0 +1,231 @@
+"""
+Outbound dialing: placing the Connect call, and the queue/limits the
+OutboundDialerHandler paces calls with.
+
+InvokeOutboundCallHandler no longer calls Connect itself. It stores the
+interaction (scenario + task token, as before) and enqueues a dial request;
+the dialer (reserved concurrency 1) drains the queue:
+
+  - freshest lead first: a prospect who chatted seconds ago is the most
+    likely to pick up, so the queue is ordered by enqueue time, newest first,
+    and requests older than DIAL_MAX_QUEUE_SECONDS are given up on. So that a
+    burst bigger than the dial rate doesn't starve its oldest leads until
+    they expire, requests within DIAL_URGENT_SECONDS of that limit are dialed
+    first, oldest first;
+  - at most DIAL_CALLS_PER_SECOND (token bucket, burst DIAL_BURST);
+  - at most DIAL_MAX_ACTIVE_CALLS calls in progress. Each placed call holds a
+    lease until the call ends: CallEndedHandler releases it on the Connect
+    DISCONNECTED contact event (answered or not) and on the workflow's
+    timeout/failure paths, SummarizeAndResume once the transcript is in.
+    ACTIVE_CALL_LEASE_SECONDS, about the longest realistic call, only bounds
+    a slot whose release was lost.
+
+The Step Functions task token stays parked in the interaction item the
+whole time; the dialer only fails the task if the call can't be placed.
+Only the Connect call decides that: once it returns a ContactId the phone is
+ringing, so the bookkeeping writes after it (correlation, ContactId, active
+lease) are retried briefly and logged, never failed or requeued.
+
+Queue and leases live in the interactions table:
+    PK "DIALER#QUEUE",  SK "<inverted enqueue ms>#<interactionKey>"
+    PK "DIALER#ACTIVE", SK "<interactionKey>"
+"""
+import logging
+import os
+import threading
+import time
+
+import boto3
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+DIALER_TABLE = os.environ.get('DIALER_TABLE', os.environ.get('INTERACTIONS_DYNAMODB_TABLE'))
+DIAL_CALLS_PER_SECOND = float(os.environ.get('DIAL_CALLS_PER_SECOND', '1'))
+DIAL_BURST = int(os.environ.get('DIAL_BURST', '2'))
+DIAL_MAX_ACTIVE_CALLS = int(os.environ.get('DIAL_MAX_ACTIVE_CALLS', '10'))
+DIAL_MAX_QUEUE_SECONDS = int(os.environ.get('DIAL_MAX_QUEUE_SECONDS', '600'))
+DIAL_URGENT_SECONDS = int(os.environ.get('DIAL_URGENT_SECONDS', '120'))
+ACTIVE_CALL_LEASE_SECONDS = int(os.environ.get('ACTIVE_CALL_LEASE_SECONDS', '900'))
+
+QUEUE_PK = 'DIALER#QUEUE'
+ACTIVE_PK = 'DIALER#ACTIVE'
+# Newest first: SKs sort ascending, so store (MAX - enqueue time)
+_MAX_MS = 10 ** 13
+
+# Connect quota errors: put the request back and slow down
+THROTTLING_CODES = {'ThrottlingException', 'LimitExceededException', 'TooManyRequestsException'}
+AFTER_CALL_WRITE_ATTEMPTS = 3
+
+connect_client = boto3.client('connect')
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second=DIAL_CALLS_PER_SECOND, burst=DIAL_BURST):
+        self.rate = rate_per_second
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def wait_time(self):
+        """Seconds until a token is available."""
+        with self.lock:
+            self._refill()
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def drain(self):
+        """Back off after a throttling error: the next token is a full interval away."""
+        with self.lock:
+            self.tokens = 0.0
+            self.updated = time.monotonic()
+
+
+class DialQueue:
+    def __init__(self, table_name=DIALER_TABLE):
+        self.table = boto3.resource('dynamodb').Table(table_name)
+
+    def enqueue(self, interaction_key, request, enqueued_at=None):
+        enqueued_ms = int((enqueued_at or time.time()) * 1000)
+        self.table.put_item(Item={
+            'PK': QUEUE_PK,
+            'SK': f"{_MAX_MS - enqueued_ms:013d}#{interaction_key}",
+            'InteractionKey': interaction_key,
+            'EnqueuedAt': enqueued_ms,
+            'Request': request,
+        })
+
+    def peek(self, limit=10, oldest=False):
+        """The newest queued requests, or the oldest with oldest=True."""
+        response = self.table.query(
+            KeyConditionExpression=Key('PK').eq(QUEUE_PK),
+            ScanIndexForward=not oldest,
+            ConsistentRead=True,
+            Limit=limit
+        )
+        return response.get('Items', [])
+
+    def remove(self, item):
+        """Take item off the queue; False if it was already taken."""
+        try:
+            self.table.delete_item(
+                Key={'PK': QUEUE_PK, 'SK': item['SK']},
+                ConditionExpression=Attr('PK').exists()
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def requeue(self, item):
+        self.table.put_item(Item=item)
+
+    def active_calls(self):
+        now = int(time.time())
+        count, kwargs = 0, {}
+        while True:
+            response = self.table.query(
+                KeyConditionExpression=Key('PK').eq(ACTIVE_PK),
+                FilterExpression=Attr('ExpiresAt').gt(now),
+                Select='COUNT',
+                ConsistentRead=True,
+                **kwargs
+            )
+            count += response.get('Count', 0)
+            if 'LastEvaluatedKey' not in response:
+                return count
+            kwargs = {'ExclusiveStartKey': response['LastEvaluatedKey']}
+
+    def add_active(self, interaction_key, contact_id):
+        self.table.put_item(Item={
+            'PK': ACTIVE_PK,
+            'SK': interaction_key,
+            'ContactId': contact_id,
+            'ExpiresAt': int(time.time()) + ACTIVE_CALL_LEASE_SECONDS,
+        })
+
+    def release_active(self, interaction_key):
+        self.table.delete_item(Key={'PK': ACTIVE_PK, 'SK': interaction_key})
+
+    def release_contact(self, contact_id):
+        """
+        Release the lease held by a Connect contact. Returns the number released
+        (0 for contacts the dialer didn't place). The partition holds at most
+        DIAL_MAX_ACTIVE_CALLS live leases plus expired ones, so a filtered query is cheap.
+        """
+        released, kwargs = 0, {}
+        while True:
+            response = self.table.query(
+                KeyConditionExpression=Key('PK').eq(ACTIVE_PK),
+                FilterExpression=Attr('ContactId').eq(contact_id),
+                ConsistentRead=True,
+                **kwargs
+            )
+            for item in response.get('Items', []):
+                self.release_active(item['SK'])
+                released += 1
+            if 'LastEvaluatedKey' not in response:
+                return released
+            kwargs = {'ExclusiveStartKey': response['LastEvaluatedKey']}
+
+
+def place_call(request, interactions, correlations):
+    """
+    Start the outbound call for a dial request, write its ContactId correlation
+    record (correlations: an atlas_common.correlation.ContactCorrelation) and
+    record the ContactId on the interaction item (interactions: an
+    atlas_common.interactions.InteractionStore).
+    request: phone, interactionKey, leadId, pk, sk, taskToken.
+    """
+    response = connect_client.start_outbound_voice_contact(
+        DestinationPhoneNumber=request['phone'],
+        ContactFlowId=os.environ['CONTACT_FLOW_ID'],
+        InstanceId=os.environ['INSTANCE_ID'],
+        SourcePhoneNumber=os.environ['SOURCE_PHONE_NUMBER'],
+        Attributes={
+            'interactionKey': request['interactionKey'],
+            'leadId': request['leadId']
+        }
+    )
+    contact_id = response['ContactId']
+    # SummarizeAndResume falls back to the ContactId GSI without the correlation record
+    after_call_placed(f"correlation record for {contact_id}", lambda: correlations.put(
+        contact_id, request['leadId'], request['taskToken'], request['pk'], request['sk']))
+    after_call_placed(f"ContactId {contact_id} on {request['interactionKey']}", lambda: interactions.record_contact(
+        request['pk'], request['sk'], contact_id))
+    return contact_id
+
+
+def after_call_placed(label, write):
+    """
+    Run a bookkeeping write for a call that is already ringing. Retried briefly,
+    then logged: never raises, so the caller can't fail or requeue a live call.
+    """
+    for attempt in range(AFTER_CALL_WRITE_ATTEMPTS):
+        try:
+            write()
+            return True
+        except Exception as e:
+            if attempt == AFTER_CALL_WRITE_ATTEMPTS - 1:
+                logger.error(f"Failed to write {label} after the call was placed: {e}")
+                return False
+            time.sleep(0.1 * 2 ** attempt)
+
+
+def is_throttling(error):
+    return isinstance(error, ClientError) and error.response['Error']['Code'] in THROTTLING_CODES
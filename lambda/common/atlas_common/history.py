@@ -0,0 +1,107 @@
+"""
+Bounded conversation history stored in one compact Lex session attribute.
+
+Turns are kept as a ring buffer of (user, bot) pairs trimmed to a character
+budget (a cheap proxy for Bedrock input tokens), not a line count, so long
+phone calls can't grow the session payload or the prompt without bound.
+
+Serialized form:
+    [["user text", "bot text"], ...]   compact JSON
+    z:<base64(zlib(json))>            when compression makes it smaller
+Legacy "User: ...\\nBot: ...\\n" strings from in-flight sessions are still read.
+"""
+import base64
+import json
+import os
+import zlib
+from collections import deque
+
+HISTORY_CHAR_BUDGET = int(os.environ.get('HISTORY_CHAR_BUDGET', '2000'))
+HISTORY_COMPRESS_MIN_CHARS = int(os.environ.get('HISTORY_COMPRESS_MIN_CHARS', '512'))
+COMPRESSED_PREFIX = 'z:'
+
+
+def _parse_legacy(text):
+    turns = []
+    for line in text.splitlines():
+        if line.startswith('User: '):
+            turns.append([line[len('User: '):], ''])
+        elif line.startswith('Bot: '):
+            if turns and not turns[-1][1]:
+                turns[-1][1] = line[len('Bot: '):]
+            else:
+                turns.append(['', line[len('Bot: '):]])
+    return turns
+
+
+class ConversationHistory:
+    def __init__(self, turns=None, char_budget=HISTORY_CHAR_BUDGET):
+        self.char_budget = char_budget
+        self.turns = deque()
+        self._chars = 0
+        for user, bot in turns or []:
+            self.add(user, bot)
+
+    @staticmethod
+    def _turn_chars(user, bot):
+        # Matches the rendered size: "User: <user>\nBot: <bot>\n"
+        return len(user) + len(bot) + 12
+
+    @classmethod
+    def deserialize(cls, value, char_budget=HISTORY_CHAR_BUDGET):
+        """Build from a session attribute value (structured, compressed or legacy text)."""
+        if not value:
+            return cls(char_budget=char_budget)
+        if value.startswith(COMPRESSED_PREFIX):
+            value = zlib.decompress(base64.b64decode(value[len(COMPRESSED_PREFIX):])).decode('utf-8')
+        if value.startswith('['):
+            return cls(json.loads(value), char_budget=char_budget)
+        return cls(_parse_legacy(value), char_budget=char_budget)
+
+    def add(self, user, bot):
+        user, bot = user or '', bot or ''
+        # A single oversized turn is truncated rather than evicting everything else.
+        # The longer field (normally the bot reply) is cut first; neither drops below
+        # half the room unless it was shorter than that to begin with.
+        room = max(self.char_budget - self._turn_chars('', ''), 0)
+        if len(user) + len(bot) > room:
+            shorter = min(len(user), len(bot), room // 2)
+            if len(user) <= len(bot):
+                user = user[:shorter]
+                bot = bot[:room - len(user)]
+            else:
+                bot = bot[:shorter]
+                user = user[:room - len(bot)]
+        self.turns.append((user, bot))
+        self._chars += self._turn_chars(user, bot)
+        while self._chars > self.char_budget and len(self.turns) > 1:
+            old_user, old_bot = self.turns.popleft()
+            self._chars -= self._turn_chars(old_user, old_bot)
+
+    @property
+    def last_bot(self):
+        return self.turns[-1][1] if self.turns else None
+
+    def render(self, pending_user_input=None):
+        """The single prompt representation: 'User: ...\\nBot: ...\\n' per turn."""
+        lines = []
+        for user, bot in self.turns:
+            if user:
+                lines.append(f"User: {user}")
+            if bot:
+                lines.append(f"Bot: {bot}")
+        if pending_user_input:
+            lines.append(f"User: {pending_user_input}")
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def serialize(self):
+        """Compact session attribute value, compressed when that is smaller."""
+        value = json.dumps([list(turn) for turn in self.turns], separators=(',', ':'))
+        if len(value) >= HISTORY_COMPRESS_MIN_CHARS:
+            packed = COMPRESSED_PREFIX + base64.b64encode(zlib.compress(value.encode('utf-8'), 9)).decode('ascii')
+            if len(packed) < len(value):
+                return packed
+        return value
+
+    def __len__(self):
+        return len(self.turns)
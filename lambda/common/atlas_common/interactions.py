@@ -0,0 +1,146 @@
+"""
+The interaction record: one item per chat-then-call, PK "LEAD#<phone>",
+SK "INTERACTION#<iso timestamp>", in the interactions table.
+
+Several functions contribute attributes over the life of a call:
+
+    CreateLeadHandler            SalesforceLeadID, InteractionType, InitialTranscript
+    InvokeOutboundCallHandler    DynamicScenario, LeadId, StepFunctionTaskToken
+    dialer.place_call            ContactId
+    SummarizeAndResumeHandler    SummaryLeaseOwner/ExpiresAt while summarizing, then
+                                 CallSummary, FullTranscript (and drops the token and lease)
+
+Every write here is an UpdateItem that touches only its own attributes, so a
+later step can't wipe out an earlier one (a full put_item from
+InvokeOutboundCallHandler used to drop SalesforceLeadID and
+InitialTranscript). Attributes that should never change once set use
+if_not_exists, which also keeps Step Functions retries harmless.
+"""
+import json
+import logging
+import os
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+INTERACTIONS_TABLE = os.environ.get('INTERACTIONS_DYNAMODB_TABLE')
+INTERACTION_TYPE = 'CHAT_AND_CALL'
+# Longer than a SummarizeAndResume invocation can run, so a live lease never expires
+SUMMARY_LEASE_SECONDS = int(os.environ.get('SUMMARY_LEASE_SECONDS', '900'))
+
+
+def interaction_keys(phone, timestamp):
+    return f"LEAD#{phone}", f"INTERACTION#{timestamp}"
+
+
+class InteractionStore:
+    def __init__(self, table_name=INTERACTIONS_TABLE):
+        self.table = boto3.resource('dynamodb').Table(table_name) if table_name else None
+
+    def _table(self):
+        if self.table is None:
+            raise ValueError("INTERACTIONS_DYNAMODB_TABLE environment variable not set")
+        return self.table
+
+    def create(self, phone, lead_id, lex_transcript, timestamp):
+        """Start the record for a chat. Returns (partition_key, sort_key)."""
+        partition_key, sort_key = interaction_keys(phone, timestamp)
+        self._table().update_item(
+            Key={'PK': partition_key, 'SK': sort_key},
+            UpdateExpression=(
+                'SET SalesforceLeadID = if_not_exists(SalesforceLeadID, :lead), '
+                'InteractionType = if_not_exists(InteractionType, :type), '
+                'InitialTranscript = if_not_exists(InitialTranscript, :transcript)'
+            ),
+            ExpressionAttributeValues={
+                ':lead': lead_id,
+                ':type': INTERACTION_TYPE,
+                ':transcript': json.dumps(lex_transcript or {}),
+            }
+        )
+        return partition_key, sort_key
+
+    def attach_call(self, partition_key, sort_key, lead_id, scenario, task_token):
+        """
+        Store what the call needs before it is dialed: the scenario (too large for
+        Connect attributes) and the task token SummarizeAndResume resumes with.
+        A retried Invoke task gets a new token, so the token is always overwritten.
+        """
+        self._table().update_item(
+            Key={'PK': partition_key, 'SK': sort_key},
+            UpdateExpression=(
+                'SET DynamicScenario = :scenario, LeadId = :lead, StepFunctionTaskToken = :token, '
+                'SalesforceLeadID = if_not_exists(SalesforceLeadID, :lead)'
+            ),
+            ExpressionAttributeValues={':scenario': scenario, ':lead': lead_id, ':token': task_token}
+        )
+
+    def record_contact(self, partition_key, sort_key, contact_id):
+        self._table().update_item(
+            Key={'PK': partition_key, 'SK': sort_key},
+            UpdateExpression='SET ContactId = :cid',
+            ConditionExpression='attribute_exists(PK)',
+            ExpressionAttributeValues={':cid': contact_id}
+        )
+
+    def claim_summary(self, partition_key, sort_key, owner, lease_seconds=SUMMARY_LEASE_SECONDS):
+        """
+        Take the lease to summarize this call. False if it's already completed
+        (no task token) or another invocation holds an unexpired lease, e.g. for a
+        duplicate Transcribe event. A crashed owner's lease can be taken once it expires.
+        """
+        now = int(time.time())
+        try:
+            self._table().update_item(
+                Key={'PK': partition_key, 'SK': sort_key},
+                UpdateExpression='SET SummaryLeaseOwner = :owner, SummaryLeaseExpiresAt = :expires',
+                ConditionExpression=(
+                    'attribute_exists(StepFunctionTaskToken) AND '
+                    '(attribute_not_exists(SummaryLeaseExpiresAt) OR SummaryLeaseExpiresAt < :now '
+                    'OR SummaryLeaseOwner = :owner)'
+                ),
+                ExpressionAttributeValues={':owner': owner, ':expires': now + lease_seconds, ':now': now}
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def release_summary(self, partition_key, sort_key, owner):
+        """Give the lease up after a failure so a retry doesn't wait for it to expire."""
+        try:
+            self._table().update_item(
+                Key={'PK': partition_key, 'SK': sort_key},
+                UpdateExpression='REMOVE SummaryLeaseOwner, SummaryLeaseExpiresAt',
+                ConditionExpression='SummaryLeaseOwner = :owner',
+                ExpressionAttributeValues={':owner': owner}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                logger.warning(f"Failed to release summary lease on {partition_key}#{sort_key}: {e}")
+
+    def complete(self, partition_key, sort_key, summary, transcript):
+        """
+        Record the call outcome and drop the task token. False if another
+        invocation already completed the record (duplicate Transcribe event).
+        """
+        try:
+            self._table().update_item(
+                Key={'PK': partition_key, 'SK': sort_key},
+                UpdateExpression=(
+                    'SET CallSummary = :s, FullTranscript = :t '
+                    'REMOVE StepFunctionTaskToken, SummaryLeaseOwner, SummaryLeaseExpiresAt'
+                ),
+                ConditionExpression='attribute_exists(StepFunctionTaskToken)',
+                ExpressionAttributeValues={':s': summary, ':t': transcript}
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logger.warning(f"Interaction {partition_key}#{sort_key} was already completed")
+                return False
+            raise
@@ -0,0 +1,152 @@
+"""
+DynamoDB phone -> Salesforce LeadId index.
+
+CreateLeadHandler used to run "SELECT Id FROM Lead WHERE Phone = ..." on every
+execution, and Phone is not an indexed external ID in our org. The index
+lives in the interactions table under PK "PHONE#<e164>", SK "LEAD_INDEX":
+
+    Status = READY    LeadId is known (populated on create and on SOQL hits)
+    Status = PENDING  an execution holds the claim and is creating the Lead
+
+The claim is a conditional write, so concurrent executions for the same
+phone can't both create a Lead; the loser waits for the winner's entry.
+Claims expire after CLAIM_SECONDS in case the owner died. READY entries are
+removed when the Lead is deleted (see atlas_common.side_effects) and are
+ignored after LEAD_INDEX_MAX_AGE_SECONDS, which bounds staleness for Leads
+deleted directly in Salesforce.
+"""
+import logging
+import os
+import time
+import uuid
+
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+LEAD_INDEX_TABLE = os.environ.get('LEAD_INDEX_TABLE', os.environ.get('INTERACTIONS_DYNAMODB_TABLE'))
+LEAD_INDEX_MAX_AGE_SECONDS = int(os.environ.get('LEAD_INDEX_MAX_AGE_SECONDS', str(30 * 24 * 3600)))
+CLAIM_SECONDS = int(os.environ.get('LEAD_INDEX_CLAIM_SECONDS', '30'))
+WAIT_POLL_SECONDS = 0.25
+INDEX_SORT_KEY = 'LEAD_INDEX'
+READY = 'READY'
+PENDING = 'PENDING'
+
+
+def index_key(phone):
+    return {'PK': f"PHONE#{phone}", 'SK': INDEX_SORT_KEY}
+
+
+class LeadIndex:
+    def __init__(self, table_name=LEAD_INDEX_TABLE, max_age_seconds=LEAD_INDEX_MAX_AGE_SECONDS):
+        self.table_name = table_name
+        self.dynamodb = boto3.resource('dynamodb') if table_name else None
+        self.table = self.dynamodb.Table(table_name) if table_name else None
+        self.max_age_seconds = max_age_seconds
+        self.owner = str(uuid.uuid4())
+
+    def _lead_id(self, item):
+        if not item or item.get('Status') != READY:
+            return None
+        if time.time() - float(item.get('IndexedAt', 0)) > self.max_age_seconds:
+            return None
+        return item.get('LeadId')
+
+    def get(self, phone):
+        """LeadId for phone, or None on a miss (absent, pending or too old)."""
+        if self.table is None:
+            return None
+        item = self.table.get_item(Key=index_key(phone), ConsistentRead=True).get('Item')
+        return self._lead_id(item)
+
+    def get_many(self, phones):
+        """phone -> LeadId for the phones that hit (BatchGetItem, 100 keys per request)."""
+        if self.table is None or not phones:
+            return {}
+        hits = {}
+        phones = list(dict.fromkeys(phones))
+        for i in range(0, len(phones), 100):
+            request = {self.table_name: {'Keys': [index_key(phone) for phone in phones[i:i + 100]],
+                                         'ConsistentRead': True}}
+            while request:
+                response = self.dynamodb.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(self.table_name, []):
+                    lead_id = self._lead_id(item)
+                    if lead_id:
+                        hits[item['PK'][len('PHONE#'):]] = lead_id
+                request = response.get('UnprocessedKeys') or None
+        return hits
+
+    def claim(self, phone):
+        """Try to become the execution that resolves/creates the Lead for phone."""
+        if self.table is None:
+            return True
+        now = int(time.time())
+        try:
+            self.table.put_item(
+                Item={**index_key(phone), 'Status': PENDING, 'ClaimedBy': self.owner, 'ClaimExpiresAt': now + CLAIM_SECONDS},
+                ConditionExpression=(
+                    'attribute_not_exists(PK) '
+                    'OR (#status = :ready AND IndexedAt < :stale) '
+                    'OR (#status = :pending AND ClaimExpiresAt < :now)'
+                ),
+                ExpressionAttributeNames={'#status': 'Status'},
+                ExpressionAttributeValues={
+                    ':ready': READY, ':pending': PENDING, ':now': now,
+                    ':stale': now - self.max_age_seconds,
+                }
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def wait_for(self, phone, timeout_seconds=CLAIM_SECONDS):
+        """Poll until another execution's claim resolves; None if it doesn't in time."""
+        deadline = time.time() + timeout_seconds
+        while time.time() < deadline:
+            lead_id = self.get(phone)
+            if lead_id:
+                return lead_id
+            time.sleep(WAIT_POLL_SECONDS)
+        return None
+
+    @staticmethod
+    def _item(phone, lead_id):
+        return {**index_key(phone), 'Status': READY, 'LeadId': lead_id, 'IndexedAt': int(time.time())}
+
+    def put(self, phone, lead_id):
+        if self.table is None:
+            return
+        self.table.put_item(Item=self._item(phone, lead_id))
+
+    def put_many(self, entries):
+        """entries: {phone: lead_id}. BatchWriteItem, unprocessed items are retried."""
+        if self.table is None or not entries:
+            return
+        with self.table.batch_writer() as batch:
+            for phone, lead_id in entries.items():
+                batch.put_item(Item=self._item(phone, lead_id))
+
+    def release(self, phone):
+        """Drop our PENDING claim after a failure so the next execution can retry at once."""
+        if self.table is None:
+            return
+        try:
+            self.table.delete_item(
+                Key=index_key(phone),
+                ConditionExpression='#status = :pending AND ClaimedBy = :owner',
+                ExpressionAttributeNames={'#status': 'Status'},
+                ExpressionAttributeValues={':pending': PENDING, ':owner': self.owner}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                logger.warning(f"[LEAD INDEX] Failed to release claim for {phone}: {e}")
+
+    def invalidate(self, phone):
+        """Forget phone's LeadId (e.g. after the Lead was deleted)."""
+        if self.table is None:
+            return
+        self.table.delete_item(Key=index_key(phone))
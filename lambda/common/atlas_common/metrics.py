@@ -0,0 +1,34 @@
+"""
+CloudWatch metrics via the Embedded Metric Format (EMF).
+
+Printing an EMF record to stdout makes CloudWatch Logs extract the metrics
+asynchronously, so emitting a metric costs no API call on the request path.
+"""
+import json
+import os
+import time
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'AtlasEngine')
+
+
+def emit_metrics(metrics, dimensions=None, properties=None, namespace=METRICS_NAMESPACE):
+    """
+    metrics: {name: (value, unit)} e.g. {'Latency': (412, 'Milliseconds')}
+    dimensions: {name: value}, all values must be strings
+    properties: extra searchable fields logged alongside (not metrics)
+    """
+    dimensions = dimensions or {}
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': namespace,
+                'Dimensions': [list(dimensions.keys())],
+                'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in metrics.items()]
+            }]
+        }
+    }
+    record.update(dimensions)
+    record.update(properties or {})
+    record.update({name: value for name, (value, _) in metrics.items()})
+    print(json.dumps(record, default=str))
@@ -0,0 +1,20 @@
+"""
+NANP area code classes for atlas_common.phone (generated, do not edit).
+
+Generated by scripts/generate_nanp_data.py from phonenumbers 8.13.26.
+Character i is area code 200 + i: V = valid, X = invalid, M = defer to phonenumbers.
+"""
+PHONENUMBERS_VERSION = '8.13.26'
+
+NPA_CLASSES = (
+    'XVVVVVVVVVVXVVVVVVVVVXXVVVVVVVXVXXVXVXXVVXMXXXMXVVVVVVVXVXXXVXVVMXXVMVVXVXXXVXXV'
+    'XVXVMXXXXVXXXXXXXXXXXVVVVVVVVVVXVVVVVVVVVVXVXVVXXVVVVXVXVVXVMVXVXMVVXXVVVXVXXXXX'
+    'VVXXVVXVVVXXXXXXXXXXVXVXXVVXXXXXXXXXXXXXXVVVVVVVVVVXVVVVVVVVXXXVVVXXVXVVVXVVXVVX'
+    'VMVVXVXVVXVXXXXXXXVXXXXVVXXXVVVXMMVVXXVVVXXXVXXXXXXXXXXXXXXXVVVVVMVVVVVXVVVVVVVV'
+    'VVVMMVVVVVVVXVVXXXXVVVXXVXXXVXXVXXXXXVXVXVVVVXVVXXVVVVVVXVXVVVVXVVVVVXXXXXXXXXXX'
+    'VVVVVVVVVVVXVVVVVVVVVXVVXXVXVVVVXXXXVXXVVVXXXXVVXMVVXXXXVVVVVVVXMXXVXVMMVXXXXXVX'
+    'VVVVMXXXXVXXXXXXXXXXXVVVVVVVVVXXVVVVVVVVVMXXVVVVXXMVVXVXXVXXVXVVXXXVXXXXXVVXXVMX'
+    'VXVVXVXMXVVVVVVVXXVVVVVXMVVVXXXXXXXXXXXXVVVVVVVVVVVXVVVVVVVVVXXXXVVXVVVVVVXVXXVV'
+    'VXXVVVXVVVVXXXVVVVVVVXVVVVVVMMVXVVXXMVVXXXXXXXXXVXXXXXXXXXXXVVVVVVVVVVVXVVVVVVVV'
+    'VXXXXVXXVVVVXXVXVVVVVVXVXVXVVVXVVXVXVXXVXXXXXXXXXXVVVVXXXXVVVXXMVVVXXVXXXXXXXXXX'
+)
@@ -0,0 +1,159 @@
+"""
+Pre-generated paraphrase pools for intents with fixed grounding text.
+
+Instead of asking Bedrock to paraphrase the same base_context on every turn,
+a pool of N variants per intent is generated off the request path and stored
+in DynamoDB (the response cache table, under CacheKey "POOL#<intent>"). Turns
+pick a random variant from an in-container copy, so latency is a single
+GetItem on a cold container and zero afterwards, and does not depend on
+Bedrock health.
+
+A pool is considered stale when the base_context changed, after K uses in
+this container, or after a maximum age. Refreshes are guarded by a short
+lease on the pool item so concurrent containers don't all regenerate it.
+"""
+import hashlib
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.exceptions import ClientError
+
+from atlas_common.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PARAPHRASE_POOL_TABLE = os.environ.get('PARAPHRASE_POOL_TABLE', os.environ.get('RESPONSE_CACHE_TABLE'))
+PARAPHRASE_POOL_SIZE = int(os.environ.get('PARAPHRASE_POOL_SIZE', '8'))
+PARAPHRASE_POOL_REFRESH_USES = int(os.environ.get('PARAPHRASE_POOL_REFRESH_USES', '50'))
+PARAPHRASE_POOL_MAX_AGE_SECONDS = int(os.environ.get('PARAPHRASE_POOL_MAX_AGE_SECONDS', '86400'))
+PARAPHRASE_POOL_LOCAL_TTL_SECONDS = int(os.environ.get('PARAPHRASE_POOL_LOCAL_TTL_SECONDS', '300'))
+REFRESH_LEASE_SECONDS = 120
+REFRESH_REQUEST_INTERVAL_SECONDS = 60
+GENERATE_WORKERS = 4
+
+
+def context_hash(base_context):
+    return hashlib.sha256(base_context.encode('utf-8')).hexdigest()[:16]
+
+
+def pool_key(intent_name):
+    return f"POOL#{intent_name}"
+
+
+class ParaphrasePool:
+    """
+    generate(base_context) must return one paraphrase, or base_context itself
+    when generation failed (those are discarded).
+    """
+
+    def __init__(self, generate, table_name=PARAPHRASE_POOL_TABLE, pool_size=PARAPHRASE_POOL_SIZE,
+                 refresh_after_uses=PARAPHRASE_POOL_REFRESH_USES, max_age_seconds=PARAPHRASE_POOL_MAX_AGE_SECONDS,
+                 local_ttl_seconds=PARAPHRASE_POOL_LOCAL_TTL_SECONDS):
+        self.generate = generate
+        self.table = boto3.resource('dynamodb').Table(table_name) if table_name else None
+        self.pool_size = pool_size
+        self.refresh_after_uses = refresh_after_uses
+        self.max_age_seconds = max_age_seconds
+        self.local = TTLCache(max_size=64, ttl_seconds=local_ttl_seconds)
+        self.uses = {}
+        self.refresh_requested_at = {}
+
+    def _load(self, intent_name):
+        pool = self.local.get(intent_name)
+        if pool is not None or self.table is None:
+            return pool
+        try:
+            item = self.table.get_item(Key={'CacheKey': pool_key(intent_name)}).get('Item')
+        except ClientError as e:
+            logger.warning(f"[POOL] DynamoDB read failed for {intent_name}: {e}")
+            return None
+        pool = {
+            'variants': list(item.get('Variants', [])),
+            'generated_at': int(item.get('GeneratedAt', 0)),
+            'context_hash': item.get('ContextHash')
+        } if item else {'variants': [], 'generated_at': 0, 'context_hash': None}
+        # Empty pools are cached too, so a missing pool costs one read per local TTL
+        self.local.set(intent_name, pool)
+        return pool
+
+    def _is_current(self, pool, base_context):
+        return bool(pool and pool['variants'] and pool['context_hash'] == context_hash(base_context))
+
+    def pick(self, intent_name, base_context, exclude=None):
+        """Return a random variant (avoiding exclude, e.g. the last bot reply) or None if no usable pool."""
+        pool = self._load(intent_name)
+        if not self._is_current(pool, base_context):
+            return None
+        choices = [v for v in pool['variants'] if v != exclude] or pool['variants']
+        self.uses[intent_name] = self.uses.get(intent_name, 0) + 1
+        return random.choice(choices)
+
+    def needs_refresh(self, intent_name, base_context):
+        pool = self._load(intent_name)
+        if not self._is_current(pool, base_context):
+            return True
+        if self.uses.get(intent_name, 0) >= self.refresh_after_uses:
+            return True
+        return time.time() - pool['generated_at'] > self.max_age_seconds
+
+    def should_request_refresh(self, intent_name, base_context):
+        """needs_refresh(), rate-limited so one container asks at most once per interval."""
+        if not self.needs_refresh(intent_name, base_context):
+            return False
+        now = time.time()
+        if now - self.refresh_requested_at.get(intent_name, 0) < REFRESH_REQUEST_INTERVAL_SECONDS:
+            return False
+        self.refresh_requested_at[intent_name] = now
+        self.uses[intent_name] = 0
+        return True
+
+    def _claim_refresh(self, intent_name):
+        now = int(time.time())
+        try:
+            self.table.update_item(
+                Key={'CacheKey': pool_key(intent_name)},
+                UpdateExpression='SET RefreshLeaseUntil = :until',
+                ConditionExpression='attribute_not_exists(RefreshLeaseUntil) OR RefreshLeaseUntil < :now',
+                ExpressionAttributeValues={':until': now + REFRESH_LEASE_SECONDS, ':now': now}
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logger.info(f"[POOL] Refresh for {intent_name} already in progress elsewhere")
+                return False
+            raise
+
+    def refresh(self, intent_name, base_context):
+        """Generate a new pool and store it. Returns the number of variants written."""
+        if self.table is not None and not self._claim_refresh(intent_name):
+            return 0
+
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=GENERATE_WORKERS) as executor:
+            results = list(executor.map(lambda _: self.generate(base_context), range(self.pool_size)))
+        variants = []
+        for text in results:
+            if text and text != base_context and text not in variants:
+                variants.append(text)
+        if not variants:
+            logger.warning(f"[POOL] No variants generated for {intent_name}; keeping existing pool")
+            return 0
+
+        pool = {'variants': variants, 'generated_at': int(time.time()), 'context_hash': context_hash(base_context)}
+        if self.table is not None:
+            # put_item replaces the item, which also clears RefreshLeaseUntil
+            self.table.put_item(Item={
+                'CacheKey': pool_key(intent_name),
+                'Intent': intent_name,
+                'Variants': variants,
+                'GeneratedAt': pool['generated_at'],
+                'ContextHash': pool['context_hash']
+            })
+        self.local.set(intent_name, pool)
+        self.uses[intent_name] = 0
+        logger.info(f"[POOL] Refreshed {intent_name}: {len(variants)} variants in {time.time() - started:.2f}s")
+        return len(variants)
@@ -0,0 +1,86 @@
+"""
+Fast-path E.164 normalizer for NANP numbers.
+
+The phonenumbers package (~16 MB of metadata) dominates the Lex handler's cold
+start, yet nearly every number we see is a US/Canada number in one of a few
+formats Lex produces ("2065551234", "+12065551234", "(206) 555-1234",
+"1 206 555 1234", ...). Those are normalized and validated here against a
+precomputed area-code table (nanp_data.py). Anything else (other countries,
+extensions, vanity letters, area codes whose validity depends on the
+exchange) falls back to a lazily imported phonenumbers.
+
+scripts/validate_phone_fastpath.py compares this module with phonenumbers
+on a large generated corpus.
+"""
+import re
+
+from atlas_common.nanp_data import NPA_CLASSES
+
+_NPA_CLASSES = ''.join(NPA_CLASSES)
+_FORMATTING = re.compile(r'[\s().\-]')
+_DIGITS = re.compile(r'^\+?\d+$')
+
+
+class InvalidPhoneNumber(ValueError):
+    pass
+
+
+def _fast_path(raw, validate):
+    """Returns (e164 or None, handled). handled=False means defer to phonenumbers."""
+    compact = _FORMATTING.sub('', raw)
+    if not _DIGITS.match(compact):
+        return None, False
+
+    if compact.startswith('+'):
+        digits = compact[1:]
+        if len(digits) != 11 or digits[0] != '1':
+            return None, False
+        digits = digits[1:]
+    elif len(compact) == 11 and compact[0] == '1':
+        digits = compact[1:]
+    elif len(compact) == 10:
+        digits = compact
+    else:
+        return None, False
+
+    # NPA and NXX must start with 2-9; anything else is left to phonenumbers
+    if digits[0] in '01' or digits[3] in '01':
+        return None, False
+    if not validate:
+        return '+1' + digits, True
+
+    npa_class = _NPA_CLASSES[int(digits[:3]) - 200]
+    if npa_class == 'V':
+        return '+1' + digits, True
+    if npa_class == 'X':
+        return None, True
+    return None, False
+
+
+def _slow_path(raw, region, validate):
+    import phonenumbers
+
+    try:
+        parsed = phonenumbers.parse(raw, region)
+    except phonenumbers.NumberParseException as e:
+        raise InvalidPhoneNumber(str(e))
+    if validate and not phonenumbers.is_valid_number(parsed):
+        raise InvalidPhoneNumber("The provided phone number is not valid.")
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+
+def to_e164(raw, region='US', validate=True):
+    """
+    Normalize raw to E.164 (e.g. '+12065551234'), as phonenumbers.parse(raw, region)
+    + format_number(E164) would. With validate=True, also require
+    phonenumbers.is_valid_number(). Raises InvalidPhoneNumber.
+    """
+    if not raw or not isinstance(raw, str):
+        raise InvalidPhoneNumber("Phone number is empty.")
+    if region == 'US':
+        e164, handled = _fast_path(raw.strip(), validate)
+        if handled:
+            if e164 is None:
+                raise InvalidPhoneNumber("The provided phone number is not valid.")
+            return e164
+    return _slow_path(raw, region, validate)
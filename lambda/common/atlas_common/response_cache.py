@@ -0,0 +1,107 @@
+"""
+Two-tier cache for grounded intent replies.
+
+Tier 1 is an in-container TTLCache; tier 2 is a DynamoDB table with a TTL
+attribute so every concurrent Lambda container shares the same replies.
+Keys combine the intent name, the normalized user input and a fingerprint of
+the last few history lines, so "hi" / "Hello!" openers on a fresh session hit
+the same entry while mid-conversation turns stay context specific.
+"""
+import hashlib
+import logging
+import os
+import re
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+
+from atlas_common.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TABLE = os.environ.get('RESPONSE_CACHE_TABLE')
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', '3600'))
+RESPONSE_CACHE_LOCAL_SIZE = int(os.environ.get('RESPONSE_CACHE_LOCAL_SIZE', '512'))
+RESPONSE_CACHE_LOCAL_TTL_SECONDS = int(os.environ.get('RESPONSE_CACHE_LOCAL_TTL_SECONDS', '600'))
+RESPONSE_CACHE_HISTORY_LINES = int(os.environ.get('RESPONSE_CACHE_HISTORY_LINES', '2'))
+
+_NON_WORD = re.compile(r'[^a-z0-9\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_input(text):
+    """Lowercase, drop punctuation and collapse whitespace: 'Hello!!  ' -> 'hello'."""
+    text = _NON_WORD.sub('', (text or '').lower())
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def history_fingerprint(history, max_lines=RESPONSE_CACHE_HISTORY_LINES):
+    """Hash of the last max_lines non-empty history lines ('' for a fresh session)."""
+    lines = [line.strip() for line in (history or '').splitlines() if line.strip()]
+    if not lines or max_lines <= 0:
+        return ''
+    recent = '\n'.join(lines[-max_lines:])
+    return hashlib.sha256(recent.encode('utf-8')).hexdigest()[:16]
+
+
+def make_key(intent_name, user_input, history):
+    raw = f"{intent_name}|{normalize_input(user_input)}|{history_fingerprint(history)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """In-container LRU in front of an optional shared DynamoDB TTL table."""
+
+    def __init__(self, table_name=RESPONSE_CACHE_TABLE, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+                 local_size=RESPONSE_CACHE_LOCAL_SIZE, local_ttl_seconds=RESPONSE_CACHE_LOCAL_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.local = TTLCache(max_size=local_size, ttl_seconds=local_ttl_seconds)
+        self.table = boto3.resource('dynamodb').Table(table_name) if table_name else None
+        self.counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'stores': 0, 'errors': 0}
+
+    def get(self, intent_name, user_input, history):
+        key = make_key(intent_name, user_input, history)
+        value = self.local.get(key)
+        if value is not None:
+            self.counters['local_hits'] += 1
+            return value
+
+        if self.table is not None:
+            try:
+                item = self.table.get_item(Key={'CacheKey': key}).get('Item')
+                # DynamoDB TTL deletes lazily, so check expiry ourselves
+                if item and int(item.get('ExpiresAt', 0)) > time.time():
+                    value = item['Response']
+                    self.local.set(key, value)
+                    self.counters['shared_hits'] += 1
+                    return value
+            except ClientError as e:
+                self.counters['errors'] += 1
+                logger.warning(f"[CACHE] DynamoDB read failed: {e}")
+
+        self.counters['misses'] += 1
+        return None
+
+    def put(self, intent_name, user_input, history, response):
+        key = make_key(intent_name, user_input, history)
+        self.local.set(key, response)
+        self.counters['stores'] += 1
+        if self.table is None:
+            return
+        try:
+            self.table.put_item(Item={
+                'CacheKey': key,
+                'Intent': intent_name,
+                'Response': response,
+                'ExpiresAt': int(time.time()) + self.ttl_seconds
+            })
+        except ClientError as e:
+            self.counters['errors'] += 1
+            logger.warning(f"[CACHE] DynamoDB write failed: {e}")
+
+    def stats(self):
+        """Hit/miss counters for this container, plus the overall hit rate."""
+        lookups = self.counters['local_hits'] + self.counters['shared_hits'] + self.counters['misses']
+        hits = lookups - self.counters['misses']
+        return dict(self.counters, lookups=lookups, hit_rate=round(hits / lookups, 3) if lookups else 0.0)
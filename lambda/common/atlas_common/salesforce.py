@@ -0,0 +1,166 @@
+"""
+Shared Salesforce session manager.
+
+One warm Lambda container keeps:
+- the Secrets Manager credentials (fetched once),
+- the OAuth access token from the JWT bearer flow (refreshed before it expires
+  or when Salesforce answers 401 / INVALID_SESSION_ID),
+- one keep-alive requests.Session connection pool used for both the token
+  exchange and every REST call made through simple_salesforce.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import boto3
+import requests
+from jwt import encode
+from requests.adapters import HTTPAdapter
+from simple_salesforce import Salesforce
+from simple_salesforce.exceptions import (
+    SalesforceAuthenticationFailed,
+    SalesforceExpiredSession,
+    SalesforceGeneralError,
+)
+
+logger = logging.getLogger(__name__)
+
+# JWT bearer responses do not carry expires_in; the lifetime is the org's session
+# timeout. Refresh well before the shortest setting we run with.
+TOKEN_TTL_SECONDS = int(os.environ.get('SF_TOKEN_TTL_SECONDS', '1800'))
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.environ.get('SF_TOKEN_REFRESH_MARGIN_SECONDS', '300'))
+HTTP_POOL_SIZE = int(os.environ.get('SF_HTTP_POOL_SIZE', '10'))
+HTTP_TIMEOUT_SECONDS = float(os.environ.get('SF_HTTP_TIMEOUT_SECONDS', '10'))
+
+REQUIRED_CREDENTIAL_KEYS = ('username', 'client_id', 'private_key')
+
+secrets_client = boto3.client('secretsmanager')
+
+
+def _build_http_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount('https://', adapter)
+    return session
+
+
+class SalesforceSession:
+    """Per-container cache of the Salesforce secret, access token and client."""
+
+    def __init__(self, secret_arn=None):
+        self._secret_arn = secret_arn
+        self._lock = threading.Lock()
+        self._http = _build_http_session()
+        self._credentials = None
+        self._client = None
+        self._expires_at = 0.0
+
+    @property
+    def http(self):
+        """The pooled requests.Session shared by every Salesforce call."""
+        return self._http
+
+    def get_credentials(self):
+        """Return the JWT credentials, reading Secrets Manager only on first use."""
+        if self._credentials is None:
+            secret_arn = self._secret_arn or os.environ.get('SALESFORCE_SECRET_ARN')
+            if not secret_arn:
+                raise ValueError("SALESFORCE_SECRET_ARN environment variable not set.")
+            logger.info(f"[SF AUTH] Retrieving credentials from secret: {secret_arn}")
+            response = secrets_client.get_secret_value(SecretId=secret_arn)
+            credentials = json.loads(response['SecretString'])
+            for key in REQUIRED_CREDENTIAL_KEYS:
+                if key not in credentials:
+                    raise ValueError(f"Missing required credential for JWT flow: {key}")
+            self._credentials = credentials
+        return self._credentials
+
+    def get_client(self):
+        """Return a Salesforce client, authenticating only when the token is missing or close to expiry."""
+        with self._lock:
+            if self._client is None or time.time() >= self._expires_at - TOKEN_REFRESH_MARGIN_SECONDS:
+                self._client = self._authenticate()
+            return self._client
+
+    def invalidate(self):
+        """Drop the cached token so the next get_client() re-authenticates."""
+        with self._lock:
+            self._client = None
+            self._expires_at = 0.0
+
+    def _authenticate(self):
+        creds = self.get_credentials()
+        is_sandbox = creds.get('is_sandbox', False)
+        endpoint = 'https://test.salesforce.com' if is_sandbox else 'https://login.salesforce.com'
+
+        payload = {
+            'iss': creds['client_id'],
+            'sub': creds['username'],
+            'aud': endpoint,
+            'exp': datetime.utcnow() + timedelta(minutes=5)
+        }
+        assertion = encode(payload, creds['private_key'], algorithm='RS256')
+
+        started = time.time()
+        result = self._http.post(
+            endpoint + '/services/oauth2/token',
+            data={
+                'grant_type': 'urn:ietf:params:oauth:grant-type:jwt-bearer',
+                'assertion': assertion
+            },
+            timeout=HTTP_TIMEOUT_SECONDS
+        )
+        try:
+            body = result.json()
+        except ValueError:
+            body = {}
+
+        if result.status_code != 200:
+            logger.error(f"[SF AUTH] JWT exchange failed: {body}")
+            raise SalesforceAuthenticationFailed(body.get('error', 'Unknown'),
+                                                 body.get('error_description', 'JWT token exchange failed'))
+
+        self._expires_at = time.time() + TOKEN_TTL_SECONDS
+        logger.info(f"[SF AUTH] Authenticated in {time.time() - started:.3f}s. Instance: {body['instance_url']}")
+        return Salesforce(instance_url=body['instance_url'], session_id=body['access_token'], session=self._http)
+
+
+def _is_invalid_session(error):
+    if isinstance(error, SalesforceExpiredSession):
+        return True
+    return isinstance(error, SalesforceGeneralError) and 'INVALID_SESSION_ID' in str(error)
+
+
+_default_session = None
+
+
+def get_session():
+    """Return the container-wide SalesforceSession."""
+    global _default_session
+    if _default_session is None:
+        _default_session = SalesforceSession()
+    return _default_session
+
+
+def get_salesforce():
+    """Return an authenticated Salesforce client from the container-wide session."""
+    return get_session().get_client()
+
+
+def with_salesforce(operation):
+    """
+    Run operation(sf) with the cached client. If Salesforce rejects the token
+    (401 / INVALID_SESSION_ID), re-authenticate once and retry.
+    """
+    session = get_session()
+    try:
+        return operation(session.get_client())
+    except (SalesforceExpiredSession, SalesforceGeneralError) as e:
+        if not _is_invalid_session(e):
+            raise
+        logger.warning("[SF AUTH] Session rejected by Salesforce; re-authenticating")
+        session.invalidate()
+        return operation(session.get_client())
@@ -0,0 +1,299 @@
+"""
+Write-behind queue for Salesforce side effects requested during live calls.
+
+Creating a callback Case or deleting a Lead costs a 1-2 s Salesforce round
+trip (more during Salesforce latency spikes), and the caller would be waiting
+on the line for it. Instead the Lex handler enqueues the side effect and
+confirms immediately; the SalesforceSideEffectsHandler worker drains the queue
+in batches and applies the effects with sObject Collections calls.
+
+Message body (JSON):
+    {"kind": "create_callback_case", "idempotencyKey": "...", "payload": {...}, "enqueuedAt": 1730000000}
+
+Delivery is at-least-once, so every message carries an idempotency key and the
+worker records completed keys in a DynamoDB ledger (with a TTL) and skips them
+on redelivery. Messages that keep failing are retried by SQS and end up in the
+dead-letter queue.
+
+Without SIDE_EFFECTS_QUEUE_URL (local runs, tests) a LocalQueue stands in for
+SQS; by default it applies each effect inline, as the handlers used to.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+
+import boto3
+from botocore.exceptions import ClientError
+
+from atlas_common.lead_index import LeadIndex
+from atlas_common.salesforce import with_salesforce
+
+logger = logging.getLogger(__name__)
+
+SIDE_EFFECTS_QUEUE_URL = os.environ.get('SIDE_EFFECTS_QUEUE_URL')
+SIDE_EFFECTS_LEDGER_TABLE = os.environ.get('SIDE_EFFECTS_LEDGER_TABLE')
+SIDE_EFFECTS_LEDGER_TTL_SECONDS = int(os.environ.get('SIDE_EFFECTS_LEDGER_TTL_SECONDS', str(7 * 24 * 3600)))
+
+CREATE_CALLBACK_CASE = 'create_callback_case'
+DELETE_LEAD = 'delete_lead'
+
+# sObject Collections accept up to 200 records/ids per request
+COLLECTION_LIMIT = 200
+# Lead lookups for deletes are OR-ed into one SOQL query per chunk
+DELETE_QUERY_CHUNK = 50
+# DynamoDB BatchGetItem / BatchWriteItem limits
+LEDGER_GET_LIMIT = 100
+LEDGER_WRITE_LIMIT = 25
+# A Lead that is already gone counts as deleted
+ALREADY_DELETED_CODES = {'ENTITY_IS_DELETED', 'INVALID_CROSS_REFERENCE_KEY'}
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _soql_quote(value):
+    return str(value).replace('\\', '\\\\').replace("'", "\\'")
+
+
+def make_message(kind, payload, idempotency_key):
+    return {
+        'kind': kind,
+        'idempotencyKey': idempotency_key,
+        'payload': payload,
+        'enqueuedAt': int(time.time()),
+    }
+
+
+class SqsQueue:
+    def __init__(self, queue_url):
+        self.queue_url = queue_url
+        self.client = boto3.client('sqs')
+
+    def send(self, message):
+        self.client.send_message(
+            QueueUrl=self.queue_url,
+            MessageBody=json.dumps(message, separators=(',', ':')),
+            MessageAttributes={'kind': {'DataType': 'String', 'StringValue': message['kind']}},
+        )
+
+
+class LocalQueue:
+    """In-memory stand-in for SQS. With drain_inline, each effect is applied on send."""
+
+    def __init__(self, drain_inline=True, processor=None):
+        self.drain_inline = drain_inline
+        self.processor = processor
+        self.messages = deque()
+
+    def send(self, message):
+        self.messages.append((str(uuid.uuid4()), message))
+        if self.drain_inline:
+            failed = self.drain()
+            if failed:
+                raise RuntimeError(f"Side effect {message['kind']} failed")
+
+    def drain(self, processor=None):
+        """Process everything queued; returns the message ids that failed (kept queued)."""
+        if processor is None:
+            # Keep one processor so its in-memory ledger dedupes across drains
+            self.processor = self.processor or SideEffectProcessor()
+            processor = self.processor
+        batch = list(self.messages)
+        self.messages.clear()
+        failed = set(processor.process(batch))
+        self.messages.extend(item for item in batch if item[0] in failed)
+        return failed
+
+
+_queue = None
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        _queue = SqsQueue(SIDE_EFFECTS_QUEUE_URL) if SIDE_EFFECTS_QUEUE_URL else LocalQueue()
+    return _queue
+
+
+def enqueue(kind, payload, idempotency_key):
+    """Queue a side effect for the worker. Raises if the queue rejects it."""
+    message = make_message(kind, payload, idempotency_key)
+    get_queue().send(message)
+    logger.info(f"[SIDE EFFECT] Queued {kind} ({idempotency_key})")
+    return message
+
+
+class Ledger:
+    """Completed idempotency keys: DynamoDB with a TTL, or in-memory without a table."""
+
+    def __init__(self, table_name=SIDE_EFFECTS_LEDGER_TABLE, ttl_seconds=SIDE_EFFECTS_LEDGER_TTL_SECONDS):
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+        self.client = boto3.client('dynamodb') if table_name else None
+        self.local = set()
+
+    def completed(self, keys):
+        keys = list(dict.fromkeys(keys))
+        if not self.client:
+            return {key for key in keys if key in self.local}
+        done = set()
+        for chunk in _chunks(keys, LEDGER_GET_LIMIT):
+            request = {self.table_name: {
+                'Keys': [{'IdempotencyKey': {'S': key}} for key in chunk],
+                'ProjectionExpression': 'IdempotencyKey',
+            }}
+            while request:
+                response = self.client.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(self.table_name, []):
+                    done.add(item['IdempotencyKey']['S'])
+                request = response.get('UnprocessedKeys') or None
+        return done
+
+    def mark_completed(self, results):
+        """results: {idempotency_key: result string}. Best effort; a miss only risks a duplicate."""
+        if not results:
+            return
+        if not self.client:
+            self.local.update(results)
+            return
+        expires_at = str(int(time.time()) + self.ttl_seconds)
+        items = [
+            {'PutRequest': {'Item': {
+                'IdempotencyKey': {'S': key},
+                'Result': {'S': result or ''},
+                'CompletedAt': {'N': str(int(time.time()))},
+                'ExpiresAt': {'N': expires_at},
+            }}}
+            for key, result in results.items()
+        ]
+        try:
+            for chunk in _chunks(items, LEDGER_WRITE_LIMIT):
+                request = {self.table_name: chunk}
+                while request:
+                    response = self.client.batch_write_item(RequestItems=request)
+                    request = response.get('UnprocessedItems') or None
+        except ClientError as e:
+            logger.warning(f"[SIDE EFFECT] Failed to record completed keys: {e}")
+
+
+class SideEffectProcessor:
+    """Applies a batch of queued side effects; used by the worker and LocalQueue."""
+
+    def __init__(self, ledger=None, lead_index=None):
+        self.ledger = ledger or Ledger()
+        self.lead_index = lead_index or LeadIndex()
+
+    def _invalidate_lead_index(self, phone):
+        try:
+            self.lead_index.invalidate(phone)
+        except ClientError as e:
+            # The entry ages out after LEAD_INDEX_MAX_AGE_SECONDS anyway
+            logger.warning(f"[SIDE EFFECT] Failed to invalidate lead index for {phone}: {e}")
+
+    def process(self, messages):
+        """
+        messages: [(message_id, message dict)]. Returns the message ids that
+        failed and should be redelivered.
+        """
+        failed = []
+        pending = {}
+        for message_id, message in messages:
+            if message.get('kind') not in (CREATE_CALLBACK_CASE, DELETE_LEAD) or not message.get('idempotencyKey'):
+                # Retrying can't fix a malformed message; let it go to the DLQ
+                logger.error(f"[SIDE EFFECT] Malformed message {message_id}: {message}")
+                failed.append(message_id)
+                continue
+            pending.setdefault(message['idempotencyKey'], []).append((message_id, message))
+
+        done = self.ledger.completed(pending.keys())
+        if done:
+            logger.info(f"[SIDE EFFECT] Skipping {len(done)} already completed side effects")
+
+        by_kind = {CREATE_CALLBACK_CASE: {}, DELETE_LEAD: {}}
+        for key, entries in pending.items():
+            if key not in done:
+                # Duplicates inside one batch are applied once
+                by_kind[entries[0][1]['kind']][key] = entries[0][1]['payload']
+
+        results, errors = {}, set()
+        for kind, handler in ((CREATE_CALLBACK_CASE, self._create_cases), (DELETE_LEAD, self._delete_leads)):
+            if not by_kind[kind]:
+                continue
+            try:
+                kind_results, kind_errors = handler(by_kind[kind])
+            except Exception as e:
+                logger.error(f"[SIDE EFFECT] {kind} batch failed: {e}")
+                kind_results, kind_errors = {}, set(by_kind[kind])
+            results.update(kind_results)
+            errors.update(kind_errors)
+
+        self.ledger.mark_completed(results)
+        for key in errors:
+            failed.extend(message_id for message_id, _ in pending[key])
+        logger.info(f"[SIDE EFFECT] Processed {len(messages)} messages: "
+                    f"{len(results)} applied, {len(done)} skipped, {len(failed)} failed")
+        return failed
+
+    def _create_cases(self, payloads):
+        results, errors = {}, set()
+        for chunk in _chunks(list(payloads.items()), COLLECTION_LIMIT):
+            body = {
+                'allOrNone': False,
+                'records': [dict(payload, attributes={'type': 'Case'}) for _, payload in chunk],
+            }
+            response = with_salesforce(lambda sf: sf.restful('composite/sobjects', method='POST', json=body))
+            for (key, _), outcome in zip(chunk, response):
+                if outcome.get('success'):
+                    results[key] = outcome.get('id')
+                    logger.info(f"[SIDE EFFECT] Created Case {outcome.get('id')} ({key})")
+                else:
+                    logger.error(f"[SIDE EFFECT] Case create failed ({key}): {outcome.get('errors')}")
+                    errors.add(key)
+        return results, errors
+
+    def _delete_leads(self, payloads):
+        results, errors = {}, set()
+        targets = {}
+        for chunk in _chunks(list(payloads.items()), DELETE_QUERY_CHUNK):
+            conditions = ' OR '.join(
+                f"(Phone = '{_soql_quote(p['phone'])}' AND LastName = '{_soql_quote(p['lastName'])}')"
+                for _, p in chunk
+            )
+            query = f"SELECT Id, Phone, LastName FROM Lead WHERE {conditions}"
+            records = with_salesforce(lambda sf: sf.query_all(query))['records']
+            for key, payload in chunk:
+                matches = [
+                    r['Id'] for r in records
+                    if r.get('Phone') == payload['phone'] and (r.get('LastName') or '').lower() == payload['lastName'].lower()
+                ]
+                if matches:
+                    # Same as the old inline delete: one Lead per request. Requests resolving
+                    # to the same Lead share one delete and its outcome.
+                    targets.setdefault(matches[0], []).append(key)
+                else:
+                    logger.info(f"[SIDE EFFECT] No Lead matched delete request ({key})")
+                    results[key] = 'not_found'
+                    self._invalidate_lead_index(payload['phone'])
+
+        phones = {key: payload['phone'] for key, payload in payloads.items()}
+        for chunk in _chunks(list(targets.items()), COLLECTION_LIMIT):
+            ids = ','.join(lead_id for lead_id, _ in chunk)
+            response = with_salesforce(
+                lambda sf: sf.restful('composite/sobjects', method='DELETE', params={'ids': ids, 'allOrNone': 'false'})
+            )
+            for (lead_id, keys), outcome in zip(chunk, response):
+                codes = {error.get('statusCode') for error in outcome.get('errors') or []}
+                if outcome.get('success') or codes & ALREADY_DELETED_CODES:
+                    logger.info(f"[SIDE EFFECT] Deleted Lead {lead_id} ({', '.join(keys)})")
+                    for key in keys:
+                        results[key] = lead_id
+                        self._invalidate_lead_index(phones[key])
+                else:
+                    logger.error(f"[SIDE EFFECT] Lead delete failed ({', '.join(keys)}): {outcome.get('errors')}")
+                    errors.update(keys)
+        return results, errors
@@ -0,0 +1,105 @@
+"""
+Shared logging setup for all Atlas Engine handlers.
+
+- Every record is emitted as a single JSON line (CloudWatch Insights can
+  query the fields directly, and multi-line pretty prints don't split into
+  separate log events).
+- Structured fields are passed through `extra` and only serialized by the
+  formatter, i.e. after the level check has passed.
+- Large payloads (events, session attributes, S3 records) go through
+  log_payload(), which is sampled at LOG_PAYLOAD_SAMPLE_RATE.
+- Known-large or sensitive fields (scenarios, transcripts, task tokens...)
+  are replaced by their length, and other long strings are truncated.
+"""
+import json
+import logging
+import os
+import random
+import time
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', '0.05'))
+LOG_MAX_FIELD_CHARS = int(os.environ.get('LOG_MAX_FIELD_CHARS', '256'))
+LOG_MAX_MESSAGE_CHARS = int(os.environ.get('LOG_MAX_MESSAGE_CHARS', '2000'))
+REDACT_KEYS = {
+    key.strip().lower() for key in os.environ.get(
+        'LOG_REDACT_KEYS',
+        'dynamicScenario,DynamicScenario,scenario,transcript,FullTranscript,chat_transcript,'
+        'conversationHistory,InitialTranscript,lexTranscript,summary,CallSummary,'
+        'TaskToken,taskToken,StepFunctionTaskToken,private_key,access_token,SecretString'
+    ).split(',') if key.strip()
+}
+MAX_DEPTH = 6
+
+
+def redact(value, depth=0):
+    """Copy of value with REDACT_KEYS replaced by their size and long strings truncated."""
+    if depth > MAX_DEPTH:
+        return '<max depth>'
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            if str(key).lower() in REDACT_KEYS and item not in (None, ''):
+                size = len(item) if isinstance(item, (str, list, dict)) else len(str(item))
+                result[key] = f"<redacted: {size} chars>"
+            else:
+                result[key] = redact(item, depth + 1)
+        return result
+    if isinstance(value, (list, tuple)):
+        return [redact(item, depth + 1) for item in value]
+    if isinstance(value, str) and len(value) > LOG_MAX_FIELD_CHARS:
+        return f"{value[:LOG_MAX_FIELD_CHARS]}...[truncated {len(value) - LOG_MAX_FIELD_CHARS} chars]"
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        message = record.getMessage()
+        if len(message) > LOG_MAX_MESSAGE_CHARS:
+            message = f"{message[:LOG_MAX_MESSAGE_CHARS]}...[truncated {len(message) - LOG_MAX_MESSAGE_CHARS} chars]"
+        entry = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': message,
+        }
+        request_id = getattr(record, 'aws_request_id', None)
+        if request_id:
+            entry['requestId'] = request_id
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(redact(fields))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(',', ':'))
+
+
+def setup_logging():
+    """
+    Install the JSON formatter on the root logger (the Lambda runtime's handler,
+    or a stderr handler when run locally) and return it.
+    """
+    root = logging.getLogger()
+    if not root.handlers:
+        root.addHandler(logging.StreamHandler())
+    for handler in root.handlers:
+        handler.setFormatter(JsonFormatter())
+    root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    return root
+
+
+def log_event(logger, level, fields, message=None):
+    """Log a structured event; fields are serialized only if level is enabled."""
+    if logger.isEnabledFor(level):
+        logger.log(level, message or fields.get('event', ''), extra={'fields': fields})
+
+
+def log_payload(logger, label, payload, level=logging.INFO):
+    """
+    Log a large payload (e.g. the raw event) for a sample of invocations.
+    Always logged when the logger is at DEBUG.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if logger.isEnabledFor(logging.DEBUG) or random.random() < LOG_PAYLOAD_SAMPLE_RATE:
+        logger.log(level, label, extra={'fields': {'payload': payload}})
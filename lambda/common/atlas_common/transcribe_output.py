@@ -0,0 +1,231 @@
+"""
+Streaming reader for Amazon Transcribe output JSON.
+
+A Transcribe result file is dominated by per-word "items" (timings,
+alternatives, confidences), and with ChannelIdentification each word appears
+twice: once in results.items and once under results.channel_labels. Loading
+the whole file to read results.transcripts[0] costs memory and parse time
+proportional to call length several times over.
+
+read_transcript() pulls the S3 body through in chunks and keeps only:
+  - results.transcripts[0].transcript (the flat text), and
+  - the words of results.channel_labels.channels[*].items, as compact
+    (start_time, text) tuples per channel.
+Everything else (including results.items) is skipped without being decoded.
+The per-channel words are merged by start time into one line per speaker
+turn, e.g. "Customer: ...\\nAtlas: ...".
+"""
+import codecs
+import heapq
+import json
+import os
+import re
+
+STREAM_CHUNK_BYTES = 64 * 1024
+# Amazon Connect recordings: customer audio on the left channel, agent (here the bot) on the right
+TRANSCRIPT_CHANNEL_SPEAKERS = os.environ.get('TRANSCRIPT_CHANNEL_SPEAKERS', 'ch_0:Customer,ch_1:Atlas')
+
+_TOKEN = re.compile(r'\s*(?:("[^"\\]*(?:\\.[^"\\]*)*")|([{}\[\]:,])|(-?[0-9][0-9.eE+-]*|true|false|null))')
+# For skipping: everything up to the next bracket outside a string. Group 1 is
+# the bracket; group 2 is a quote whose string is cut off by the end of the buffer.
+_SKIP = re.compile(r'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*(?:([\[\]{}])|("))?')
+_WHITESPACE = re.compile(r'\s*')
+_LITERALS = {'true': True, 'false': False, 'null': None}
+
+
+def speaker_names(spec=TRANSCRIPT_CHANNEL_SPEAKERS):
+    names = {}
+    for pair in spec.split(','):
+        label, _, name = pair.partition(':')
+        if label.strip() and name.strip():
+            names[label.strip()] = name.strip()
+    return names
+
+
+class _Scanner:
+    """Pull tokenizer over an iterable of byte chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.mark = None
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            text = self.decoder.decode(b'', final=True)
+        else:
+            text = self.decoder.decode(chunk)
+        # Keep the container being captured (read_value), otherwise only the unread part
+        keep = self.pos if self.mark is None else self.mark
+        self.buffer = self.buffer[keep:] + text
+        self.pos -= keep
+        if self.mark is not None:
+            self.mark = 0
+        return True
+
+    def next(self):
+        """(kind, value) with kind 'string', 'punct' or 'scalar'; None at the end of input."""
+        while True:
+            match = _TOKEN.match(self.buffer, self.pos)
+            # A token touching the end of the buffer may continue in the next chunk
+            if match and (match.end() < len(self.buffer) or self.eof):
+                self.pos = match.end()
+                string, punct, scalar = match.groups()
+                if string is not None:
+                    return 'string', json.loads(string) if '\\' in string else string[1:-1]
+                if punct is not None:
+                    return 'punct', punct
+                return 'scalar', _LITERALS[scalar] if scalar in _LITERALS else scalar
+            if not self._fill():
+                if _WHITESPACE.fullmatch(self.buffer, self.pos):
+                    return None
+                raise ValueError(f"Invalid JSON near: {self.buffer[self.pos:self.pos + 40]!r}")
+
+    def expect(self, punct):
+        token = self.next()
+        if token != ('punct', punct):
+            raise ValueError(f"Expected {punct!r}, got {token!r}")
+
+    def skip_container(self):
+        """Skip to the end of the object/array whose opening bracket was just read."""
+        depth = 1
+        while True:
+            match = _SKIP.match(self.buffer, self.pos)
+            bracket, cut = match.groups()
+            if bracket:
+                self.pos = match.end()
+                depth += 1 if bracket in '[{' else -1
+                if depth == 0:
+                    return
+                continue
+            # End of the buffer, or a string that continues in the next chunk
+            self.pos = match.start(2) if cut else match.end()
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON")
+
+    def skip_value(self):
+        kind, value = self.next()
+        if kind == 'punct' and value in '[{':
+            self.skip_container()
+
+    def read_value(self, token=None):
+        """Decode the next value (or the one starting with token, already read)."""
+        kind, value = token or self.next()
+        if kind != 'punct':
+            return value
+        if value not in '[{':
+            raise ValueError(f"Unexpected {value!r}")
+        # Find the end with the bracket scan and let json decode the slice in C
+        self.mark = self.pos - 1
+        try:
+            self.skip_container()
+            return json.loads(self.buffer[self.mark:self.pos])
+        finally:
+            self.mark = None
+
+    def keys(self):
+        """Iterate the keys of the object whose '{' was just read; read or skip each value."""
+        token = self.next()
+        while token != ('punct', '}'):
+            if token[0] == 'punct' and token[1] == ',':
+                token = self.next()
+                continue
+            key = token[1]
+            self.expect(':')
+            yield key
+            token = self.next()
+
+    def elements(self, handle):
+        """Call handle(token) for each element of the array whose '[' was just read."""
+        token = self.next()
+        while token != ('punct', ']'):
+            if token != ('punct', ','):
+                yield handle(token)
+            token = self.next()
+
+
+def _read_channel(scanner, token):
+    if token != ('punct', '{'):
+        scanner.read_value(token)
+        return None, []
+    label, words = None, []
+    for key in scanner.keys():
+        if key == 'channel_label':
+            label = scanner.read_value()
+        elif key == 'items':
+            scanner.expect('[')
+            for item in scanner.elements(scanner.read_value):
+                alternatives = item.get('alternatives') or [{}]
+                content = alternatives[0].get('content', '')
+                if item.get('type') == 'punctuation':
+                    if words:
+                        words[-1] = (words[-1][0], words[-1][1] + content)
+                elif content:
+                    words.append((float(item.get('start_time') or 0), content))
+        else:
+            scanner.skip_value()
+    return label, words
+
+
+def _read_results(scanner, result):
+    for key in scanner.keys():
+        if key == 'transcripts':
+            scanner.expect('[')
+            for transcript in scanner.elements(scanner.read_value):
+                if result['transcript'] is None and isinstance(transcript, dict):
+                    result['transcript'] = transcript.get('transcript', '')
+        elif key == 'channel_labels':
+            scanner.expect('{')
+            for channel_key in scanner.keys():
+                if channel_key == 'channels':
+                    scanner.expect('[')
+                    for label, words in scanner.elements(lambda token: _read_channel(scanner, token)):
+                        if label is not None:
+                            result['channels'][label] = words
+                else:
+                    scanner.skip_value()
+        else:
+            scanner.skip_value()
+
+
+def assemble_turns(channels, names=None):
+    """One 'Speaker: words' line per turn, channels merged by word start time."""
+    names = names if names is not None else speaker_names()
+    streams = [[(start, label, text) for start, text in words] for label, words in sorted(channels.items())]
+    lines, speaker, turn = [], None, []
+    for _, label, text in heapq.merge(*streams, key=lambda word: word[0]):
+        if label != speaker and turn:
+            lines.append(f"{names.get(speaker, speaker)}: {' '.join(turn)}")
+            turn = []
+        speaker = label
+        turn.append(text)
+    if turn:
+        lines.append(f"{names.get(speaker, speaker)}: {' '.join(turn)}")
+    return '\n'.join(lines)
+
+
+def read_transcript(chunks, names=None):
+    """
+    Transcript text from Transcribe output JSON given as byte chunks (e.g.
+    StreamingBody.iter_chunks()). Speaker-labelled when the job used
+    ChannelIdentification, otherwise results.transcripts[0].transcript.
+    """
+    scanner = _Scanner(chunks)
+    result = {'transcript': None, 'channels': {}}
+    scanner.expect('{')
+    for key in scanner.keys():
+        if key == 'results':
+            scanner.expect('{')
+            _read_results(scanner, result)
+        else:
+            scanner.skip_value()
+    if any(result['channels'].values()):
+        return assemble_turns(result['channels'], names)
+    return result['transcript'] or ''
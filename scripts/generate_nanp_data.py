@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Regenerate lambda/common/atlas_common/nanp_data.py from the phonenumbers
+metadata, so the fast-path E.164 normalizer agrees with the layer's version.
+
+Each NANP area code (200-999) is classified by probing every exchange with a
+spread of line numbers:
+  V - every probed number is valid
+  X - no probed number is valid
+  M - mixed; the normalizer defers these to phonenumbers
+
+Usage (takes a couple of minutes):
+    pip install phonenumbers==8.13.26
+    python3 scripts/generate_nanp_data.py
+"""
+import os
+
+import phonenumbers
+from phonenumbers import PhoneNumber, is_valid_number
+
+LINE_PROBES = (0, 1234, 5555, 8000, 9999)
+OUTPUT = os.path.join(os.path.dirname(__file__), '..', 'lambda', 'common', 'atlas_common', 'nanp_data.py')
+
+
+def classify(npa):
+    seen = set()
+    for nxx in range(200, 1000):
+        for line in LINE_PROBES:
+            number = PhoneNumber(country_code=1, national_number=npa * 10**7 + nxx * 10**4 + line)
+            seen.add(is_valid_number(number))
+            if len(seen) > 1:
+                return 'M'
+    return 'V' if seen == {True} else 'X'
+
+
+def main():
+    classes = ''.join(classify(npa) for npa in range(200, 1000))
+    rows = [classes[i:i + 80] for i in range(0, len(classes), 80)]
+    with open(OUTPUT, 'w') as f:
+        f.write('"""\n')
+        f.write('NANP area code classes for atlas_common.phone (generated, do not edit).\n\n')
+        f.write(f'Generated by scripts/generate_nanp_data.py from phonenumbers {phonenumbers.__version__}.\n')
+        f.write('Character i is area code 200 + i: V = valid, X = invalid, M = defer to phonenumbers.\n')
+        f.write('"""\n')
+        f.write(f"PHONENUMBERS_VERSION = '{phonenumbers.__version__}'\n\n")
+        f.write('NPA_CLASSES = (\n')
+        for row in rows:
+            f.write(f"    '{row}'\n")
+        f.write(')\n')
+    print(f"Wrote {OUTPUT}: {classes.count('V')} valid, {classes.count('M')} mixed, {classes.count('X')} invalid")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,713 @@
+#!/usr/bin/env python3
+"""
+Local simulator for stepfunctions/workflow-definition.asl.json.
+
+Interprets the workflow (Task, Parallel, Pass, Wait, Succeed, Fail, Retry,
+Catch, TimeoutSeconds, waitForTaskToken, ResultSelector/ResultPath/OutputPath
+and the States.* intrinsics the definition uses) against the real handler
+modules in lambda/. Every AWS client, the Salesforce session and the phone
+call itself are replaced by stubs that draw latency and errors from a profile.
+
+Time is virtual: stubs advance a simulated clock instead of sleeping, and
+Parallel branches start at the same instant and join at the slowest branch.
+Thousands of executions therefore take seconds, and the reported numbers
+depend only on the workflow shape, the handlers' call pattern and the profile.
+
+Reported per run:
+  time_to_ring     execution start -> the prospect's phone rings
+  time_to_summary  execution start -> call summary written to the Lead
+  post_call        call end -> call summary written to the Lead
+
+Profile (JSON, merged over DEFAULT_PROFILE): operation -> latency spec
+    {"salesforce.query": {"median_ms": 350, "p99_ms": 1500, "error_rate": 0.01}}
+Latency is lognormal with the given median and p99; "probability" makes a
+latency optional (e.g. cold starts). Operations are "<service>.<operation>"
+for boto3 clients, "salesforce.*", "lambda.*" and "call.*".
+
+Usage:
+    python3 scripts/simulate_workflow.py [--executions 2000] [--seed 7]
+        [--definition stepfunctions/workflow-definition.asl.json]
+        [--profile profile.json] [--output results.json]
+        [--baseline results.json --max-regression-pct 5]
+
+With --baseline, exits non-zero if p50/p95/p99 time-to-ring or
+time-to-summary regress by more than --max-regression-pct.
+"""
+import argparse
+import copy
+import importlib.util
+import io
+import json
+import math
+import os
+import random
+import re
+import sys
+import uuid
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+LAMBDA_DIR = os.path.join(ROOT, 'lambda')
+DEFAULT_DEFINITION = os.path.join(ROOT, 'stepfunctions', 'workflow-definition.asl.json')
+
+# Handlers referenced by the definition's ${...} substitutions
+FUNCTIONS = {
+    'CreateLeadHandlerArn': 'CreateLeadHandler',
+    'GenerateDynamicScenarioHandlerArn': 'GenerateDynamicScenarioHandler',
+    'InvokeOutboundCallHandlerArn': 'InvokeOutboundCallHandler',
+    'UpdateLeadHandlerArn': 'UpdateLeadHandler',
+    'CallEndedHandlerArn': 'CallEndedHandler',
+}
+
+HANDLER_ENV = {
+    'AWS_DEFAULT_REGION': 'us-west-2',
+    'LOG_LEVEL': 'CRITICAL',
+    # EMF metrics are printed to stdout, which LOG_LEVEL doesn't cover
+    'BEDROCK_METRICS': 'false',
+    'INTERACTIONS_DYNAMODB_TABLE': 'SimInteractions',
+    'MODEL_ID': 'anthropic.claude-3-5-haiku-20241022-v1:0',
+    'INSTANCE_ID': 'sim-instance',
+    'CONTACT_FLOW_ID': 'sim-contact-flow',
+    'SOURCE_PHONE_NUMBER': '+12065550100',
+    'SALESFORCE_SECRET_ARN': 'arn:aws:secretsmanager:us-west-2:000000000000:secret:sim',
+}
+
+DEFAULT_PROFILE = {
+    # Lambda service overhead per invocation, plus occasional cold starts
+    'lambda.invoke': {'median_ms': 15, 'p99_ms': 60, 'error_rate': 0.001},
+    'lambda.cold_start': {'median_ms': 900, 'p99_ms': 2500, 'probability': 0.05},
+    # Salesforce REST (JWT auth only on a container's first call)
+    'salesforce.auth': {'median_ms': 600, 'p99_ms': 2000},
+    'salesforce.query': {'median_ms': 350, 'p99_ms': 1500, 'error_rate': 0.005},
+    'salesforce.create': {'median_ms': 450, 'p99_ms': 2000, 'error_rate': 0.005},
+    'salesforce.update': {'median_ms': 400, 'p99_ms': 1800, 'error_rate': 0.005},
+    'salesforce.delete': {'median_ms': 400, 'p99_ms': 1800, 'error_rate': 0.005},
+    'salesforce.existing_lead': {'probability': 0.3},
+    # AWS APIs
+    'bedrock-runtime.invoke_model': {'median_ms': 2500, 'p99_ms': 6000, 'error_rate': 0.01},
+    'dynamodb.put_item': {'median_ms': 8, 'p99_ms': 40},
+    'dynamodb.update_item': {'median_ms': 8, 'p99_ms': 40},
+    'dynamodb.get_item': {'median_ms': 5, 'p99_ms': 30},
+    'connect.start_outbound_voice_contact': {'median_ms': 300, 'p99_ms': 1200, 'error_rate': 0.002},
+    'stepfunctions.send_task_success': {'median_ms': 30, 'p99_ms': 120},
+    'stepfunctions.send_task_failure': {'median_ms': 30, 'p99_ms': 120},
+    # The phone call: ring after dialing, conversation, post-call transcription + summary
+    'call.ring': {'median_ms': 2500, 'p99_ms': 6000},
+    'call.duration': {'median_ms': 150000, 'p99_ms': 900000},
+    'call.summarize': {'median_ms': 20000, 'p99_ms': 60000, 'error_rate': 0.002},
+}
+DEFAULT_SPEC = {'median_ms': 20, 'p99_ms': 80}
+Z_99 = 2.326
+
+SIM_SCENARIO = "Hi Jane, this is Atlas calling about your chat on our sales accelerator. What's on your mind?"
+SIM_SUMMARY = "Prospect discussed the sales accelerator and asked for pricing details."
+
+
+# ===== Virtual time and latency =====
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class LatencyModel:
+    def __init__(self, profile, rng, clock):
+        self.profile = profile
+        self.rng = rng
+        self.clock = clock
+
+    def happens(self, operation):
+        return self.rng.random() < self.profile.get(operation, {}).get('probability', 1.0)
+
+    def sample(self, operation):
+        spec = self.profile.get(operation, DEFAULT_SPEC)
+        if not self.happens(operation) or 'median_ms' not in spec:
+            return 0.0
+        median = spec['median_ms'] / 1000
+        sigma = math.log(max(spec.get('p99_ms', spec['median_ms']), spec['median_ms']) / spec['median_ms']) / Z_99
+        return self.rng.lognormvariate(math.log(median), sigma)
+
+    def call(self, operation):
+        """Advance the clock by one sampled latency; True if the call should fail."""
+        self.clock.advance(self.sample(operation))
+        return self.rng.random() < self.profile.get(operation, {}).get('error_rate', 0.0)
+
+
+class TaskError(Exception):
+    """A Step Functions error (Error name + Cause)."""
+
+    def __init__(self, error, cause=''):
+        super().__init__(f"{error}: {cause}")
+        self.error = error
+        self.cause = cause
+
+
+# ===== Stubs for boto3 and Salesforce =====
+
+class StubClient:
+    """boto3 client stand-in: every operation costs '<service>.<operation>' latency."""
+
+    def __init__(self, sim, service):
+        self.sim = sim
+        self.service = service
+
+    def __getattr__(self, operation):
+        if operation.startswith('__'):
+            raise AttributeError(operation)
+
+        def call(*args, **kwargs):
+            return self.sim.aws_call(self.service, operation, kwargs)
+        return call
+
+
+class StubTable:
+    def __init__(self, sim, name):
+        self.sim = sim
+        self.name = name
+
+    def __getattr__(self, operation):
+        if operation.startswith('__'):
+            raise AttributeError(operation)
+
+        def call(*args, **kwargs):
+            return self.sim.aws_call('dynamodb', operation, kwargs)
+        return call
+
+
+class StubResource:
+    def __init__(self, sim, service):
+        self.sim = sim
+        self.service = service
+
+    def Table(self, name):
+        return StubTable(self.sim, name)
+
+
+class StubSObject:
+    def __init__(self, sim, name):
+        self.sim = sim
+        self.name = name
+
+    def create(self, data, *args, **kwargs):
+        self.sim.salesforce_call('salesforce.create', self.name)
+        return {'id': '00Q' + uuid.uuid4().hex[:15], 'success': True, 'errors': []}
+
+    def update(self, record_id, data, *args, **kwargs):
+        self.sim.salesforce_call('salesforce.update', self.name)
+        return 204
+
+    def delete(self, record_id, *args, **kwargs):
+        self.sim.salesforce_call('salesforce.delete', self.name)
+        return 204
+
+
+class StubSalesforce:
+    def __init__(self, sim):
+        self.sim = sim
+
+    def query(self, soql, *args, **kwargs):
+        self.sim.salesforce_call('salesforce.query', 'query')
+        if self.sim.latency.happens('salesforce.existing_lead'):
+            return {'totalSize': 1, 'done': True, 'records': [{'Id': '00Q' + uuid.uuid4().hex[:15]}]}
+        return {'totalSize': 0, 'done': True, 'records': []}
+
+    query_all = query
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return StubSObject(self.sim, name)
+
+
+class StubSalesforceSession:
+    """Replaces atlas_common.salesforce's session; the real with_salesforce() still runs."""
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.client = None
+
+    def get_client(self):
+        if self.client is None:
+            self.sim.latency.call('salesforce.auth')
+            self.client = StubSalesforce(self.sim)
+        return self.client
+
+    def invalidate(self):
+        self.client = None
+
+
+class LambdaContext:
+    def __init__(self, function_name, clock, timeout_seconds=900):
+        self.function_name = function_name
+        self.aws_request_id = str(uuid.uuid4())
+        self._clock = clock
+        self._deadline = clock.now + timeout_seconds
+
+    def get_remaining_time_in_millis(self):
+        return int(max(self._deadline - self._clock.now, 0) * 1000)
+
+
+# ===== Paths and intrinsic functions =====
+
+_PATH_TOKEN = re.compile(r"\.([A-Za-z0-9_\-]+)|\[(\d+)\]|\['([^']+)'\]")
+
+
+def _path_tokens(path):
+    tokens, pos = [], 1
+    while pos < len(path):
+        match = _PATH_TOKEN.match(path, pos)
+        if not match:
+            raise TaskError('States.Runtime', f"Unsupported path: {path}")
+        name, index, quoted = match.groups()
+        tokens.append(int(index) if index is not None else (name or quoted))
+        pos = match.end()
+    return tokens
+
+
+def get_path(data, path, context):
+    if path.startswith('$$'):
+        data, path = context, path[1:]
+    for token in _path_tokens(path):
+        try:
+            data = data[token]
+        except (KeyError, IndexError, TypeError):
+            raise TaskError('States.Runtime', f"Path {path} not found in input")
+    return data
+
+
+def set_path(data, path, value):
+    if path is None:
+        return data
+    if path == '$':
+        return value
+    result = copy.deepcopy(data) if isinstance(data, dict) else {}
+    target = result
+    tokens = _path_tokens(path)
+    for token in tokens[:-1]:
+        target = target.setdefault(token, {})
+    target[tokens[-1]] = value
+    return result
+
+
+def _split_args(text):
+    args, depth, quoted, start = [], 0, False, 0
+    for i, char in enumerate(text):
+        if char == "'" and (i == 0 or text[i - 1] != '\\'):
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and char == ',' and depth == 0:
+            args.append(text[start:i].strip())
+            start = i + 1
+    if text[start:].strip():
+        args.append(text[start:].strip())
+    return args
+
+
+def evaluate_expression(expression, data, context):
+    expression = expression.strip()
+    if expression.startswith('$'):
+        return get_path(data, expression, context)
+    if expression.startswith("'"):
+        return expression[1:-1].replace("\\'", "'")
+    if not expression.startswith('States.'):
+        return json.loads(expression)
+    name, inner = expression[:expression.index('(')], expression[expression.index('(') + 1:expression.rindex(')')]
+    args = [evaluate_expression(arg, data, context) for arg in _split_args(inner)]
+    if name == 'States.JsonMerge':
+        left, right, deep = args
+        if deep:
+            raise TaskError('States.Runtime', 'States.JsonMerge deep mode is not supported by Step Functions')
+        return {**left, **right}
+    if name == 'States.Array':
+        return args
+    if name == 'States.Format':
+        template, values = args[0], iter(args[1:])
+        return re.sub(r'\{\}', lambda _: str(next(values)), template)
+    if name == 'States.StringToJson':
+        return json.loads(args[0])
+    if name == 'States.JsonToString':
+        return json.dumps(args[0], separators=(',', ':'))
+    if name == 'States.UUID':
+        return str(uuid.uuid4())
+    raise TaskError('States.Runtime', f"Unsupported intrinsic function: {name}")
+
+
+def resolve_template(template, data, context):
+    """Apply a Parameters / ResultSelector template."""
+    if isinstance(template, dict):
+        resolved = {}
+        for key, value in template.items():
+            if key.endswith('.$'):
+                resolved[key[:-2]] = evaluate_expression(value, data, context)
+            else:
+                resolved[key] = resolve_template(value, data, context)
+        return resolved
+    if isinstance(template, list):
+        return [resolve_template(item, data, context) for item in template]
+    return template
+
+
+def error_matches(error, error_equals):
+    for name in error_equals:
+        if name == error or name == 'States.ALL':
+            return True
+        if name == 'States.TaskFailed' and error != 'States.Timeout':
+            return True
+    return False
+
+
+# ===== Simulator =====
+
+class Execution:
+    def __init__(self, execution_id, start):
+        self.execution_id = execution_id
+        self.start = start
+        self.ring_at = None
+        self.call_ended_at = None
+        self.state_durations = []
+
+
+class Simulator:
+    def __init__(self, definition, profile, seed):
+        self.definition = definition
+        self.clock = Clock()
+        self.latency = LatencyModel(profile, random.Random(seed), self.clock)
+        self.execution = None
+        self.task_results = {}
+        self.salesforce_sessions = {}
+        self.salesforce_module = None
+        self.functions = {}
+        self._install_stubs()
+        self._load_handlers()
+
+    # --- stubs ---
+
+    def _install_stubs(self):
+        for key, value in HANDLER_ENV.items():
+            os.environ.setdefault(key, value)
+        import boto3
+        boto3.client = lambda *args, **kwargs: StubClient(self, args[0] if args else kwargs['service_name'])
+        boto3.resource = lambda *args, **kwargs: StubResource(self, args[0] if args else kwargs['service_name'])
+        sys.path.insert(0, os.path.join(LAMBDA_DIR, 'common'))
+        from atlas_common import salesforce
+        self.salesforce_module = salesforce
+
+    def _load_handlers(self):
+        for placeholder, name in FUNCTIONS.items():
+            path = os.path.join(LAMBDA_DIR, f"{name}_code", 'lambda_function.py')
+            spec = importlib.util.spec_from_file_location(f"sim_{name}", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self.functions[self.function_arn(name)] = (name, module.lambda_handler)
+
+    @staticmethod
+    def function_arn(name):
+        return f"arn:aws:lambda:us-west-2:000000000000:function:{name}"
+
+    def aws_call(self, service, operation, kwargs):
+        from botocore.exceptions import ClientError
+        if self.latency.call(f"{service}.{operation}"):
+            raise ClientError(
+                {'Error': {'Code': 'ServiceUnavailable', 'Message': f"Simulated {service} failure"}}, operation
+            )
+        if service == 'bedrock-runtime' and operation == 'invoke_model':
+            body = json.dumps({'content': [{'type': 'text', 'text': SIM_SCENARIO}]}).encode('utf-8')
+            return {'body': io.BytesIO(body), 'contentType': 'application/json'}
+        if service == 'connect' and operation == 'start_outbound_voice_contact':
+            self.execution.ring_at = self.clock.now + self.latency.sample('call.ring')
+            return {'ContactId': str(uuid.uuid4())}
+        if service == 'stepfunctions' and operation in ('send_task_success', 'send_task_failure'):
+            self.task_results[kwargs['taskToken']] = (operation, kwargs)
+        return {}
+
+    def salesforce_call(self, operation, resource):
+        from simple_salesforce.exceptions import SalesforceGeneralError
+        if self.latency.call(operation):
+            raise SalesforceGeneralError('https://sim.my.salesforce.com', 503, resource, b'Simulated failure')
+
+    # --- tasks ---
+
+    def invoke_lambda(self, function_arn, payload):
+        if function_arn not in self.functions:
+            raise TaskError('Lambda.ResourceNotFoundException', function_arn)
+        name, handler = self.functions[function_arn]
+        if self.latency.call('lambda.invoke'):
+            raise TaskError('Lambda.ServiceException', 'Simulated Lambda service error')
+        # Each function has its own container (and Salesforce token); a cold start loses both
+        session = self.salesforce_sessions.setdefault(name, StubSalesforceSession(self))
+        cold_start = self.latency.sample('lambda.cold_start')
+        if cold_start:
+            self.clock.advance(cold_start)
+            session.invalidate()
+        self.salesforce_module._default_session = session
+        try:
+            return handler(copy.deepcopy(payload), LambdaContext(name, self.clock))
+        except TaskError:
+            raise
+        except Exception as e:
+            raise TaskError(type(e).__name__, str(e))
+
+    def complete_call(self, token):
+        """The remainder of a waitForTaskToken task: ring, conversation, summary, callback."""
+        if token in self.task_results:
+            operation, kwargs = self.task_results.pop(token)
+            if operation == 'send_task_failure':
+                raise TaskError(kwargs.get('error', 'States.TaskFailed'), kwargs.get('cause', ''))
+            return json.loads(kwargs.get('output', '{}'))
+        self.clock.now = max(self.clock.now, self.execution.ring_at or self.clock.now)
+        self.clock.advance(self.latency.sample('call.duration'))
+        self.execution.call_ended_at = self.clock.now
+        if self.latency.call('call.summarize'):
+            raise TaskError('SummarizationFailed', 'Simulated summarization failure')
+        self.latency.call('stepfunctions.send_task_success')
+        return {'summary': SIM_SUMMARY}
+
+    def run_task(self, state, data, context):
+        resource = state['Resource']
+        if resource.startswith('arn:aws:states:::lambda:invoke'):
+            wait = resource.endswith('.waitForTaskToken')
+            if wait:
+                context['Task'] = {'Token': uuid.uuid4().hex}
+            params = resolve_template(state.get('Parameters', {}), data, context)
+            payload = params.get('Payload', data)
+            result = self.invoke_lambda(params['FunctionName'], payload)
+            if wait:
+                return self.complete_call(context['Task']['Token'])
+            return {'StatusCode': 200, 'Payload': result}
+        if 'Parameters' in state:
+            data = resolve_template(state['Parameters'], data, context)
+        return self.invoke_lambda(resource, data)
+
+    # --- states ---
+
+    def run_machine(self, machine, data, context):
+        name = machine['StartAt']
+        while True:
+            state = machine['States'][name]
+            started = self.clock.now
+            context['State'] = {'Name': name, 'EnteredTime': started}
+            next_name, data = self.run_state(name, state, data, context)
+            self.execution.state_durations.append((name, self.clock.now - started))
+            if next_name is None:
+                return data
+            name = next_name
+
+    def run_state(self, name, state, data, context):
+        kind = state['Type']
+        if kind == 'Fail':
+            raise TaskError(state.get('Error', 'States.Fail'), state.get('Cause', ''))
+        if kind == 'Succeed':
+            return None, data
+        effective = get_path(data, state.get('InputPath', '$'), context) if state.get('InputPath', '$') else {}
+
+        if kind == 'Pass':
+            result = state['Result'] if 'Result' in state else (
+                resolve_template(state['Parameters'], effective, context) if 'Parameters' in state else effective
+            )
+        elif kind == 'Wait':
+            self.clock.advance(state.get('Seconds', 0))
+            result = effective
+        elif kind in ('Task', 'Parallel'):
+            try:
+                result = self.run_with_retry(state, effective, context)
+            except TaskError as e:
+                for catcher in state.get('Catch', []):
+                    if error_matches(e.error, catcher['ErrorEquals']):
+                        error_output = {'Error': e.error, 'Cause': e.cause}
+                        return catcher['Next'], set_path(data, catcher.get('ResultPath', '$'), error_output)
+                raise
+            if 'ResultSelector' in state:
+                result = resolve_template(state['ResultSelector'], result, context)
+        else:
+            raise TaskError('States.Runtime', f"Unsupported state type {kind} in {name}")
+
+        output = set_path(data, state.get('ResultPath', '$'), result)
+        if state.get('OutputPath', '$'):
+            output = get_path(output, state.get('OutputPath', '$'), context)
+        return (None if state.get('End') else state['Next']), output
+
+    def run_with_retry(self, state, data, context):
+        attempts = defaultdict(int)
+        while True:
+            started = self.clock.now
+            try:
+                if state['Type'] == 'Parallel':
+                    return self.run_parallel(state, data, context)
+                result = self.run_task(state, data, context)
+                timeout = state.get('TimeoutSeconds')
+                if timeout and self.clock.now - started > timeout:
+                    self.clock.now = started + timeout
+                    raise TaskError('States.Timeout', f"Task exceeded {timeout}s")
+                return result
+            except TaskError as e:
+                retrier = next((r for r in state.get('Retry', []) if error_matches(e.error, r['ErrorEquals'])), None)
+                if retrier is None:
+                    raise
+                index = state['Retry'].index(retrier)
+                if attempts[index] >= retrier.get('MaxAttempts', 3):
+                    raise
+                delay = retrier.get('IntervalSeconds', 1) * retrier.get('BackoffRate', 2.0) ** attempts[index]
+                delay = min(delay, retrier.get('MaxDelaySeconds', delay))
+                if retrier.get('JitterStrategy') == 'FULL':
+                    delay = self.latency.rng.uniform(0, delay)
+                attempts[index] += 1
+                self.clock.advance(delay)
+
+    def run_parallel(self, state, data, context):
+        """Branches start together; the state finishes with the slowest branch."""
+        start, ends, results = self.clock.now, [], []
+        for branch in state['Branches']:
+            self.clock.now = start
+            branch_context = copy.deepcopy(context)
+            try:
+                results.append(self.run_machine(branch, copy.deepcopy(data), branch_context))
+            except TaskError:
+                # Step Functions stops the other branches when one fails
+                raise
+            ends.append(self.clock.now)
+        self.clock.now = max(ends, default=start)
+        return results
+
+    def run_execution(self, execution_input):
+        self.clock.now = 0.0
+        self.execution = Execution(str(uuid.uuid4()), self.clock.now)
+        context = {'Execution': {'Id': self.execution.execution_id, 'Input': execution_input, 'StartTime': 0}}
+        try:
+            self.run_machine(self.definition, copy.deepcopy(execution_input), context)
+            status, error = 'SUCCEEDED', None
+        except TaskError as e:
+            status, error = 'FAILED', e.error
+        return {
+            'status': status,
+            'error': error,
+            'time_to_ring': self.execution.ring_at,
+            'time_to_summary': self.clock.now if status == 'SUCCEEDED' else None,
+            'post_call': (self.clock.now - self.execution.call_ended_at)
+            if status == 'SUCCEEDED' and self.execution.call_ended_at is not None else None,
+            'states': self.execution.state_durations,
+        }
+
+
+# ===== Reporting =====
+
+def load_definition(path):
+    with open(path) as f:
+        text = f.read()
+    for placeholder, name in FUNCTIONS.items():
+        text = text.replace('${' + placeholder + '}', Simulator.function_arn(name))
+    return json.loads(text)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(math.ceil(pct / 100 * len(ordered))) - 1, len(ordered) - 1)
+    return ordered[max(index, 0)]
+
+
+def summarize(runs):
+    summary = {'executions': len(runs)}
+    statuses = defaultdict(int)
+    errors = defaultdict(int)
+    for run in runs:
+        statuses[run['status']] += 1
+        if run['error']:
+            errors[run['error']] += 1
+    summary['statuses'] = dict(statuses)
+    summary['errors'] = dict(errors)
+    for metric in ('time_to_ring', 'time_to_summary', 'post_call'):
+        values = [run[metric] for run in runs if run[metric] is not None]
+        summary[metric] = {f"p{p}": percentile(values, p) for p in (50, 95, 99)}
+        summary[metric]['count'] = len(values)
+    per_state = defaultdict(list)
+    for run in runs:
+        for name, duration in run['states']:
+            per_state[name].append(duration)
+    summary['states'] = {name: {'p50': percentile(v, 50), 'p95': percentile(v, 95)} for name, v in per_state.items()}
+    return summary
+
+
+def format_seconds(value):
+    return '-' if value is None else f"{value:8.2f}s"
+
+
+def print_summary(summary):
+    print(f"Executions: {summary['executions']}  " +
+          '  '.join(f"{status}: {count}" for status, count in sorted(summary['statuses'].items())))
+    if summary['errors']:
+        print('Errors: ' + ', '.join(f"{error} x{count}" for error, count in sorted(summary['errors'].items())))
+    print(f"\n{'metric':<18}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for metric in ('time_to_ring', 'time_to_summary', 'post_call'):
+        values = summary[metric]
+        print(f"{metric:<18}{format_seconds(values['p50']):>10}{format_seconds(values['p95']):>10}"
+              f"{format_seconds(values['p99']):>10}")
+    print(f"\n{'state':<34}{'p50':>10}{'p95':>10}")
+    for name, values in summary['states'].items():
+        print(f"{name:<34}{format_seconds(values['p50']):>10}{format_seconds(values['p95']):>10}")
+
+
+def check_regression(summary, baseline, max_regression_pct):
+    failures = []
+    for metric in ('time_to_ring', 'time_to_summary'):
+        for pct in ('p50', 'p95', 'p99'):
+            current, previous = summary[metric][pct], baseline.get(metric, {}).get(pct)
+            if current is None or not previous:
+                continue
+            change = (current - previous) / previous * 100
+            if change > max_regression_pct:
+                failures.append(f"{metric} {pct}: {previous:.2f}s -> {current:.2f}s (+{change:.1f}%)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--definition', default=DEFAULT_DEFINITION)
+    parser.add_argument('--executions', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--profile', help='JSON latency profile merged over the defaults')
+    parser.add_argument('--output', help='Write the summary as JSON (usable as a later --baseline)')
+    parser.add_argument('--baseline', help='Summary JSON from a previous run to compare against')
+    parser.add_argument('--max-regression-pct', type=float, default=5.0)
+    args = parser.parse_args()
+
+    profile = copy.deepcopy(DEFAULT_PROFILE)
+    if args.profile:
+        with open(args.profile) as f:
+            for operation, spec in json.load(f).items():
+                profile[operation] = {**profile.get(operation, {}), **spec}
+
+    simulator = Simulator(load_definition(args.definition), profile, args.seed)
+    execution_input = {
+        'firstName': 'Jane',
+        'lastName': 'Doe',
+        'phone': '+12065551234',
+        'chat_transcript': 'User: Tell me about the sales accelerator\nBot: It qualifies leads automatically.\n',
+    }
+    runs = [simulator.run_execution(execution_input) for _ in range(args.executions)]
+    summary = summarize(runs)
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = check_regression(summary, json.load(f), args.max_regression_pct)
+        if failures:
+            print(f"\nREGRESSION (> {args.max_regression_pct}%):")
+            for failure in failures:
+                print(f"  {failure}")
+            return 1
+        print(f"\nNo regression beyond {args.max_regression_pct}% against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
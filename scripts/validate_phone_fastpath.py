@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Check atlas_common.phone.to_e164 against phonenumbers on a generated corpus.
+
+Numbers are drawn uniformly over NANP area codes/exchanges (plus some
+international and malformed inputs) and rendered in the formats Lex
+produces. Every input must give the same result (E.164 string, or rejection)
+as phonenumbers.parse(raw, 'US') + is_valid_number + format_number(E164).
+
+Usage:
+    python3 scripts/validate_phone_fastpath.py [--count 200000] [--seed 7]
+Exits non-zero on any mismatch.
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'common'))
+
+import phonenumbers  # noqa: E402
+from atlas_common import phone  # noqa: E402
+from atlas_common.nanp_data import PHONENUMBERS_VERSION  # noqa: E402
+
+FORMATS = (
+    '{a}{b}{c}',
+    '+1{a}{b}{c}',
+    '1{a}{b}{c}',
+    '({a}) {b}-{c}',
+    '{a}-{b}-{c}',
+    '{a}.{b}.{c}',
+    '{a} {b} {c}',
+    '1 {a} {b} {c}',
+    '+1 ({a}) {b}-{c}',
+    '+1-{a}-{b}-{c}',
+    ' {a}{b}{c} ',
+)
+EXOTIC = (
+    '+44 20 7946 0958', '+61 2 9374 4000', '+33 1 42 68 53 00', '011 44 20 7946 0958',
+    '206-555-1234 x12', '1-800-FLOWERS', '555-1234', '12345', '', '+1', '(206) 555-12345',
+)
+
+
+def reference(raw, validate):
+    try:
+        parsed = phonenumbers.parse(raw, 'US')
+    except phonenumbers.NumberParseException:
+        return None
+    if validate and not phonenumbers.is_valid_number(parsed):
+        return None
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+
+def candidate(raw, validate):
+    try:
+        return phone.to_e164(raw, validate=validate)
+    except phone.InvalidPhoneNumber:
+        return None
+
+
+def corpus(count, rng):
+    for _ in range(count):
+        a = str(rng.randint(0, 999)).zfill(3) if rng.random() < 0.05 else str(rng.randint(200, 999))
+        b = str(rng.randint(0, 999)).zfill(3) if rng.random() < 0.05 else str(rng.randint(200, 999))
+        c = str(rng.randint(0, 9999)).zfill(4)
+        yield rng.choice(FORMATS).format(a=a, b=b, c=c)
+    yield from EXOTIC
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if phonenumbers.__version__ != PHONENUMBERS_VERSION:
+        print(f"WARNING: nanp_data.py was generated from phonenumbers {PHONENUMBERS_VERSION}, "
+              f"running against {phonenumbers.__version__}")
+
+    rng = random.Random(args.seed)
+    checked = fast = 0
+    mismatches = []
+    for raw in corpus(args.count, rng):
+        for validate in (True, False):
+            checked += 1
+            _, handled = phone._fast_path(raw.strip(), validate) if raw else (None, False)
+            fast += handled
+            expected, actual = reference(raw, validate), candidate(raw, validate)
+            if expected != actual:
+                mismatches.append((raw, validate, expected, actual))
+
+    print(f"Checked {checked} inputs; fast path handled {fast / checked:.1%}; mismatches: {len(mismatches)}")
+    for raw, validate, expected, actual in mismatches[:20]:
+        print(f"  {raw!r} validate={validate}: phonenumbers={expected} fast={actual}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Handlers import shared code from the AtlasCommon layer; tests import it from the source tree
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'common'))
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
@@ -0,0 +1,57 @@
+import io
+import json
+import threading
+
+from atlas_common.bedrock_gateway import BedrockGateway, anthropic_body
+from atlas_common.deadline import Deadline, invoke_with_deadline
+
+
+class SlowBedrock:
+    """invoke_model blocks until released, like a Bedrock call that runs past the turn's budget."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.finish = threading.Event()
+        self.finished = threading.Event()
+
+    def invoke_model(self, **kwargs):
+        self.started.set()
+        self.finish.wait(5)
+        self.finished.set()
+        body = {'content': [{'type': 'text', 'text': 'late reply'}], 'usage': {}}
+        return {'body': io.BytesIO(json.dumps(body).encode())}
+
+
+def test_slot_is_released_when_the_deadline_fires():
+    client = SlowBedrock()
+    gateway = BedrockGateway(client=client, max_concurrency=1, acquire_timeout=0.1, metrics=False)
+    body = anthropic_body("hello", max_tokens=10)
+
+    result, outcome = invoke_with_deadline(
+        lambda: gateway.complete(body, 'model', operation='test'), Deadline(0.05), 'fallback', label='test')
+
+    assert (result, outcome) == ('fallback', 'fallback')
+    assert client.started.is_set() and not client.finished.is_set()
+    # The abandoned call is still running, but its slot is free again
+    assert gateway.slots.acquire(timeout=0.5)
+    gateway.slots.release()
+
+    client.finish.set()
+    assert client.finished.wait(1)
+    # The worker's own release afterwards is a no-op, not a second release
+    assert gateway.slots.acquire(timeout=0.5)
+    assert not gateway.slots.acquire(timeout=0.05)
+    gateway.slots.release()
+
+
+def test_slot_is_released_once_when_the_call_finishes_in_time():
+    client = SlowBedrock()
+    client.finish.set()
+    gateway = BedrockGateway(client=client, max_concurrency=1, metrics=False)
+
+    result, outcome = invoke_with_deadline(
+        lambda: gateway.complete(anthropic_body("hello", max_tokens=10), 'model').text, Deadline(2), 'fallback')
+
+    assert (result, outcome) == ('late reply', 'on_time')
+    assert gateway.slots.acquire(timeout=0.1)
+    assert not gateway.slots.acquire(timeout=0.05)
@@ -0,0 +1,38 @@
+from atlas_common.history import ConversationHistory
+
+
+def test_oversized_bot_reply_keeps_short_user_turn():
+    history = ConversationHistory(char_budget=100)
+    history.add("yes please call me", "x" * 500)
+
+    user, bot = history.turns[-1]
+    assert user == "yes please call me"
+    assert bot == "x" * (100 - 12 - len(user))
+    assert history._chars == 100
+
+
+def test_oversized_user_turn_keeps_short_bot_reply():
+    history = ConversationHistory(char_budget=100)
+    history.add("u" * 500, "Sure, what time works?")
+
+    user, bot = history.turns[-1]
+    assert bot == "Sure, what time works?"
+    assert len(user) == 100 - 12 - len(bot)
+
+
+def test_both_fields_oversized_split_the_budget():
+    history = ConversationHistory(char_budget=100)
+    history.add("u" * 500, "b" * 500)
+
+    user, bot = history.turns[-1]
+    assert len(user) == 44
+    assert len(bot) == 44
+
+
+def test_oversized_turn_evicts_older_turns():
+    history = ConversationHistory(char_budget=100)
+    history.add("hello", "hi there")
+    history.add("yes please call me", "x" * 500)
+
+    assert len(history) == 1
+    assert history.turns[0][0] == "yes please call me"
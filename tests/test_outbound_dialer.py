@@ -0,0 +1,116 @@
+import importlib.util
+import os
+
+os.environ.setdefault('INTERACTIONS_DYNAMODB_TABLE', 'test-interactions')
+
+from atlas_common.dialer import DIAL_MAX_QUEUE_SECONDS, DIAL_URGENT_SECONDS, _MAX_MS
+
+HANDLER_PATH = os.path.join(os.path.dirname(__file__), '..', 'lambda', 'OutboundDialerHandler_code', 'lambda_function.py')
+
+
+def load_handler():
+    spec = importlib.util.spec_from_file_location('outbound_dialer_handler', HANDLER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class Bucket:
+    """One call per second on the fake clock."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.next_at = clock.now
+
+    def wait_time(self):
+        return max(self.next_at - self.clock.now, 0.0)
+
+    def try_acquire(self):
+        if self.clock.now < self.next_at:
+            return False
+        self.next_at = self.clock.now + 1
+        return True
+
+    def drain(self):
+        self.next_at = self.clock.now + 1
+
+
+class Queue:
+    """In-memory DialQueue with one fresh lead arriving every second."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.items = {}
+        self.arrived_until = clock.now
+
+    def enqueue(self, key, at):
+        enqueued_ms = int(at * 1000)
+        sk = f"{_MAX_MS - enqueued_ms:013d}#{key}"
+        self.items[sk] = {'SK': sk, 'InteractionKey': key, 'EnqueuedAt': enqueued_ms, 'Request': {'interactionKey': key}}
+
+    def _arrivals(self):
+        while self.arrived_until + 1 <= self.clock.now:
+            self.arrived_until += 1
+            self.enqueue(f"fresh-{int(self.arrived_until)}", self.arrived_until)
+
+    def peek(self, limit=10, oldest=False):
+        self._arrivals()
+        return [self.items[sk] for sk in sorted(self.items, reverse=oldest)[:limit]]
+
+    def remove(self, item):
+        return self.items.pop(item['SK'], None) is not None
+
+    def requeue(self, item):
+        self.items[item['SK']] = item
+
+    def active_calls(self):
+        return 0
+
+
+class Context:
+    def __init__(self, clock, seconds):
+        self.clock = clock
+        self.deadline = clock.now + seconds
+
+    def get_remaining_time_in_millis(self):
+        return int((self.deadline - self.clock.now) * 1000)
+
+
+def test_burst_larger_than_dial_rate_is_dialed_before_it_expires(monkeypatch):
+    handler = load_handler()
+    clock = Clock()
+    queue = Queue(clock)
+    dialed, failed = [], []
+    burst = [f"burst-{i:02d}" for i in range(30)]
+    for i, key in enumerate(burst):
+        queue.enqueue(key, clock.now + i / 1000)
+
+    monkeypatch.setattr(handler, 'time', clock)
+    monkeypatch.setattr(handler, 'dial_queue', queue)
+    monkeypatch.setattr(handler, 'bucket', Bucket(clock))
+    monkeypatch.setattr(handler, 'DIAL_MAX_ACTIVE_CALLS', 10 ** 6)
+    monkeypatch.setattr(handler, 'dial', lambda item: dialed.append((clock.now, item['InteractionKey'])) or True)
+    monkeypatch.setattr(handler, 'fail_task', lambda request, error, cause: failed.append(request['interactionKey']))
+
+    # Fresh leads arrive as fast as we can dial, so newest-first alone never reaches the burst
+    handler.lambda_handler({}, Context(clock, DIAL_MAX_QUEUE_SECONDS + 100 + handler.STOP_MARGIN_MS / 1000))
+
+    # Newest first while nothing is close to expiring...
+    assert dialed[0][1] == 'burst-29'
+    assert all(key.startswith('fresh-') for at, key in dialed[1:] if at < 1_700_000_000.0 + DIAL_MAX_QUEUE_SECONDS - DIAL_URGENT_SECONDS)
+    # ...then the rest of the burst, oldest first, before it expires
+    rest = [(at, key) for at, key in dialed[1:] if key.startswith('burst-')]
+    assert [key for _, key in rest] == burst[:-1]
+    assert all(at - 1_700_000_000.0 >= DIAL_MAX_QUEUE_SECONDS - DIAL_URGENT_SECONDS for at, _ in rest)
+    assert not failed
@@ -0,0 +1,52 @@
+from atlas_common import side_effects
+from atlas_common.side_effects import DELETE_LEAD, SideEffectProcessor, make_message
+
+
+class FakeSalesforce:
+    def __init__(self, leads):
+        self.leads = leads
+        self.deleted = []
+
+    def query_all(self, query):
+        return {'records': list(self.leads)}
+
+    def restful(self, path, method, params=None, json=None):
+        ids = params['ids'].split(',')
+        self.deleted.extend(ids)
+        return [{'id': lead_id, 'success': True, 'errors': []} for lead_id in ids]
+
+
+class FakeLeadIndex:
+    def __init__(self):
+        self.invalidated = []
+
+    def invalidate(self, phone):
+        self.invalidated.append(phone)
+
+
+class FakeLedger:
+    def __init__(self):
+        self.results = {}
+
+    def completed(self, keys):
+        return set()
+
+    def mark_completed(self, results):
+        self.results.update(results)
+
+
+def test_two_delete_requests_for_the_same_lead_both_get_the_outcome(monkeypatch):
+    sf = FakeSalesforce([{'Id': '00Q1', 'Phone': '+15555551234', 'LastName': 'Doe'}])
+    monkeypatch.setattr(side_effects, 'with_salesforce', lambda operation: operation(sf))
+    ledger = FakeLedger()
+    processor = SideEffectProcessor(ledger=ledger, lead_index=FakeLeadIndex())
+    payload = {'phone': '+15555551234', 'lastName': 'Doe'}
+
+    failed = processor.process([
+        ('m1', make_message(DELETE_LEAD, payload, 'delete#session-a#req-1')),
+        ('m2', make_message(DELETE_LEAD, dict(payload, lastName='doe'), 'delete#session-b#req-2')),
+    ])
+
+    assert failed == []
+    assert sf.deleted == ['00Q1']
+    assert ledger.results == {'delete#session-a#req-1': '00Q1', 'delete#session-b#req-2': '00Q1'}